@@ -0,0 +1,60 @@
+"""composite and partial indexes
+
+Revision ID: 5a2c242f2446
+Revises: 6d93b25cd243
+Create Date: 2026-10-18 18:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a2c242f2446'
+down_revision: Union[str, Sequence[str], None] = '6d93b25cd243'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (имя, таблица, колонки, условие частичного индекса)
+INDEXES = [
+    ('ix_schedule_doctor_id_date', 'schedule', ['doctor_id', 'date', 'start_time'], None),
+    ('ix_schedule_office_id_date', 'schedule', ['office_id', 'date', 'start_time'], None),
+    ('ix_appointment_patient_id_status', 'appointment', ['patient_id', 'status'], None),
+    ('ix_appointment_schedule_id', 'appointment', ['schedule_id'], None),
+    ('ix_appointment_scheduled_schedule_id', 'appointment', ['schedule_id'], "status = 'scheduled'"),
+    ('ix_appointment_created_at_id', 'appointment', ['created_at', 'id'], None),
+    ('ix_patient_medicament_patient_id_start_date', 'patient_medicament', ['patient_id', 'start_date'], None),
+    ('ix_patient_medicament_doctor_by_id', 'patient_medicament', ['doctor_by_id', 'created_at', 'id'], None),
+    ('ix_patient_medicament_active', 'patient_medicament', ['patient_id', 'medicament_id'], "end_date IS NULL"),
+    ('ix_patient_medicament_created_at_id', 'patient_medicament', ['created_at', 'id'], None),
+    ('ix_medicament_contraindication_second_first', 'medicament_medicament_contraindication',
+     ['medication_second_id', 'medication_first_id'], None),
+    ('ix_medication_contraindication_other_contraindication_id', 'medication_contraindication_other',
+     ['contraindication_id'], None),
+    ('ix_patient_created_at_id', 'patient', ['created_at', 'id'], None),
+    ('ix_doctor_created_at_id', 'doctor', ['created_at', 'id'], None),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY не блокирует запись в таблицы, но не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns,
+                unique=False,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+                if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,51 @@
+"""schedule overlap exclusion constraints
+
+Revision ID: 9290829d31b6
+Revises: 5a2c242f2446
+Create Date: 2026-10-18 19:00:00.000000
+
+Перед применением в базе не должно быть пересекающихся слотов одного врача
+или одного кабинета - иначе создание ограничений завершится ошибкой.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9290829d31b6'
+down_revision: Union[str, Sequence[str], None] = '5a2c242f2446'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # btree_gist нужен для "doctor_id WITH =" в GiST-индексе
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+
+    op.add_column('schedule', sa.Column(
+        'period',
+        postgresql.TSRANGE(),
+        sa.Computed("tsrange(date + start_time, date + end_time, '[)')", persisted=True)
+    ))
+
+    op.create_exclude_constraint(
+        'schedule_doctor_no_overlap', 'schedule',
+        ('doctor_id', '='), ('period', '&&'),
+        using='gist'
+    )
+    op.create_exclude_constraint(
+        'schedule_office_no_overlap', 'schedule',
+        ('office_id', '='), ('period', '&&'),
+        using='gist'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('schedule_office_no_overlap', 'schedule')
+    op.drop_constraint('schedule_doctor_no_overlap', 'schedule')
+    op.drop_column('schedule', 'period')
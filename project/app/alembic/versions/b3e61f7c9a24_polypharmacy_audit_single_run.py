@@ -0,0 +1,43 @@
+"""polypharmacy audit single run
+
+Revision ID: b3e61f7c9a24
+Revises: a7d2e94b1f05
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e61f7c9a24'
+down_revision: Union[str, Sequence[str], None] = 'a7d2e94b1f05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('polypharmacy_audit_run', sa.Column(
+        'heartbeat_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False
+    ))
+    # зависшие запуски (поток остановлен вместе с процессом) не должны мешать индексу
+    op.execute(
+        "UPDATE polypharmacy_audit_run "
+        "SET status = 'failed', error = 'Запуск прерван', finished_at = now() "
+        "WHERE status = 'running'"
+    )
+    # одновременно выполняется не больше одного запуска
+    op.create_index(
+        'ux_polypharmacy_audit_run_running', 'polypharmacy_audit_run', ['status'],
+        unique=True,
+        postgresql_where=sa.text("status = 'running'")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ux_polypharmacy_audit_run_running', table_name='polypharmacy_audit_run')
+    op.drop_column('polypharmacy_audit_run', 'heartbeat_at')
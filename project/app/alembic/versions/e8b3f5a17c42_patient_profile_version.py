@@ -0,0 +1,28 @@
+"""patient profile version
+
+Revision ID: e8b3f5a17c42
+Revises: c41e7a9d2b18
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b3f5a17c42'
+down_revision: Union[str, Sequence[str], None] = 'c41e7a9d2b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('patient', sa.Column('profile_version', sa.Integer(), server_default=sa.text('0'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('patient', 'profile_version')
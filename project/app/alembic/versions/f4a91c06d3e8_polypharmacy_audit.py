@@ -0,0 +1,51 @@
+"""polypharmacy audit
+
+Revision ID: f4a91c06d3e8
+Revises: e8b3f5a17c42
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4a91c06d3e8'
+down_revision: Union[str, Sequence[str], None] = 'e8b3f5a17c42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('polypharmacy_audit_run',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), server_default=sa.text("'running'"), nullable=False),
+    sa.Column('patients_scanned', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('patients_flagged', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('findings', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('started_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('finished_at', sa.TIMESTAMP(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('polypharmacy_audit_finding',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('run_id', sa.Integer(), nullable=False),
+    sa.Column('patient_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('medicament_id', sa.Integer(), nullable=False),
+    sa.Column('other_medicament_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['run_id'], ['polypharmacy_audit_run.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_polypharmacy_audit_finding_run_id_id', 'polypharmacy_audit_finding', ['run_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_polypharmacy_audit_finding_run_id_id', table_name='polypharmacy_audit_finding')
+    op.drop_table('polypharmacy_audit_finding')
+    op.drop_table('polypharmacy_audit_run')
@@ -0,0 +1,450 @@
+"""
+Внутрипроцессный индекс будущих слотов на NumPy для запросов вида
+"любой свободный врач специализации в ближайшие две недели".
+
+Слоты хранятся упакованными колонками (id, врач, кабинет, день, начало и конец
+в минутах от полуночи) с маской свободных; основной блок отсортирован по
+(день, начало, id), поэтому окно дат - срез через searchsorted, а фильтры
+по времени дня, кабинету и специализации - векторные операции над срезом.
+Слоты одного врача за день - подмаска этого среза.
+
+Индекс строится из schedule в фоне при старте приложения и обновляется точечно:
+бронирование и отмена (booking, patient, admin) меняют маску, создание слотов
+добавляет их в небольшой несортированный хвост (при COMPACT_PENDING строк он
+сливается с основным блоком в фоновом потоке, под блокировкой только подмена
+массивов), удаление слотов и врачей снимает их с маски.
+Каждый процесс держит свой индекс и не видит изменений соседних процессов,
+поэтому индекс периодически пересобирается в фоне (availability_index_max_age_seconds),
+а результат поиска перепроверяется по БД при выдаче; бронирование
+остаётся атомарным в БД (booking.book_slot).
+"""
+
+import threading
+import time
+from datetime import date, datetime, time as dtime
+
+import numpy as np
+from sqlalchemy import select, cast, func, Integer
+
+import database, models
+from config import settings
+
+_EPOCH = date(1970, 1, 1)
+
+# размер несортированного хвоста, после которого он сливается с основным блоком
+COMPACT_PENDING = 50_000
+
+# строк за одну выборку при построении
+BUILD_CHUNK = 100_000
+
+# строк основного блока за один векторный проход поиска (поиск останавливается, набрав limit)
+SCAN_CHUNK = 262_144
+
+_COLUMNS = (
+    ("id", np.int32),  # schedule.id - integer
+    ("doctor", np.int32),
+    ("office", np.int32),
+    ("day", np.int32),  # дней от 1970-01-01
+    ("start", np.int16),  # минут от полуночи
+    ("end", np.int16),
+    ("free", np.bool_),
+)
+
+
+def day_number(value: date) -> int:
+    return (value - _EPOCH).days
+
+
+def minute_of(value: dtime) -> int:
+    return value.hour * 60 + value.minute
+
+
+class Slots:
+    """Упакованные колонки слотов"""
+
+    def __init__(self, **columns):
+        for name, dtype in _COLUMNS:
+            setattr(self, name, np.asarray(columns[name], dtype=dtype))
+
+    @classmethod
+    def empty(cls):
+        return cls(**{name: np.empty(0, dtype=dtype) for name, dtype in _COLUMNS})
+
+    @classmethod
+    def from_matrix(cls, matrix: np.ndarray):
+        """Из матрицы int64 с колонками в порядке _COLUMNS"""
+        matrix = matrix.reshape(-1, len(_COLUMNS))
+        return cls(**{name: matrix[:, i] for i, (name, _) in enumerate(_COLUMNS)})
+
+    def __len__(self):
+        return len(self.id)
+
+    def take(self, positions):
+        return Slots(**{name: getattr(self, name)[positions] for name, _ in _COLUMNS})
+
+    def concat(self, other: "Slots"):
+        return Slots(**{
+            name: np.concatenate([getattr(self, name), getattr(other, name)]) for name, _ in _COLUMNS
+        })
+
+    def sorted(self):
+        """Копия в порядке (день, начало, id)"""
+        return self.take(np.lexsort((self.id, self.start, self.day)))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name, _ in _COLUMNS)
+
+
+class AvailabilityIndex:
+    """Основной отсортированный блок, хвост новых слотов и специализации врачей"""
+
+    def __init__(self):
+        self._base = None
+        self._pending = Slots.empty()
+        self._ids_sorted = np.empty(0, dtype=np.int32)  # id основного блока по возрастанию
+        self._by_id = np.empty(0, dtype=np.int32)  # позиции этих id в основном блоке
+        self._specializations = {}  # doctor_id -> specialization_id
+
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._journal = None  # изменения, пришедшие во время пересборки
+        self._compact_journal = None  # изменения, пришедшие во время слияния хвоста
+        self._built_at = None
+
+        self.builds = 0
+        self.compactions = 0
+        self.last_build_seconds = None
+        self.last_compaction_seconds = None
+
+    @property
+    def ready(self) -> bool:
+        return self._base is not None
+
+    # --- построение ---
+
+    def load(self, slots: Slots, specializations: dict):
+        """Заменить содержимое индекса (слоты в любом порядке)"""
+        base = slots.sorted()
+        by_id = np.argsort(base.id, kind="stable").astype(np.int32)
+
+        with self._lock:
+            self._base = base
+            self._by_id = by_id
+            self._ids_sorted = base.id[by_id]
+            self._pending = Slots.empty()
+            self._specializations = dict(specializations)
+            self._built_at = time.monotonic()
+
+            journal, self._journal = self._journal, None
+            for method, args in journal or ():
+                method(*args)
+
+    def rebuild(self, wait: bool = True):
+        """Пересобрать индекс из БД (будущие слоты и специализации врачей)"""
+        if not self._build_lock.acquire(blocking=wait):
+            return
+
+        try:
+            with self._lock:
+                self._journal = []
+
+            started = time.perf_counter()
+            schedule = models.Schedule
+            statement = select(
+                schedule.id,
+                schedule.doctor_id,
+                schedule.office_id,
+                schedule.date - _EPOCH,
+                cast(func.extract("epoch", schedule.start_time) / 60, Integer),
+                cast(func.extract("epoch", schedule.end_time) / 60, Integer),
+                cast(schedule.is_available, Integer)
+            ).where(schedule.date >= date.today())
+
+            db = database.SessionLocal()
+            try:
+                chunks = [
+                    np.array(chunk, dtype=np.int64)
+                    for chunk in db.execute(statement.execution_options(yield_per=BUILD_CHUNK)).partitions()
+                ]
+                specializations = dict(db.execute(
+                    select(models.Doctor.id, models.Doctor.specialization_id)
+                ).all())
+            finally:
+                db.close()
+
+            matrix = np.concatenate(chunks) if chunks else np.empty((0, len(_COLUMNS)), dtype=np.int64)
+            self.load(Slots.from_matrix(matrix), specializations)
+
+            self.builds += 1
+            self.last_build_seconds = time.perf_counter() - started
+        except Exception:
+            with self._lock:
+                self._journal = None
+            raise
+        finally:
+            self._build_lock.release()
+
+    def ensure_built(self) -> bool:
+        """
+        Запустить сборку в фоне, если индекса ещё нет или он устарел;
+        возвращает, можно ли уже искать. Фоновый поток не попадает в счётчики
+        запросов (db_metrics) вызвавшего эндпоинта.
+        """
+        stale = self._base is None or \
+            time.monotonic() - self._built_at > settings.availability_index_max_age_seconds
+        if stale and not self._build_lock.locked():
+            threading.Thread(target=self.rebuild, kwargs={"wait": False}, daemon=True).start()
+        return self._base is not None
+
+    def _compact(self):
+        """
+        Слить хвост с основным блоком, отбросив прошедшие дни (фоновый поток).
+        Новые массивы строятся без self._lock - бронирования и отмены не ждут
+        слияния; изменения, пришедшие за это время, записываются в журнал и
+        повторяются на новой копии при подмене.
+        """
+        if not self._build_lock.acquire(blocking=False):
+            # идёт пересборка: она и так заменит хвост
+            with self._lock:
+                self._compact_journal = None
+            return
+
+        try:
+            started = time.perf_counter()
+            with self._lock:
+                base, pending = self._base, self._pending
+
+            merged = base.concat(pending)
+            merged = merged.take(np.flatnonzero(merged.day >= day_number(date.today()))).sorted()
+            by_id = np.argsort(merged.id, kind="stable").astype(np.int32)
+            ids_sorted = merged.id[by_id]
+
+            with self._lock:
+                journal, self._compact_journal = self._compact_journal, None
+                if self._base is not base:
+                    # индекс заменён через load() - слитая копия устарела
+                    return
+                self._base, self._by_id, self._ids_sorted = merged, by_id, ids_sorted
+                self._pending = Slots.empty()
+                # повтор идемпотентен: добавленные слоты не дублируются, маска выставляется явно
+                for method, args in journal:
+                    method(*args)
+                self.compactions += 1
+
+            self.last_compaction_seconds = time.perf_counter() - started
+        except Exception:
+            with self._lock:
+                self._compact_journal = None
+            raise
+        finally:
+            self._build_lock.release()
+
+    # --- точечные изменения ---
+
+    def _record(self, method, *args):
+        """Применить изменение; во время пересборки - ещё и запомнить для новой копии"""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append((method, args))
+            if self._compact_journal is not None:
+                self._compact_journal.append((method, args))
+            if self._base is not None:
+                method(*args)
+
+    def _positions(self, schedule_ids):
+        """(позиции в основном блоке, позиции в хвосте) для набора id"""
+        # тот же dtype, что у колонки: иначе searchsorted копирует её целиком
+        schedule_ids = np.asarray(schedule_ids, dtype=np.int32)
+        found = np.searchsorted(self._ids_sorted, schedule_ids)
+        found = found[found < len(self._ids_sorted)]
+        found = found[np.isin(self._ids_sorted[found], schedule_ids)]
+        return self._by_id[found], np.flatnonzero(np.isin(self._pending.id, schedule_ids))
+
+    def _set_free(self, schedule_ids, free: bool):
+        base_positions, pending_positions = self._positions(schedule_ids)
+        self._base.free[base_positions] = free
+        self._pending.free[pending_positions] = free
+
+    def _add(self, slots: Slots, specializations: dict):
+        self._specializations.update(specializations)
+
+        # повтор из журнала пересборки: слоты, уже прочитанные из БД, не дублируем
+        base_positions, pending_positions = self._positions(slots.id)
+        if len(base_positions) or len(pending_positions):
+            known = np.concatenate([self._base.id[base_positions], self._pending.id[pending_positions]])
+            slots = slots.take(np.flatnonzero(~np.isin(slots.id, known)))
+
+        self._pending = self._pending.concat(slots)
+        if len(self._pending) >= COMPACT_PENDING and self._compact_journal is None:
+            self._compact_journal = []
+            threading.Thread(target=self._compact, daemon=True).start()
+
+    def _drop_doctor(self, doctor_id: int):
+        self._base.free[self._base.doctor == doctor_id] = False
+        self._pending.free[self._pending.doctor == doctor_id] = False
+        self._specializations.pop(doctor_id, None)
+
+    def set_free(self, schedule_ids, free: bool):
+        self._record(self._set_free, schedule_ids, free)
+
+    def add(self, slots: Slots, specializations: dict):
+        self._record(self._add, slots, specializations)
+
+    def drop_doctor(self, doctor_id: int):
+        self._record(self._drop_doctor, doctor_id)
+
+    # --- поиск ---
+
+    def _doctors(self, specialization_id, doctor_id):
+        if doctor_id is not None:
+            return np.array([doctor_id], dtype=np.int32)
+        if specialization_id is None:
+            return None
+        return np.array(
+            [doctor for doctor, spec in self._specializations.items() if spec == specialization_id],
+            dtype=np.int32
+        )
+
+    @staticmethod
+    def _hits(slots: Slots, window: slice, first_day, last_day, now_day, now_minute,
+              doctors, office_id, time_from, time_to, after):
+        """Позиции подходящих слотов внутри window в порядке блока"""
+        day, start = slots.day[window], slots.start[window]
+
+        mask = slots.free[window] & (day >= first_day) & (day <= last_day)
+        # уже начавшиеся сегодня слоты не предлагаем
+        mask &= (day > now_day) | (start > now_minute)
+        if time_from is not None:
+            mask &= start >= time_from
+        if time_to is not None:
+            mask &= slots.end[window] <= time_to
+        if office_id is not None:
+            mask &= slots.office[window] == office_id
+        if doctors is not None:
+            mask &= np.isin(slots.doctor[window], doctors, kind="table")
+        if after is not None:
+            after_day, after_start, after_id = after
+            mask &= (day > after_day) | ((day == after_day) & (
+                (start > after_start) | ((start == after_start) & (slots.id[window] > after_id))
+            ))
+
+        return np.flatnonzero(mask) + (window.start or 0)
+
+    def search(self, date_from: date, date_to: date, specialization_id: int = None,
+               doctor_id: int = None, office_id: int = None, time_from: dtime = None,
+               time_to: dtime = None, after: tuple = None, limit: int = 50) -> list:
+        """
+        id ближайших свободных слотов по возрастанию (дата, начало, id);
+        after - ключ (date, time, id) последнего слота предыдущей страницы
+        """
+        now = datetime.now()
+        now_day = day_number(now.date())
+        first_day = max(day_number(date_from), now_day)
+        last_day = day_number(date_to)
+
+        params = dict(
+            first_day=first_day,
+            last_day=last_day,
+            now_day=now_day,
+            now_minute=minute_of(now.time()),
+            doctors=self._doctors(specialization_id, doctor_id),
+            office_id=office_id,
+            time_from=minute_of(time_from) if time_from else None,
+            time_to=minute_of(time_to) if time_to else None,
+            after=(day_number(after[0]), minute_of(after[1]), after[2]) if after else None,
+        )
+
+        with self._lock:
+            base, pending = self._base, self._pending
+
+        # основной блок отсортирован: окно дат - срез, первые limit совпадений уже упорядочены
+        lo, hi = np.searchsorted(base.day, np.array([first_day, last_day + 1], dtype=base.day.dtype))
+        positions, count = [], 0
+        for start in range(int(lo), int(hi), SCAN_CHUNK):
+            hits = self._hits(base, slice(start, min(start + SCAN_CHUNK, int(hi))), **params)[:limit - count]
+            positions.append(hits)
+            count += len(hits)
+            if count >= limit:
+                break
+
+        found = base.take(np.concatenate(positions) if positions else np.empty(0, dtype=np.int64))
+        if len(pending):
+            found = found.concat(pending.take(self._hits(pending, slice(0, len(pending)), **params)))
+            found = found.sorted()
+
+        return found.id[:limit].tolist()
+
+    def stats(self) -> dict:
+        with self._lock:
+            base, pending = self._base, self._pending
+
+        if base is None:
+            return {"enabled": settings.availability_index_enabled, "ready": False}
+
+        return {
+            "enabled": settings.availability_index_enabled,
+            "ready": True,
+            "slots": len(base) + len(pending),
+            "pending": len(pending),
+            "free": int(base.free.sum() + pending.free.sum()),
+            "doctors": len(self._specializations),
+            "memory_bytes": base.nbytes + pending.nbytes + self._ids_sorted.nbytes + self._by_id.nbytes,
+            "age_seconds": round(time.monotonic() - self._built_at, 1),
+            "builds": self.builds,
+            "compactions": self.compactions,
+            "last_compaction_seconds": self.last_compaction_seconds,
+            "last_build_seconds": self.last_build_seconds,
+        }
+
+
+index = AvailabilityIndex()
+
+
+# --- хуки эндпоинтов (вызываются после commit; без включённого индекса ничего не делают) ---
+
+def slot_booked(schedule_id: int):
+    if settings.availability_index_enabled:
+        index.set_free([schedule_id], False)
+
+
+def slot_released(schedule_id: int):
+    if settings.availability_index_enabled:
+        index.set_free([schedule_id], True)
+
+
+def slots_removed(schedule_ids):
+    if settings.availability_index_enabled:
+        index.set_free(list(schedule_ids), False)
+
+
+def doctor_removed(doctor_id: int):
+    if settings.availability_index_enabled:
+        index.drop_doctor(doctor_id)
+
+
+def slots_created(db, rows: list, schedule_ids: list):
+    """
+    rows - значения созданных слотов (как для INSERT), schedule_ids - их id в том же порядке.
+    Специализация нового для индекса врача читается из БД.
+    """
+    if not settings.availability_index_enabled or not index.ready or not rows:
+        return
+
+    doctor_ids = {row["doctor_id"] for row in rows} - index._specializations.keys()
+    specializations = dict(
+        db.query(models.Doctor.id, models.Doctor.specialization_id)
+        .filter(models.Doctor.id.in_(doctor_ids))
+        .all()
+    ) if doctor_ids else {}
+
+    slots = Slots(
+        id=schedule_ids,
+        doctor=[row["doctor_id"] for row in rows],
+        office=[row["office_id"] for row in rows],
+        day=[day_number(row["date"]) for row in rows],
+        start=[minute_of(row["start_time"]) for row in rows],
+        end=[minute_of(row["end_time"]) for row in rows],
+        free=[row.get("is_available", True) for row in rows],
+    )
+    index.add(slots, specializations)
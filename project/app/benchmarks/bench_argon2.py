@@ -0,0 +1,100 @@
+"""
+Подбор параметров Argon2 для текущей машины: время hash/verify и пиковая память
+для сетки time_cost x memory_cost x parallelism. Каждая точка сетки считается
+в отдельном процессе, чтобы пиковая память (ru_maxrss) не смешивалась между точками.
+
+Запуск из project/app:
+    python -m benchmarks.bench_argon2 --time-costs 2,3,4 --memory-costs 19456,65536 --parallelism 1,2,4
+
+Выбранные значения задаются в .env:
+    ARGON2_TIME_COST=..., ARGON2_MEMORY_COST=..., ARGON2_PARALLELISM=...
+"""
+
+import argparse
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+
+def _parse_ints(value: str):
+    return [int(item) for item in value.split(",") if item]
+
+
+def measure_point(time_cost: int, memory_cost: int, parallelism: int, iterations: int) -> dict:
+    from passlib.hash import argon2
+
+    handler = argon2.using(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+    password = "benchmark-password"
+
+    hash_timings = []
+    verify_timings = []
+    hashed = None
+    for _ in range(iterations):
+        started = time.perf_counter()
+        hashed = handler.hash(password)
+        hash_timings.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        handler.verify(password, hashed)
+        verify_timings.append(time.perf_counter() - started)
+
+    # ru_maxrss: КиБ в Linux, байты в macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        max_rss //= 1024
+
+    return {
+        "time_cost": time_cost,
+        "memory_cost": memory_cost,
+        "parallelism": parallelism,
+        "hash_ms": statistics.median(hash_timings) * 1000,
+        "verify_ms": statistics.median(verify_timings) * 1000,
+        "max_rss_mib": max_rss / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--time-costs", type=_parse_ints, default=[1, 2, 3, 4])
+    parser.add_argument("--memory-costs", type=_parse_ints, default=[19456, 47104, 65536])
+    parser.add_argument("--parallelism", type=_parse_ints, default=[1, 2, 4])
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=250.0,
+                        help="верхняя граница времени verify для рекомендации")
+    args = parser.parse_args()
+
+    results = []
+    context = get_context("spawn")
+    for time_cost in args.time_costs:
+        for memory_cost in args.memory_costs:
+            for parallelism in args.parallelism:
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    point = executor.submit(
+                        measure_point, time_cost, memory_cost, parallelism, args.iterations
+                    ).result()
+                results.append(point)
+                print(
+                    f"t={point['time_cost']:<2} m={point['memory_cost']:<7} p={point['parallelism']:<2} "
+                    f"hash {point['hash_ms']:8.1f} ms  verify {point['verify_ms']:8.1f} ms  "
+                    f"peak rss {point['max_rss_mib']:7.1f} MiB"
+                )
+
+    # Самые "дорогие" параметры, укладывающиеся в целевое время проверки
+    suitable = [point for point in results if point["verify_ms"] <= args.target_ms]
+    if not suitable:
+        print(f"Ни одна точка не укладывается в {args.target_ms} ms")
+        return
+
+    best = max(suitable, key=lambda point: (point["memory_cost"] * point["time_cost"], -point["verify_ms"]))
+    print()
+    print(f"Рекомендация (verify <= {args.target_ms} ms):")
+    print(f"ARGON2_TIME_COST={best['time_cost']}")
+    print(f"ARGON2_MEMORY_COST={best['memory_cost']}")
+    print(f"ARGON2_PARALLELISM={best['parallelism']}")
+
+
+if __name__ == "__main__":
+    main()
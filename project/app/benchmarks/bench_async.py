@@ -0,0 +1,91 @@
+"""
+Сравнение синхронного (пул потоков + Session) и асинхронного (AsyncSession, psycopg 3)
+режимов на горячих эндпоинтах чтения при 1000 одновременных клиентах.
+
+Поднимите два экземпляра приложения на одной базе:
+    DATABASE_ASYNC=false uvicorn main:app --port 8000
+    DATABASE_ASYNC=true  uvicorn main:app --port 8001
+
+Запуск из project/app (токен пациента/врача - из /login):
+    python -m benchmarks.bench_async --token <jwt> --path /api/patient/schedule/1 \
+        --sync-url http://localhost:8000 --async-url http://localhost:8001 --clients 1000
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def client_loop(client, path, requests_per_client, timings, errors):
+    for _ in range(requests_per_client):
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+                continue
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        timings.append(time.perf_counter() - started)
+
+
+async def run_mode(base_url, token, path, clients, requests_per_client):
+    timings = []
+    errors = []
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        headers={"Authorization": f"Bearer {token}"},
+        limits=limits,
+        timeout=60.0
+    ) as client:
+        # прогрев: соединения пула БД и кэши токена/пользователя
+        await client.get(path)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            client_loop(client, path, requests_per_client, timings, errors)
+            for _ in range(clients)
+        ))
+        elapsed = time.perf_counter() - started
+
+    return timings, errors, elapsed
+
+
+def report(name, timings, errors, elapsed):
+    if not timings:
+        print(f"{name:>5}: нет успешных ответов, ошибок {len(errors)}")
+        return
+
+    timings = sorted(timings)
+    percentile = lambda p: timings[min(len(timings) - 1, int(len(timings) * p))] * 1000
+    print(f"{name:>5}: {len(timings) / elapsed:8.1f} req/s, "
+          f"p50 {statistics.median(timings) * 1000:.1f} ms, "
+          f"p95 {percentile(0.95):.1f} ms, p99 {percentile(0.99):.1f} ms, "
+          f"ошибок {len(errors)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--token", required=True)
+    parser.add_argument("--path", default="/api/patient/appointments")
+    parser.add_argument("--sync-url", default="http://localhost:8000")
+    parser.add_argument("--async-url", default="http://localhost:8001")
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--requests-per-client", type=int, default=5)
+    args = parser.parse_args()
+
+    for name, base_url in (("sync", args.sync_url), ("async", args.async_url)):
+        timings, errors, elapsed = asyncio.run(
+            run_mode(base_url, args.token, args.path, args.clients, args.requests_per_client)
+        )
+        report(name, timings, errors, elapsed)
+
+
+if __name__ == "__main__":
+    main()
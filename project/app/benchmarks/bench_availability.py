@@ -0,0 +1,123 @@
+"""
+Индекс свободных слотов (availability_index) на синтетическом расписании:
+память, время сборки, задержка поиска "свободный врач специализации в ближайшие
+две недели" и стоимость точечных обновлений (бронирование/отмена, новые слоты).
+БД не нужна: индекс загружается напрямую из массивов.
+
+Запуск из project/app:
+    python -m benchmarks.bench_availability --doctors 1000 --days 365
+    python -m benchmarks.bench_availability --doctors 1000 --days 365 --slots-per-day 16 --booked 0.6
+"""
+
+import argparse
+import time
+from datetime import date, timedelta, time as dtime
+
+import numpy as np
+
+import availability_index
+
+
+def make_slots(args, rng):
+    """Слоты врачей на каждый день с 9:00 по slot_minutes, доля booked занята"""
+    first_day = availability_index.day_number(date.today())
+    doctors = np.arange(1, args.doctors + 1, dtype=np.int64)
+    days = np.arange(first_day, first_day + args.days, dtype=np.int64)
+    starts = 9 * 60 + np.arange(args.slots_per_day, dtype=np.int64) * args.slot_minutes
+
+    doctor, day, start = (grid.ravel() for grid in np.meshgrid(doctors, days, starts, indexing="ij"))
+    total = len(doctor)
+
+    slots = availability_index.Slots(
+        id=np.arange(1, total + 1),
+        doctor=doctor,
+        office=doctor,  # у каждого врача свой кабинет
+        day=day,
+        start=start,
+        end=start + args.slot_minutes,
+        free=rng.random(total) >= args.booked,
+    )
+    specializations = {int(d): int(d) % args.specializations + 1 for d in doctors}
+    return slots, specializations
+
+
+def percentiles(samples):
+    samples = np.array(samples) * 1000
+    return f"p50 {np.percentile(samples, 50):.2f} ms, p99 {np.percentile(samples, 99):.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--doctors", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--slots-per-day", type=int, default=16)
+    parser.add_argument("--slot-minutes", type=int, default=30)
+    parser.add_argument("--specializations", type=int, default=20)
+    parser.add_argument("--booked", type=float, default=0.5, help="доля занятых слотов")
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    slots, specializations = make_slots(args, rng)
+    index = availability_index.AvailabilityIndex()
+
+    started = time.perf_counter()
+    index.load(slots, specializations)
+    load_time = time.perf_counter() - started
+
+    stats = index.stats()
+    print(f"{args.doctors} врачей x {args.days} дней: {stats['slots']} слотов, свободно {stats['free']}")
+    print(f"сборка из массивов: {load_time:.2f} s, память: {stats['memory_bytes'] / 2**20:.1f} МиБ")
+
+    today = date.today()
+    scenarios = {
+        "специализация, 14 дней": dict(date_from=today, date_to=today + timedelta(days=13)),
+        "специализация, 14 дней, 14:00-17:00": dict(
+            date_from=today, date_to=today + timedelta(days=13), time_from=dtime(14), time_to=dtime(17)
+        ),
+        "специализация, через полгода": dict(
+            date_from=today + timedelta(days=180), date_to=today + timedelta(days=193)
+        ),
+        "врач, весь год": dict(date_from=today, date_to=today + timedelta(days=args.days)),
+    }
+    for name, window in scenarios.items():
+        samples = []
+        for i in range(args.queries):
+            query = dict(window, limit=51)
+            if name.startswith("врач"):
+                query["doctor_id"] = i % args.doctors + 1
+            else:
+                query["specialization_id"] = i % args.specializations + 1
+            started = time.perf_counter()
+            index.search(**query)
+            samples.append(time.perf_counter() - started)
+        print(f"поиск ({name}): {percentiles(samples)}")
+
+    ids = rng.integers(1, len(slots) + 1, size=args.queries)
+    started = time.perf_counter()
+    for schedule_id in ids:
+        index.set_free([int(schedule_id)], False)
+        index.set_free([int(schedule_id)], True)
+    update_time = time.perf_counter() - started
+    print(f"бронирование + отмена: {update_time / args.queries * 1e6:.1f} мкс на пару")
+
+    # новые слоты попадают в хвост; последний шаг запускает фоновое слияние с основным блоком
+    next_id = len(slots) + 1
+    batch = args.slots_per_day * 90
+    samples = []
+    while len(index._pending) < availability_index.COMPACT_PENDING:
+        new_slots = slots.take(np.arange(batch))
+        new_slots.id = np.arange(next_id, next_id + batch, dtype=np.int64)
+        new_slots.day = new_slots.day + args.days
+        next_id += batch
+        started = time.perf_counter()
+        index.add(new_slots, {})
+        samples.append(time.perf_counter() - started)
+    while index.compactions == 0:
+        time.sleep(0.01)
+    print(f"добавление {batch} слотов: p50 {np.median(samples) * 1000:.2f} ms, "
+          f"max {max(samples) * 1000:.2f} ms (с запуском слияния), "
+          f"слияние хвоста в фоне: {index.last_compaction_seconds:.2f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Стресс-тест записи на прием: сотни одновременных попыток занять один слот
+через booking.book_slot (каждая - в своём потоке и своей сессии).
+Проверяет, что запись получил ровно один пациент, остальные - 409,
+и печатает пропускную способность (решений о записи в секунду).
+
+Запуск из project/app на базе с будущим слотом и пациентами:
+    python -m benchmarks.bench_booking --schedule-id 42 --attempts 300 --connections 50
+
+После прогона слот и созданная запись возвращаются в исходное состояние
+(--keep оставляет результат).
+"""
+
+import argparse
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import database, models, booking
+
+
+def attempt(session_factory, barrier, patient_id, schedule_id):
+    barrier.wait()
+    db = session_factory()
+    started = time.perf_counter()
+    try:
+        booking.book_slot(db, patient_id, schedule_id)
+        outcome = 201
+    except HTTPException as e:
+        outcome = e.status_code
+    finally:
+        db.close()
+    return outcome, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--schedule-id", type=int, required=True)
+    parser.add_argument("--attempts", type=int, default=300)
+    parser.add_argument("--connections", type=int, default=50,
+                        help="размер пула соединений теста (не больше max_connections Postgres)")
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+
+    engine = create_engine(
+        database.SQLALCHEMY_DATABASE_URL,
+        pool_size=args.connections,
+        max_overflow=0,
+        pool_timeout=300
+    )
+    session_factory = sessionmaker(autoflush=False, bind=engine)
+
+    db = session_factory()
+    try:
+        schedule = db.query(models.Schedule).filter(models.Schedule.id == args.schedule_id).first()
+        if schedule is None:
+            raise SystemExit(f"Слот {args.schedule_id} не найден")
+        if not schedule.is_available:
+            raise SystemExit(f"Слот {args.schedule_id} уже занят")
+
+        existing_ids = {row.id for row in db.query(models.Appointment.id)
+                        .filter(models.Appointment.schedule_id == args.schedule_id)}
+        patient_ids = [row.id for row in db.query(models.Patient.id).limit(args.attempts).all()]
+    finally:
+        db.close()
+
+    if not patient_ids:
+        raise SystemExit("В базе нет пациентов")
+
+    # пациентов может быть меньше попыток - тогда часть попыток повторяет пациента
+    patients = [patient_ids[i % len(patient_ids)] for i in range(args.attempts)]
+    barrier = threading.Barrier(args.attempts)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.attempts) as executor:
+        results = list(executor.map(
+            lambda patient_id: attempt(session_factory, barrier, patient_id, args.schedule_id),
+            patients
+        ))
+    elapsed = time.perf_counter() - started
+
+    outcomes = Counter(outcome for outcome, _ in results)
+    latencies = sorted(latency for _, latency in results)
+
+    print(f"попыток: {args.attempts}, соединений: {args.connections}")
+    print(f"исходы: {dict(outcomes)}")
+    print(f"пропускная способность: {args.attempts / elapsed:.1f} решений/с за {elapsed:.3f} с")
+    print(f"латентность: p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+          f"max {latencies[-1] * 1000:.1f} ms")
+
+    db = session_factory()
+    try:
+        appointments = db.query(models.Appointment)\
+            .filter(
+                models.Appointment.schedule_id == args.schedule_id,
+                models.Appointment.id.notin_(existing_ids)
+            )\
+            .all()
+        schedule = db.query(models.Schedule).filter(models.Schedule.id == args.schedule_id).one()
+
+        assert outcomes[201] == 1, f"успешных записей {outcomes[201]}, ожидалась одна"
+        assert len(appointments) == 1, f"новых записей на слот в базе {len(appointments)}, ожидалась одна"
+        assert not schedule.is_available, "слот остался свободным"
+        print("OK: слот занят ровно одним пациентом")
+
+        if not args.keep:
+            for appointment in appointments:
+                db.delete(appointment)
+            schedule.is_available = True
+            db.commit()
+    finally:
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
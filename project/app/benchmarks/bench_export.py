@@ -0,0 +1,116 @@
+"""
+Потолок памяти потоковой выгрузки (export.iter_rows) в сравнении со сборкой
+всего списка в памяти (как делал /api/admin/patients до пагинации).
+
+Запуск из project/app:
+    python -m benchmarks.bench_export --seed 1000000 --format csv
+    python -m benchmarks.bench_export --compare-list --cleanup
+
+--seed добавляет синтетических пациентов (email export-bench-N@example.com),
+--cleanup удаляет их после замера.
+"""
+
+import argparse
+import json
+import resource
+import sys
+import time
+import tracemalloc
+
+from sqlalchemy import text
+
+import database, export, models, schemas
+
+SEED_SQL = text("""
+    INSERT INTO patient (first_name, last_name, patronymic, gender, passport_number,
+                         insurance_number, phone_number, birth_date, email, password)
+    SELECT 'Bench', 'Export', 'Row', 'male', 'EXPB' || g, 'EXPI' || g,
+           '79' || lpad(g::text, 9, '0'), DATE '1990-01-01',
+           'export-bench-' || g || '@example.com', 'x'
+    FROM generate_series(1, :count) AS g
+""")
+
+CLEANUP_SQL = text("DELETE FROM patient WHERE email LIKE 'export-bench-%@example.com'")
+
+
+def max_rss_mib() -> float:
+    # ru_maxrss: КиБ в Linux, байты в macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        max_rss //= 1024
+    return max_rss / 1024
+
+
+def execute(statement, **params):
+    db = database.SessionLocal()
+    try:
+        db.execute(statement, params)
+        db.commit()
+    finally:
+        db.close()
+
+
+def measure(name, produce):
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows, size = produce()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:>7}: {rows} строк, {size / 2**20:.1f} MiB за {elapsed:.2f} с, "
+          f"пик Python-аллокаций {peak / 2**20:.1f} MiB, max rss {max_rss_mib():.1f} MiB")
+
+
+def stream_export(fmt):
+    def produce():
+        statement = export.patients_statement().with_only_columns(*export.PATIENT_COLUMNS.values())
+        rows = 0
+        size = 0
+        for chunk in export.iter_rows(statement, list(export.PATIENT_COLUMNS), fmt):
+            rows += chunk.count("\n")
+            size += len(chunk.encode())
+        # строка заголовка CSV
+        return rows - (1 if fmt == "csv" else 0), size
+    return produce
+
+
+def list_export():
+    db = database.SessionLocal()
+    try:
+        patients = db.query(models.Patient).all()
+        body = json.dumps(
+            [schemas.PatientResponse.model_validate(p, from_attributes=True).model_dump(mode="json")
+             for p in patients]
+        )
+        return len(patients), len(body.encode())
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed", type=int, default=0, help="сколько синтетических пациентов добавить")
+    parser.add_argument("--format", choices=list(export.FORMATS), default="ndjson")
+    parser.add_argument("--compare-list", action="store_true",
+                        help="после потоковой выгрузки собрать весь список в памяти")
+    parser.add_argument("--cleanup", action="store_true")
+    args = parser.parse_args()
+
+    if args.seed:
+        started = time.perf_counter()
+        execute(SEED_SQL, count=args.seed)
+        print(f"добавлено {args.seed} пациентов за {time.perf_counter() - started:.1f} с")
+
+    try:
+        # потоковая выгрузка первой: max rss процесса только растёт
+        measure("stream", stream_export(args.format))
+        if args.compare_list:
+            measure("list", list_export)
+    finally:
+        if args.cleanup:
+            execute(CLEANUP_SQL)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Проверка назначения по графу противопоказаний (interaction_graph) на синтетическом
+справочнике: время полной проверки назначения из N лекарств против M активных
+лекарств пациента (то, что делает POST /appointments/{id}/medicaments) без БД,
+и пакет проверок POST /prescriptions/check с текстами конфликтов (--batch).
+
+Запуск из project/app:
+    python -m benchmarks.bench_interactions --medicaments 5000 --pairs 50000
+    python -m benchmarks.bench_interactions --prescription 10 --active 8
+    python -m benchmarks.bench_interactions --batch 5000
+"""
+
+import argparse
+import random
+import time
+from collections import defaultdict, namedtuple
+from datetime import date, timedelta
+
+import interaction_graph
+from routers import doctor
+
+# строка активного назначения, как её возвращает запрос check_prescriptions
+ActiveRow = namedtuple("ActiveRow", "patient_id medicament_id start_date end_date")
+
+
+def make_graph(args, rng):
+    interactions = defaultdict(set)
+    for _ in range(args.pairs):
+        a, b = rng.sample(range(1, args.medicaments + 1), 2)
+        interactions[a].add(b)
+        interactions[b].add(a)
+
+    return interaction_graph.InteractionGraph(
+        version=0,
+        names={i: f"Medicament{i}" for i in range(1, args.medicaments + 1)},
+        interactions={i: frozenset(ids) for i, ids in interactions.items()},
+        other={},
+    )
+
+
+def check(graph, prescription, active):
+    """Те же проверки, что в эндпоинте: с активными и между новыми лекарствами"""
+    conflicts = 0
+    for medicament_id in prescription:
+        conflicts += len(graph.interacting(medicament_id, active))
+        conflicts += len(graph.interacting(medicament_id, prescription))
+    return conflicts
+
+
+def batch(graph, args, rng):
+    """Проверка пакета из args.batch кандидатов: тот же цикл, что в check_prescriptions"""
+    today = date.today()
+    patients = {}
+    for patient_id in range(1, args.batch + 1):
+        active = {}
+        for medicament_id in rng.sample(range(1, args.medicaments + 1), args.active):
+            active[medicament_id] = ActiveRow(patient_id, medicament_id, today - timedelta(days=30), None)
+        contraindicated = set(rng.sample(range(1, args.medicaments + 1), 3))
+        prescription = dict.fromkeys(rng.sample(range(1, args.medicaments + 1), args.prescription))
+        patients[patient_id] = (active, contraindicated, prescription)
+
+    started = time.perf_counter()
+    conflicts = 0
+    for active, contraindicated, prescription in patients.values():
+        for medicament_id in prescription:
+            if doctor._conflict_reasons(graph, medicament_id, prescription, active, contraindicated, today):
+                conflicts += 1
+    elapsed = time.perf_counter() - started
+
+    print(f"пакет {args.batch} проверок по {args.prescription} лекарств: {elapsed * 1000:.1f} ms "
+          f"(лекарств с конфликтами {conflicts})")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--medicaments", type=int, default=5000)
+    parser.add_argument("--pairs", type=int, default=50000)
+    parser.add_argument("--prescription", type=int, default=10)
+    parser.add_argument("--active", type=int, default=8)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=0, help="размер пакета POST /prescriptions/check")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    graph = make_graph(args, rng)
+    if args.batch:
+        batch(graph, args, rng)
+        return
+    cases = [
+        (set(rng.sample(range(1, args.medicaments + 1), args.prescription)),
+         set(rng.sample(range(1, args.medicaments + 1), args.active)))
+        for _ in range(100)
+    ]
+
+    started = time.perf_counter()
+    conflicts = 0
+    for i in range(args.iterations):
+        prescription, active = cases[i % len(cases)]
+        conflicts += check(graph, prescription, active)
+    elapsed = time.perf_counter() - started
+
+    print(f"справочник: {args.medicaments} медикаментов, {args.pairs} взаимодействий")
+    print(f"назначение {args.prescription} лекарств против {args.active} активных: "
+          f"{elapsed / args.iterations * 1e6:.1f} мкс на проверку "
+          f"(конфликтов в среднем {conflicts / args.iterations:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Стоимость проверки JWT на запрос: полный jwt.decode против попадания в oauth2.token_cache.
+База данных не нужна.
+
+Запуск из project/app:
+    python -m benchmarks.bench_jwt --iterations 20000
+"""
+
+import argparse
+import time
+
+from fastapi import HTTPException
+import oauth2
+
+
+def per_call_us(func, iterations: int) -> float:
+    started = time.process_time()
+    for _ in range(iterations):
+        func()
+    return (time.process_time() - started) / iterations * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    token = oauth2.create_access_token({"user_id": 1, "user_type": "doctor", "profile_id": 1})
+    credentials_exception = HTTPException(status_code=401)
+
+    def uncached():
+        oauth2.revoke_token(token)
+        oauth2.verify_access_token(token, credentials_exception)
+
+    def cached():
+        oauth2.verify_access_token(token, credentials_exception)
+
+    cached()  # прогрев кэша
+    uncached_us = per_call_us(uncached, args.iterations)
+    cached_us = per_call_us(cached, args.iterations)
+
+    print(f"jwt.decode:   {uncached_us:8.1f} us CPU на запрос")
+    print(f"token_cache:  {cached_us:8.1f} us CPU на запрос")
+    print(f"экономия:     {uncached_us - cached_us:8.1f} us CPU на запрос "
+          f"({uncached_us / cached_us:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Отчёт о лекарствах пациента: движок "sql" (medication_report, один запрос с
+json_agg) против "cache" (patient_profile) - сборка профиля без кэша, повторный
+просмотр из кэша и один SQL-запрос. Перед замером отчёты обоих движков
+сравниваются для каждого пациента; расхождение завершает скрипт с кодом 1.
+
+Запуск из project/app (нужна БД из .env):
+    python -m benchmarks.bench_medication_report
+    python -m benchmarks.bench_medication_report --sizes 1 2 10 50 200 --medicaments 2000 --pairs 20000
+
+Синтетические медикаменты, противопоказания и пациенты (префикс mrb-)
+удаляются после замера.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+
+import catalog, database, interaction_graph, medication_report, models, patient_profile
+
+PREFIX = "mrb-"
+OTHER_KEY = "forbidden_activities"
+
+
+def seed(db, args, rng):
+    medicaments = [models.Medicament(name=f"{PREFIX}{i}") for i in range(args.medicaments)]
+    others = [models.OtherContraindication(name=f"{PREFIX}other-{i}") for i in range(20)]
+    db.add_all(medicaments + others)
+    db.flush()
+    medicament_ids = [m.id for m in medicaments]
+
+    pairs = set()
+    while len(pairs) < args.pairs:
+        a, b = rng.sample(medicament_ids, 2)
+        pairs.add((min(a, b), max(a, b)))
+    db.add_all(
+        models.MedicamentMedicamentContraindication(medication_first_id=a, medication_second_id=b)
+        for a, b in pairs
+    )
+
+    patients = {}
+    for size in args.sizes:
+        patient = models.Patient(
+            first_name="Bench", last_name="Report", patronymic=str(size), gender="male",
+            passport_number=f"{PREFIX}p{size}", insurance_number=f"{PREFIX}i{size}",
+            phone_number=f"{PREFIX}{size}", birth_date=date(1990, 1, 1),
+            email=f"{PREFIX}{size}@example.com", password="x"
+        )
+        db.add(patient)
+        db.flush()
+        patients[size] = patient
+
+        prescribed = rng.sample(medicament_ids, size)
+        start = date.today() - timedelta(days=365)
+        db.add_all(
+            models.PatientMedicament(
+                patient_id=patient.id, medicament_id=medicament_id,
+                dosage="10 mg", frequency="1 раз в день",
+                # повторяющиеся даты проверяют порядок при равном start_date
+                start_date=start + timedelta(days=i // 3),
+                end_date=start + timedelta(days=400) if i % 2 else None,
+                notes=None if i % 4 else "синтетика"
+            )
+            for i, medicament_id in enumerate(prescribed)
+        )
+        db.add_all(
+            models.PatientMedicamentContraindication(patient_id=patient.id, medicament_id=medicament_id)
+            for medicament_id in rng.sample(sorted(set(medicament_ids) - set(prescribed)), 3)
+        )
+        db.add_all(
+            models.PatientOtherContraindication(patient_id=patient.id, contraindication_id=other.id)
+            for other in rng.sample(others, 3)
+        )
+
+    db.commit()
+    return patients
+
+
+def cleanup(db):
+    patient_ids = db.query(models.Patient.id).filter(models.Patient.email.like(f"{PREFIX}%")).subquery()
+    medicament_ids = db.query(models.Medicament.id).filter(models.Medicament.name.like(f"{PREFIX}%")).subquery()
+    db.query(models.PatientOtherContraindication)\
+        .filter(models.PatientOtherContraindication.patient_id.in_(patient_ids))\
+        .delete(synchronize_session=False)
+    db.query(models.PatientMedicamentContraindication)\
+        .filter(models.PatientMedicamentContraindication.patient_id.in_(patient_ids))\
+        .delete(synchronize_session=False)
+    db.query(models.PatientMedicament)\
+        .filter(models.PatientMedicament.patient_id.in_(patient_ids))\
+        .delete(synchronize_session=False)
+    db.query(models.Patient).filter(models.Patient.email.like(f"{PREFIX}%")).delete(synchronize_session=False)
+    db.query(models.MedicamentMedicamentContraindication)\
+        .filter(models.MedicamentMedicamentContraindication.medication_first_id.in_(medicament_ids))\
+        .delete(synchronize_session=False)
+    db.query(models.Medicament).filter(models.Medicament.name.like(f"{PREFIX}%")).delete(synchronize_session=False)
+    db.query(models.OtherContraindication)\
+        .filter(models.OtherContraindication.name.like(f"{PREFIX}%"))\
+        .delete(synchronize_session=False)
+    db.commit()
+
+
+def profile_report(db, patient) -> dict:
+    """Отчёт движка "cache" в том виде, в каком его строит GET /api/patient/medication"""
+    versions = db.query(models.Patient.profile_version, catalog.version_column())\
+        .filter(models.Patient.id == patient.id)\
+        .one()
+    profile = patient_profile.get(db, patient.id, versions.profile_version, versions.catalog_version)
+    return {
+        "patient_info": {
+            "id": patient.id,
+            "full_name": f"{patient.last_name} {patient.first_name} {patient.patronymic}",
+            "birth_date": patient.birth_date
+        },
+        "current_medicaments": profile.current_medicaments(),
+        "forbidden_medicaments": profile.forbidden_medicaments,
+        OTHER_KEY: profile.other_contraindications
+    }
+
+
+def timed(produce, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        produce()
+        samples.append(time.perf_counter() - started)
+    return np.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 5, 10, 20, 50, 100, 200],
+                        help="число назначений у синтетических пациентов")
+    parser.add_argument("--medicaments", type=int, default=1000)
+    parser.add_argument("--pairs", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    db = database.SessionLocal()
+    try:
+        cleanup(db)
+        patients = seed(db, args, rng)
+        interaction_graph.bump()
+
+        mismatches = 0
+        for size, patient in patients.items():
+            expected = jsonable_encoder(profile_report(db, patient))
+            actual = json.loads(medication_report.fetch(db, patient.id, OTHER_KEY))
+            if actual != expected:
+                mismatches += 1
+                print(f"{size} назначений: отчёты различаются")
+                for key in expected:
+                    if actual.get(key) != expected[key]:
+                        print(f"  {key}:\n    cache {expected[key]}\n    sql   {actual.get(key)}")
+        if mismatches:
+            sys.exit(1)
+        print(f"отчёты совпадают для {len(patients)} пациентов")
+
+        print(f"{'назначений':>10} {'сборка':>10} {'кэш':>10} {'sql':>10}  (медиана, ms)")
+        catalog_version = catalog.current_version(db)
+        for size, patient in patients.items():
+            build = timed(lambda: patient_profile._build(db, patient.id, catalog_version), args.repeat)
+            cached = timed(lambda: profile_report(db, patient), args.repeat)
+            sql = timed(lambda: medication_report.fetch(db, patient.id, OTHER_KEY), args.repeat)
+            print(f"{size:>10} {build:>10.2f} {cached:>10.2f} {sql:>10.2f}")
+    finally:
+        db.rollback()
+        cleanup(db)
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Векторная часть аудита полипрагмазии (polypharmacy_audit.screen) на синтетических
+данных без БД: матрицы инцидентности диапазонов пациентов и поиск
+взаимодействующих пар и прямых противопоказаний. Проверяет, что проход по всей
+популяции укладывается в минуты; чтение строк из БД сюда не входит.
+
+Запуск из project/app:
+    python -m benchmarks.bench_polypharmacy --patients 2000000
+    python -m benchmarks.bench_polypharmacy --patients 2000000 --active 8 --chunk 100000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+import polypharmacy_audit
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--patients", type=int, default=2_000_000)
+    parser.add_argument("--medicaments", type=int, default=5000)
+    parser.add_argument("--pairs", type=int, default=50000)
+    parser.add_argument("--active", type=int, default=4, help="среднее число активных назначений")
+    parser.add_argument("--contraindications", type=float, default=0.5,
+                        help="среднее число прямых противопоказаний")
+    parser.add_argument("--chunk", type=int, default=50000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    size = args.medicaments + 1
+    a = rng.integers(1, size, args.pairs)
+    b = rng.integers(1, size, args.pairs)
+    distinct = a != b
+    interactions = polypharmacy_audit.interaction_matrix(
+        np.minimum(a, b)[distinct], np.maximum(a, b)[distinct], size
+    )
+    interactions.data[:] = 1
+
+    build = screen = 0.0
+    pairs = direct = flagged = 0
+    for low in range(0, args.patients, args.chunk):
+        count = min(args.chunk, args.patients - low)
+        prescriptions = rng.poisson(args.active, count)
+        contraindications = rng.poisson(args.contraindications, count)
+
+        started = time.perf_counter()
+        shape = (args.chunk, size)
+        active = polypharmacy_audit.incidence(
+            np.repeat(np.arange(count), prescriptions),
+            rng.integers(1, size, prescriptions.sum()),
+            shape
+        )
+        contraindicated = polypharmacy_audit.incidence(
+            np.repeat(np.arange(count), contraindications),
+            rng.integers(1, size, contraindications.sum()),
+            shape
+        )
+        built = time.perf_counter()
+        (pair_rows, _, _), (direct_rows, _) = polypharmacy_audit.screen(active, contraindicated, interactions)
+        finished = time.perf_counter()
+
+        build += built - started
+        screen += finished - built
+        pairs += len(pair_rows)
+        direct += len(direct_rows)
+        flagged += len(np.union1d(pair_rows, direct_rows))
+
+    print(f"{args.patients} пациентов, {args.medicaments} медикаментов, "
+          f"{interactions.nnz} взаимодействий, диапазоны по {args.chunk}")
+    print(f"матрицы инцидентности: {build:.1f} s, поиск: {screen:.1f} s")
+    print(f"отмечено пациентов: {flagged} (пар взаимодействия {pairs}, противопоказаний {direct})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Сравнение определения текущего пациента/врача: старый путь (users, затем patient/doctor),
+один JOIN-запрос из oauth2.get_current_patient/get_current_doctor и попадание в principal_cache.
+
+Запуск из project/app на базе с данными:
+    python -m benchmarks.bench_principal --iterations 2000
+"""
+
+import argparse
+import time
+import statistics
+
+import database, models, oauth2, schemas
+
+
+def legacy_lookup(db, token_data, model):
+    user = db.query(models.User).filter(models.User.id == token_data.id).first()
+    return db.query(model).filter(model.user_id == user.id).first()
+
+
+def joined_lookup(db, token_data, model):
+    oauth2.invalidate_principal(token_data.id)
+    return oauth2._get_profile(db, model, token_data)
+
+
+def cached_lookup(db, token_data, model):
+    return oauth2._get_profile(db, model, token_data)
+
+
+def measure(lookup, token_data, model, iterations):
+    timings = []
+    db = database.SessionLocal()
+    try:
+        for _ in range(iterations):
+            started = time.perf_counter()
+            lookup(db, token_data, model)
+            timings.append(time.perf_counter() - started)
+            # каждая итерация - отдельный запрос, без identity map предыдущей
+            db.expunge_all()
+    finally:
+        db.close()
+    return timings
+
+
+def report(name, timings):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{name:>8}: mean {statistics.mean(timings) * 1000:.3f} ms, "
+          f"p50 {statistics.median(timings) * 1000:.3f} ms, p95 {p95 * 1000:.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--role", choices=["patient", "doctor"], default="patient")
+    args = parser.parse_args()
+
+    model = models.Patient if args.role == "patient" else models.Doctor
+
+    db = database.SessionLocal()
+    try:
+        profile = db.query(model).filter(model.user_id.isnot(None)).first()
+    finally:
+        db.close()
+
+    if profile is None:
+        raise SystemExit(f"В базе нет ни одного профиля с ролью {args.role}")
+
+    token_data = schemas.TokenData(id=str(profile.user_id), user_type=args.role, profile_id=profile.id)
+
+    legacy = measure(legacy_lookup, token_data, model, args.iterations)
+    joined = measure(joined_lookup, token_data, model, args.iterations)
+    cached = measure(cached_lookup, token_data, model, args.iterations)
+
+    report("legacy", legacy)
+    report("joined", joined)
+    report("cached", cached)
+    for name, timings in (("joined", joined), ("cached", cached)):
+        saved = statistics.mean(legacy) - statistics.mean(timings)
+        print(f"экономия на запрос ({name}): {saved * 1000:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
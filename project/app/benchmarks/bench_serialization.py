@@ -0,0 +1,108 @@
+"""
+Сериализация списков на 10k строк: стандартный путь FastAPI (response_model +
+JSONResponse), тот же путь с ORJSONResponse и serialization.list_response
+(закэшированный TypeAdapter, один проход pydantic-core до байтов).
+
+Строки - объекты с атрибутами, как ORM-экземпляры с загруженными связями; база не нужна.
+
+Запуск из project/app:
+    python -m benchmarks.bench_serialization --rows 10000 --repeat 5
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import date, datetime, time as dtime, timezone
+from types import SimpleNamespace
+from typing import List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+import schemas, serialization
+
+
+def make_schedule(i):
+    specialization = SimpleNamespace(id=1, name="Therapist", description="General practice")
+    doctor = SimpleNamespace(id=i % 50, first_name="Ivan", last_name="Petrov",
+                             patronymic="Sergeevich", specialization=specialization)
+    return SimpleNamespace(
+        id=i, office=SimpleNamespace(id=i % 20, number=str(100 + i % 20)),
+        date=date(2026, 1, 1), start_time=dtime(9), end_time=dtime(9, 30),
+        doctor=doctor, is_available=bool(i % 2)
+    )
+
+
+def make_appointment(i):
+    patient = SimpleNamespace(
+        id=i, first_name="Anna", last_name="Smirnova", patronymic="Olegovna", gender="female",
+        birth_date=date(1990, 5, 17), phone_number="79990000000", email=f"patient{i}@example.com"
+    )
+    return SimpleNamespace(schedule=make_schedule(i), patient=patient,
+                           information="Осмотр", status="scheduled", id=i)
+
+
+def make_prescription(i):
+    return SimpleNamespace(
+        id=i, patient_id=i % 1000, medicament_id=i % 300, dosage="10 mg", frequency="2/day",
+        start_date=date(2026, 1, 1), end_date=None, notes=None,
+        created_at=datetime(2026, 1, 1, tzinfo=timezone.utc)
+    )
+
+
+CASES = {
+    "ScheduleResponse": (schemas.ScheduleResponse, make_schedule),
+    "AppointmentResponse": (schemas.AppointmentResponse, make_appointment),
+    "PatientMedicamentResponse": (schemas.PatientMedicamentResponse, make_prescription),
+}
+
+
+def fastapi_path(response_class):
+    def run(schema, rows):
+        field = create_model_field(name="response", type_=List[schema], mode="serialization")
+        content = asyncio.run(serialize_response(field=field, response_content=rows))
+        return response_class(content).body
+    return run
+
+
+def adapter_path(schema, rows):
+    return serialization.list_response(schema, rows).body
+
+
+def measure(run, schema, rows, repeat):
+    run(schema, rows)  # прогрев (построение схем/адаптеров)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = run(schema, rows)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    paths = {
+        "json": fastapi_path(JSONResponse),
+        "orjson": fastapi_path(ORJSONResponse),
+        "adapter": adapter_path,
+    }
+
+    for name, (schema, factory) in CASES.items():
+        rows = [factory(i) for i in range(args.rows)]
+        print(f"{name} ({args.rows} строк):")
+        baseline = None
+        for path_name, run in paths.items():
+            elapsed, size = measure(run, schema, rows, args.repeat)
+            baseline = baseline or elapsed
+            print(f"  {path_name:>8}: {elapsed * 1000:8.1f} ms  {size / 2**20:6.2f} MiB  "
+                  f"x{baseline / elapsed:.2f}")
+
+
+if __name__ == "__main__":
+    main()
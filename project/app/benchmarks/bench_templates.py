@@ -0,0 +1,93 @@
+"""
+Генерация квартала слотов по шаблонам для N врачей: время векторного
+развёртывания (schedule_templates.expand/to_rows) и, с --db, время вставки
+одним executemany в одной транзакции (по умолчанию с откатом).
+
+Запуск из project/app:
+    python -m benchmarks.bench_templates --doctors 300 --days 91
+    python -m benchmarks.bench_templates --doctors 300 --db --doctor-id 1 --office-id 1
+
+С --db все шаблоны пишутся на одного врача и кабинет со сдвигом дат,
+чтобы не нарушать EXCLUDE-ограничения; --commit оставляет слоты в базе.
+"""
+
+import argparse
+import time
+from datetime import date, time as dtime, timedelta
+
+from sqlalchemy import insert
+
+import database, models, schemas, schedule_templates
+
+
+def make_templates(args):
+    start = date.today() + timedelta(days=1)
+    templates = []
+    for i in range(args.doctors):
+        # с --db каждый "врач" получает свой непересекающийся отрезок дат
+        date_from = start + timedelta(days=i * args.days) if args.db else start
+        templates.append(schemas.ScheduleTemplateCreate(
+            doctor_id=args.doctor_id if args.db else i + 1,
+            office_id=args.office_id if args.db else i + 1,
+            weekdays=[0, 1, 2, 3, 4],
+            start_time=dtime(9),
+            end_time=dtime(17),
+            slot_minutes=args.slot_minutes,
+            date_from=date_from,
+            date_to=date_from + timedelta(days=args.days - 1)
+        ))
+    return templates
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--doctors", type=int, default=300)
+    parser.add_argument("--days", type=int, default=91)
+    parser.add_argument("--slot-minutes", type=int, default=30)
+    parser.add_argument("--db", action="store_true", help="вставлять слоты в базу")
+    parser.add_argument("--doctor-id", type=int, default=1)
+    parser.add_argument("--office-id", type=int, default=1)
+    parser.add_argument("--commit", action="store_true")
+    args = parser.parse_args()
+
+    templates = make_templates(args)
+
+    started = time.perf_counter()
+    expanded = []
+    for template in templates:
+        starts, ends = schedule_templates.expand(template)
+        expanded.append((template, starts, ends))
+    expand_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    all_rows = [schedule_templates.to_rows(template, starts, ends) for template, starts, ends in expanded]
+    rows_time = time.perf_counter() - started
+
+    total = sum(len(rows) for rows in all_rows)
+    print(f"{args.doctors} шаблонов x {args.days} дней: {total} слотов")
+    print(f"развёртывание (NumPy): {expand_time * 1000:.1f} ms")
+    print(f"строки для INSERT:     {rows_time * 1000:.1f} ms")
+
+    if not args.db:
+        return
+
+    db = database.SessionLocal()
+    try:
+        started = time.perf_counter()
+        for rows in all_rows:
+            if args.commit:
+                schedule_templates.create_slots(db, rows)
+            else:
+                db.execute(insert(models.Schedule), rows)
+        insert_time = time.perf_counter() - started
+        if not args.commit:
+            db.rollback()
+    finally:
+        db.close()
+
+    print(f"вставка в БД:          {insert_time:.2f} s ({total / insert_time:.0f} слотов/с)"
+          + ("" if args.commit else ", откачено"))
+
+
+if __name__ == "__main__":
+    main()
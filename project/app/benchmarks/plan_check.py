@@ -0,0 +1,136 @@
+"""
+Проверка планов горячих запросов роутеров: EXPLAIN каждого запроса
+и ошибка, если в плане есть Seq Scan (индекс потерян или не подходит).
+
+Запросы выполняются с SET LOCAL enable_seqscan = off: на небольшой тестовой
+базе планировщик иначе честно выбрал бы полный просмотр, а так Seq Scan
+остаётся в плане только когда подходящего индекса нет.
+
+Запуск из project/app (после alembic upgrade head):
+    python -m benchmarks.plan_check
+    python -m benchmarks.plan_check --verbose
+Код возврата 1 - есть регрессии.
+"""
+
+import argparse
+import sys
+from datetime import date
+
+from sqlalchemy import select, text, tuple_, or_, exists
+from sqlalchemy.dialects import postgresql
+
+import database, models
+
+PAGE = 51
+SOME_ID = 1
+TODAY = date.today()
+
+
+def hot_queries():
+    """(роутер и эндпоинт, запрос) - параметры произвольные, важен только план"""
+    Schedule, Appointment = models.Schedule, models.Appointment
+    PatientMedicament = models.PatientMedicament
+    Interaction = models.MedicamentMedicamentContraindication
+
+    return [
+        ("patient /schedule/{doctor_id}",
+         select(Schedule.id).where(Schedule.doctor_id == SOME_ID)
+         .order_by(Schedule.date, Schedule.start_time)),
+        ("patient /slots/search (ближайшие свободные слоты специализации)",
+         select(Schedule.id).where(
+             Schedule.is_available,
+             tuple_(Schedule.date, Schedule.start_time) > tuple_(TODAY, text("'00:00'::time")),
+             Schedule.doctor_id.in_(select(models.Doctor.id).where(models.Doctor.specialization_id == SOME_ID))
+         ).order_by(Schedule.date, Schedule.start_time, Schedule.id).limit(PAGE)),
+        ("admin /schedule (пересечение в кабинете)",
+         select(Schedule.id).where(Schedule.office_id == SOME_ID, Schedule.date == TODAY)),
+        ("patient /appointments",
+         select(Appointment.id).join(Appointment.schedule)
+         .where(Appointment.patient_id == SOME_ID, Appointment.status == 'scheduled')),
+        ("doctor /appointments",
+         select(Appointment.id).join(Appointment.schedule)
+         .where(Schedule.doctor_id == SOME_ID)),
+        ("admin /appointments (страница)",
+         select(Appointment.id)
+         .where(tuple_(Appointment.created_at, Appointment.id) < tuple_(text("now()"), SOME_ID))
+         .order_by(Appointment.created_at.desc(), Appointment.id.desc()).limit(PAGE)),
+        ("patient POST /appointments/{schedule_id} (запись пациента на слот)",
+         select(exists().where(Appointment.patient_id == SOME_ID, Appointment.schedule_id == SOME_ID))),
+        ("admin DELETE /schedule (предстоящие приемы слота)",
+         select(Appointment.id).where(Appointment.schedule_id == SOME_ID, Appointment.status == 'scheduled')),
+        ("doctor /patients/{id}/medicaments",
+         select(PatientMedicament.id).where(PatientMedicament.patient_id == SOME_ID)
+         .order_by(PatientMedicament.start_date.desc())),
+        ("doctor /patients/{id}/medicaments/active",
+         select(PatientMedicament.id).where(
+             PatientMedicament.patient_id == SOME_ID,
+             or_(PatientMedicament.end_date.is_(None), PatientMedicament.end_date >= TODAY)
+         )),
+        ("doctor /my-prescriptions",
+         select(PatientMedicament.id).where(PatientMedicament.doctor_by_id == SOME_ID)
+         .order_by(PatientMedicament.created_at.desc(), PatientMedicament.id.desc()).limit(PAGE)),
+        ("doctor взаимодействия (первое лекарство)",
+         select(Interaction.medication_second_id).where(Interaction.medication_first_id == SOME_ID)),
+        ("doctor взаимодействия (второе лекарство)",
+         select(Interaction.medication_first_id).where(Interaction.medication_second_id == SOME_ID)),
+        ("doctor противопоказания лекарства",
+         select(models.MedicationContraindicationOther.medicament_id)
+         .where(models.MedicationContraindicationOther.contraindication_id == SOME_ID)),
+        ("admin /patients (страница)",
+         select(models.Patient.id)
+         .order_by(models.Patient.created_at.desc(), models.Patient.id.desc()).limit(PAGE)),
+        ("admin /doctors (страница)",
+         select(models.Doctor.id)
+         .order_by(models.Doctor.created_at.desc(), models.Doctor.id.desc()).limit(PAGE)),
+    ]
+
+
+def seq_scans(plan: dict):
+    """Таблицы, которые план читает полным просмотром"""
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+def node_summary(plan: dict):
+    name = plan.get("Index Name") or plan.get("Relation Name") or ""
+    yield f"{plan['Node Type']} {name}".strip()
+    for child in plan.get("Plans", []):
+        yield from node_summary(child)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    failures = 0
+    db = database.SessionLocal()
+    try:
+        for name, statement in hot_queries():
+            sql = str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+            db.execute(text("SET LOCAL enable_seqscan = off"))
+            plan = db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()[0]["Plan"]
+            db.rollback()
+
+            scanned = seq_scans(plan)
+            status = "FAIL" if scanned else "ok"
+            failures += bool(scanned)
+
+            print(f"[{status:>4}] {name}" + (f": Seq Scan {', '.join(scanned)}" if scanned else ""))
+            if args.verbose or scanned:
+                print("       " + " -> ".join(node_summary(plan)))
+    finally:
+        db.close()
+
+    if failures:
+        print(f"Регрессий плана: {failures}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Запись пациента на слот расписания.
+
+Слот занимается одним условным UPDATE ... WHERE is_available RETURNING в той же
+транзакции, что и вставка записи: из одновременных запросов на один слот строку
+меняет ровно один, остальные получают 409 без гонки "прочитал - проверил - записал".
+Отмена так же условна: слот освобождается, только если запись действительно
+перешла из 'scheduled' в 'cancelled' в этой транзакции.
+"""
+
+from fastapi import HTTPException, status
+from sqlalchemy import update, select, exists, func
+from sqlalchemy.orm import Session
+import models, availability_index, schedule_cache
+
+
+def _patient_has_appointment(patient_id: int, schedule_id: int):
+    return exists().where(
+        models.Appointment.patient_id == patient_id,
+        models.Appointment.schedule_id == schedule_id
+    )
+
+
+def _booking_error(db: Session, patient_id: int, schedule_id: int) -> HTTPException:
+    """Почему слот не удалось занять (один диагностический запрос)"""
+    row = db.execute(
+        select(
+            models.Schedule.is_available,
+            models.Schedule.date < func.current_date(),
+            _patient_has_appointment(patient_id, schedule_id)
+        ).where(models.Schedule.id == schedule_id)
+    ).first()
+
+    if row is None:
+        return HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Расписание не найдено"
+        )
+
+    is_available, in_past, has_appointment = row
+
+    if in_past:
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Нельзя записаться на прошедшую дату"
+        )
+
+    if has_appointment:
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="У вас уже есть запись на это время"
+        )
+
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Данное время уже занято"
+    )
+
+
+def book_slot(db: Session, patient_id: int, schedule_id: int) -> int:
+    """
+    Занять слот и создать запись на прием (с фиксацией транзакции), вернуть id записи.
+    Слот занимается только если он свободен, не в прошлом и у пациента
+    ещё нет записи на него; иначе - HTTPException (404/400/409).
+    """
+    booked = db.execute(
+        update(models.Schedule)
+        .where(
+            models.Schedule.id == schedule_id,
+            models.Schedule.is_available.is_(True),
+            models.Schedule.date >= func.current_date(),
+            ~_patient_has_appointment(patient_id, schedule_id)
+        )
+        .values(is_available=False)
+        .returning(models.Schedule.doctor_id, models.Schedule.date)
+        .execution_options(synchronize_session=False)
+    ).first()
+
+    if booked is None:
+        error = _booking_error(db, patient_id, schedule_id)
+        db.rollback()
+        raise error
+
+    db_appointment = models.Appointment(
+        patient_id=patient_id,
+        schedule_id=schedule_id,
+        status='scheduled'
+    )
+    db.add(db_appointment)
+    db.flush()
+    appointment_id = db_appointment.id
+    db.commit()
+    availability_index.slot_booked(schedule_id)
+    schedule_cache.invalidate(booked.doctor_id, booked.date)
+
+    return appointment_id
+
+
+def release_slot(db: Session, appointment_id: int, patient_id: int):
+    """
+    Отменить запись пациента и освободить её слот (с фиксацией транзакции).
+    Повторная или одновременная отмена не меняет строку и получает 409: иначе
+    слот, уже занятый другим пациентом, снова стал бы свободным.
+    """
+    cancelled = db.execute(
+        update(models.Appointment)
+        .where(
+            models.Appointment.id == appointment_id,
+            models.Appointment.patient_id == patient_id,
+            models.Appointment.status == 'scheduled'
+        )
+        .values(status='cancelled')
+        .returning(models.Appointment.schedule_id)
+        .execution_options(synchronize_session=False)
+    ).first()
+
+    if cancelled is None:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Запись уже отменена или завершена"
+        )
+
+    released = db.execute(
+        update(models.Schedule)
+        .where(models.Schedule.id == cancelled.schedule_id)
+        .values(is_available=True)
+        .returning(models.Schedule.id, models.Schedule.doctor_id, models.Schedule.date)
+        .execution_options(synchronize_session=False)
+    ).first()
+    db.commit()
+
+    if released:
+        availability_index.slot_released(released.id)
+        schedule_cache.invalidate(released.doctor_id, released.date)
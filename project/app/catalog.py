@@ -0,0 +1,134 @@
+"""
+Снимок справочника для GET /api/doctor/catalog: медикаменты, противопоказания,
+взаимодействия и связи медикамент - противопоказание одним ответом.
+
+Версия справочника - строка catalog_version: каждая запись справочника
+(/medicaments, /contraindications, /interactions, /medication-contraindication)
+вызывает bump() в своей транзакции, поэтому версия растёт монотонно и общая для
+всех процессов. Версия - сильный ETag: при совпадении If-None-Match эндпоинт
+отвечает 304 после одного чтения версии. Снимок хранится в памяти процесса
+готовыми байтами JSON и их gzip-копией; у сжатого представления свой ETag
+("catalog-N-gz"), потому что его байты другие.
+"""
+
+import gzip
+
+import orjson
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+import cache, models
+from config import settings
+
+snapshot_cache = cache.TTLCache(
+    "catalog_snapshots",
+    maxsize=4,
+    ttl=settings.catalog_cache_ttl_seconds
+)
+
+
+class Snapshot:
+    """Снимок одной версии справочника: тело ответа и его сжатая копия"""
+
+    __slots__ = ("version", "body", "gzipped")
+
+    def __init__(self, version: int, body: bytes):
+        self.version = version
+        self.body = body
+        self.gzipped = gzip.compress(body, compresslevel=6)
+
+
+def bump(db: Session):
+    """Справочник меняется в текущей транзакции"""
+    db.execute(
+        update(models.CatalogVersion)
+        .where(models.CatalogVersion.id == 1)
+        .values(version=models.CatalogVersion.version + 1)
+    )
+
+
+def etag(version: int, gzipped: bool = False) -> str:
+    return f'"catalog-{version}-gz"' if gzipped else f'"catalog-{version}"'
+
+
+def accepts_gzip(accept_encoding) -> bool:
+    """Accept-Encoding разрешает gzip: q-значения учитываются, q=0 - отказ"""
+    if not accept_encoding:
+        return False
+    qualities = {}
+    for item in accept_encoding.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    # явное gzip важнее "*"
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+def version_column():
+    """Версия справочника подзапросом - читается в том же запросе, что и другие данные"""
+    return select(models.CatalogVersion.version)\
+        .where(models.CatalogVersion.id == 1)\
+        .scalar_subquery()\
+        .label("catalog_version")
+
+
+def current_version(db: Session) -> int:
+    return db.scalar(select(models.CatalogVersion.version).where(models.CatalogVersion.id == 1))
+
+
+def _build(db: Session, version: int) -> Snapshot:
+    # запросы читаются после версии: содержимое не старше version
+    medicaments = db.execute(
+        select(models.Medicament.id, models.Medicament.name).order_by(models.Medicament.name)
+    ).all()
+    contraindications = db.execute(
+        select(models.OtherContraindication.id, models.OtherContraindication.name)
+        .order_by(models.OtherContraindication.name)
+    ).all()
+    pair_table = models.MedicamentMedicamentContraindication
+    interactions = db.execute(
+        select(pair_table.medication_first_id, pair_table.medication_second_id)
+        .order_by(pair_table.medication_first_id, pair_table.medication_second_id)
+    ).all()
+    link_table = models.MedicationContraindicationOther
+    links = db.execute(
+        select(link_table.medicament_id, link_table.contraindication_id)
+        .order_by(link_table.medicament_id, link_table.contraindication_id)
+    ).all()
+
+    # пары - массивами id, названия берутся из medicaments и contraindications
+    body = orjson.dumps({
+        "version": version,
+        "medicaments": [{"id": id, "name": name} for id, name in medicaments],
+        "contraindications": [{"id": id, "name": name} for id, name in contraindications],
+        "interactions": [[first_id, second_id] for first_id, second_id in interactions],
+        "medication_contraindications": [[medicament_id, contraindication_id] for medicament_id, contraindication_id in links],
+    })
+    return Snapshot(version, body)
+
+
+def get(db: Session, version: int) -> Snapshot:
+    snapshot = snapshot_cache.get(version)
+    if snapshot is None:
+        snapshot = _build(db, version)
+        snapshot_cache.set(version, snapshot)
+    return snapshot
+
+
+def etag_matches(if_none_match, etag: str) -> bool:
+    """If-None-Match содержит etag (или *)"""
+    if not if_none_match:
+        return False
+    # If-None-Match сравнивается слабо: W/"catalog-N" тоже совпадает
+    candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings
+from typing import Literal, Optional
 import os
 from pathlib import Path
 
@@ -12,6 +13,65 @@ class Settings(BaseSettings):
     algorithm: str
     access_token_expire_minutes: int
 
+    # пул соединений database.engine
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30  # секунд ожидания свободного соединения
+    db_pool_recycle: int = 1800  # секунд жизни соединения, -1 - без ограничения
+    db_pool_pre_ping: bool = True
+    db_statement_timeout_ms: Optional[int] = None  # statement_timeout каждого соединения
+
+    # асинхронный режим: горячие эндпоинты чтения работают через AsyncSession (psycopg 3)
+    database_async: bool = False
+
+    # строгий режим БД: ленивые загрузки связей запрещены, бюджеты запросов обязательны
+    db_strict_mode: bool = False
+
+    # кэш текущих пользователей (oauth2.principal_cache)
+    principal_cache_size: int = 10000
+    principal_cache_ttl_seconds: int = 60
+
+    # кэш проверенных JWT (oauth2.token_cache), записи живут до exp токена
+    token_cache_size: int = 50000
+
+    # отдельный пул потоков для Argon2 (utils): число потоков и длина очереди до ответа 503
+    password_hash_workers: int = 2
+    password_hash_queue_limit: int = 32
+
+    # параметры Argon2 (None - значения passlib по умолчанию), подбираются benchmarks/bench_argon2.py;
+    # хеши со старыми параметрами пересчитываются при следующем успешном входе
+    argon2_time_cost: Optional[int] = None
+    argon2_memory_cost: Optional[int] = None  # КиБ
+    argon2_parallelism: Optional[int] = None
+
+    # индекс свободных слотов в памяти процесса (availability_index) и его пересборка в фоне
+    availability_index_enabled: bool = False
+    availability_index_max_age_seconds: int = 300
+
+    # недели расписания врачей (schedule_cache): TTL ограничивает устаревание между процессами
+    schedule_cache_size: int = 20000
+    schedule_cache_ttl_seconds: int = 30
+
+    # граф противопоказаний справочника (interaction_graph): пересборка не реже чем раз в TTL
+    interaction_graph_ttl_seconds: int = 60
+    # неизвестные графу id медикаментов вызывают пересборку не чаще раза в этот интервал
+    interaction_graph_unknown_rebuild_seconds: int = 5
+
+    # профили противопоказаний пациентов (patient_profile), версия - patient.profile_version
+    patient_profile_cache_size: int = 10000
+    patient_profile_cache_ttl_seconds: int = 600
+
+    # движок отчёта о лекарствах: "cache" - patient_profile, "sql" - один запрос (medication_report)
+    medication_report_engine: Literal["cache", "sql"] = "cache"
+
+    # ночной аудит полипрагмазии (polypharmacy_audit): пациентов в одном диапазоне id
+    polypharmacy_audit_chunk_patients: int = 50000
+    # запуск без прогресса дольше этого считается прерванным (процесс перезапущен)
+    polypharmacy_audit_stale_minutes: int = 30
+
+    # снимок справочника GET /api/doctor/catalog (catalog): версия в ключе, TTL - только уборка памяти
+    catalog_cache_ttl_seconds: int = 3600
+
     class Config:
         env_file="../.env"
 
@@ -1,14 +1,58 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 import config
+import db_metrics
 from config import settings
 
 try:
     SQLALCHEMY_DATABASE_URL = f'postgresql://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}'
     
-    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    connect_args = {}
+    if settings.db_statement_timeout_ms:
+        connect_args["options"] = f"-c statement_timeout={settings.db_statement_timeout_ms}"
+    
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        poolclass=db_metrics.InstrumentedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args=connect_args
+    )
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db_metrics.instrument(engine, SessionLocal)
+    
+    # Асинхронный движок (psycopg 3) для эндпоинтов, перенесённых на AsyncSession.
+    # Создаётся только в режиме DATABASE_ASYNC, свой пул с теми же настройками
+    async_engine = None
+    AsyncSessionLocal = None
+    
+    class AsyncBackedSession(Session):
+        """Синхронная сессия внутри AsyncSession - к ней подключаются события ORM"""
+    
+    if settings.database_async:
+        ASYNC_SQLALCHEMY_DATABASE_URL = f'postgresql+psycopg://{settings.database_username}:{settings.database_password}@{settings.database_hostname}:{settings.database_port}/{settings.database_name}'
+        
+        async_engine = create_async_engine(
+            ASYNC_SQLALCHEMY_DATABASE_URL,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=settings.db_pool_pre_ping,
+            connect_args=connect_args
+        )
+        AsyncSessionLocal = async_sessionmaker(
+            async_engine,
+            autoflush=False,
+            expire_on_commit=False,
+            sync_session_class=AsyncBackedSession
+        )
+        db_metrics.instrument(async_engine.sync_engine, AsyncBackedSession)
     
     Base = declarative_base()
     
@@ -27,4 +71,14 @@ def get_db():
         print(f"Ошибка в сессии БД: {e}")
         raise
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+#async dependency
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+        except Exception as e:
+            print(f"Ошибка в сессии БД: {e}")
+            raise
@@ -0,0 +1,245 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.orm import raiseload
+from starlette.middleware.base import BaseHTTPMiddleware
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Строгий режим: эндпоинт пытается выполнить запрос сверх объявленного бюджета"""
+
+
+class RequestStats:
+    """Статистика обращений к БД в рамках одного HTTP-запроса"""
+
+    __slots__ = ("queries", "rows", "db_time", "scope")
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.queries = 0
+        self.rows = 0
+        self.db_time = 0.0
+        self.scope = scope
+
+    @property
+    def budget(self) -> Optional[int]:
+        """Бюджет эндпоинта (маршрут известен после роутинга, до зависимостей)"""
+        route = self.scope.get("route") if self.scope else None
+        return getattr(getattr(route, "endpoint", None), "__query_budget__", None)
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("db_request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    """Статистика текущего запроса (None вне HTTP-запроса)"""
+    return _request_stats.get()
+
+
+@contextmanager
+def untracked():
+    """
+    Запросы внутри блока не учитываются в статистике и бюджете текущего HTTP-запроса:
+    для сборки общих для процесса структур (справочники в памяти), стоимость которой
+    распределяется на все последующие запросы.
+    """
+    token = _request_stats.set(None)
+    try:
+        yield
+    finally:
+        _request_stats.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _enforce_budget(conn, cursor, statement, parameters, context, executemany):
+    """
+    Строгий режим: запрос сверх бюджета не выполняется. Ошибка возникает внутри
+    эндпоинта, до commit, поэтому его транзакция откатывается, а клиент получает
+    500 за несостоявшуюся операцию, а не за уже записанную.
+    """
+    stats = _request_stats.get()
+    if stats is None:
+        return
+    budget = stats.budget
+    if budget is not None and stats.queries >= budget:
+        route = stats.scope["route"]
+        raise QueryBudgetExceeded(
+            f"Превышен бюджет запросов к БД для {route.path}: запрос {stats.queries + 1} > {budget}"
+        )
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+
+    stats = _request_stats.get()
+    if stats is None:
+        return
+
+    stats.queries += 1
+    stats.db_time += time.perf_counter() - started
+    if cursor.rowcount and cursor.rowcount > 0:
+        stats.rows += cursor.rowcount
+
+
+def _raise_on_lazy_load(orm_execute_state):
+    """
+    Строгий режим: любая ленивая загрузка связи, требующая SQL, вызывает ошибку.
+    Явные опции (joinedload/selectinload/contains_eager) имеют приоритет над "*".
+    """
+    if (
+        orm_execute_state.is_select
+        and not orm_execute_state.is_column_load
+        and not orm_execute_state.is_relationship_load
+    ):
+        orm_execute_state.statement = orm_execute_state.statement.options(
+            raiseload("*", sql_only=True)
+        )
+
+
+def instrument(engine, session_factory):
+    """Подключение счётчиков запросов к движку и строгого режима к сессиям"""
+    if settings.db_strict_mode:
+        # до замера времени: отклонённый запрос не оставляет метку в query_start_time
+        event.listen(engine, "before_cursor_execute", _enforce_budget)
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    if settings.db_strict_mode:
+        # связи объектов, загруженных жадно или взятых из identity map, не затрагивает -
+        # для них в строгом режиме действует lazy=models.LAZY
+        event.listen(session_factory, "do_orm_execute", _raise_on_lazy_load)
+
+
+# Границы корзин гистограммы ожидания соединения из пула, мс
+CHECKOUT_WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+class CheckoutWaitHistogram:
+    """Гистограмма времени ожидания соединения из пула"""
+
+    def __init__(self, buckets_ms=CHECKOUT_WAIT_BUCKETS_MS):
+        self._lock = threading.Lock()
+        self.buckets_ms = buckets_ms
+        self.counts = [0] * (len(buckets_ms) + 1)
+        self.total = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+
+    def observe(self, wait: float):
+        wait_ms = wait * 1000
+        index = len(self.buckets_ms)
+        for i, bound in enumerate(self.buckets_ms):
+            if wait_ms <= bound:
+                index = i
+                break
+
+        with self._lock:
+            self.counts[index] += 1
+            self.total += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            labels = [f"<={bound}ms" for bound in self.buckets_ms] + [f">{self.buckets_ms[-1]}ms"]
+            return {
+                "checkouts": self.total,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": self.total_wait / self.total * 1000 if self.total else 0.0,
+                "max_wait_ms": self.max_wait * 1000,
+                "histogram": dict(zip(labels, self.counts)),
+            }
+
+
+checkout_waits = CheckoutWaitHistogram()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool, измеряющий ожидание соединения (включая pre-ping) и таймауты"""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            checkout_waits.timeout()
+            raise
+        checkout_waits.observe(time.perf_counter() - started)
+        return connection
+
+
+def pool_status(engine) -> dict:
+    """Текущее состояние пула и гистограмма ожидания"""
+    pool = engine.pool
+    return {
+        "pool_size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": settings.db_max_overflow,
+        "checkout_wait": checkout_waits.stats(),
+    }
+
+
+def query_budget(max_queries: int):
+    """
+    Декоратор эндпоинта: объявляет максимальное число SQL-запросов на один вызов
+    (включая запросы зависимостей авторизации и сериализации ответа). Бюджет
+    считается по худшему случаю: пустой principal_cache (+1 запрос авторизации)
+    и промахи кэшей справочников и профилей.
+    Ставится между @router.<method> и @exceptions.handle_exceptions.
+    """
+    def decorator(func):
+        func.__query_budget__ = max_queries
+        return func
+    return decorator
+
+
+class QueryStatsMiddleware(BaseHTTPMiddleware):
+    """
+    Считает запросы, строки и время БД каждого HTTP-запроса и отдаёт их
+    в заголовках Server-Timing и X-DB-Queries.
+    При превышении объявленного бюджета запросов пишет предупреждение; ответ
+    не меняется - в строгом режиме лишний запрос уже остановлен _enforce_budget
+    до commit эндпоинта.
+    """
+
+    async def dispatch(self, request, call_next):
+        stats = RequestStats(request.scope)
+        token = _request_stats.set(stats)
+        try:
+            response = await call_next(request)
+        finally:
+            _request_stats.reset(token)
+
+        route = request.scope.get("route")
+        budget = getattr(getattr(route, "endpoint", None), "__query_budget__", None)
+
+        if budget is not None and stats.queries > budget:
+            message = (
+                f"Превышен бюджет запросов к БД для {request.method} {route.path}: "
+                f"{stats.queries} > {budget}"
+            )
+            logger.warning(message)
+
+        response.headers["X-DB-Queries"] = str(stats.queries)
+        response.headers["Server-Timing"] = (
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries, {stats.rows} rows"'
+        )
+        return response
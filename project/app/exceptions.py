@@ -1,89 +1,119 @@
 from functools import wraps
 from fastapi import HTTPException
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, Callable
+import inspect
 import logging
 
 logger = logging.getLogger(__name__)
 
+def _find_session(args, kwargs):
+    """Находим сессию БД в аргументах эндпоинта"""
+    # Ищем в позиционных аргументах
+    for arg in args:
+        if isinstance(arg, (Session, AsyncSession)):
+            return arg
+
+    # Ищем в именованных аргументах
+    for key, value in kwargs.items():
+        if isinstance(value, (Session, AsyncSession)):
+            return value
+
+    return None
+
+# Сообщения для нарушений EXCLUDE-ограничений (пересечения интервалов) - ответ 409
+EXCLUSION_MESSAGES = {
+    "schedule_doctor_no_overlap": "Врач уже имеет расписание, пересекающееся с указанным интервалом",
+    "schedule_office_no_overlap": "Кабинет уже занят в указанный интервал",
+}
+
+def _to_http_exception(e: Exception, func_name: str, custom_message: Optional[str]) -> HTTPException:
+    """Преобразование исключения в HTTPException с логированием"""
+    prefix = f"{custom_message + ': ' if custom_message else ''}"
+
+    if isinstance(e, IntegrityError):
+        logger.error(f"IntegrityError in {func_name}: {str(e)}", exc_info=True)
+
+        # Детализируем ошибку
+        error_msg = str(e.orig).lower() if e.orig else str(e).lower()
+
+        if "exclusion constraint" in error_msg:
+            detail = next(
+                (message for name, message in EXCLUSION_MESSAGES.items() if name in error_msg),
+                "Пересечение с существующими данными"
+            )
+            return HTTPException(status_code=409, detail=f"{prefix}{detail}")
+
+        if "unique constraint" in error_msg or "duplicate key" in error_msg:
+            detail = "Нарушение уникальности данных"
+        elif "check constraint" in error_msg:
+            detail = "Нарушение проверочного ограничения"
+        elif "foreign key" in error_msg:
+            detail = "Нарушение ссылочной целостности"
+        elif "not null" in error_msg:
+            detail = "Обязательные поля не заполнены"
+        else:
+            detail = "Ошибка целостности данных"
+
+        return HTTPException(status_code=400, detail=f"{prefix}{detail}")
+
+    if isinstance(e, SQLAlchemyError):
+        logger.error(f"SQLAlchemyError in {func_name}: {str(e)}", exc_info=True)
+        return HTTPException(status_code=500, detail=f"{prefix}Ошибка базы данных")
+
+    logger.error(f"Unexpected error in {func_name}: {str(e)}", exc_info=True)
+    return HTTPException(status_code=500, detail=f"{prefix}Внутренняя ошибка сервера")
+
 def handle_exceptions(custom_message: Optional[str] = None, rollback: bool = True):
     """
-    Декоратор для обработки исключений в эндпоинтах
-    
+    Декоратор для обработки исключений в эндпоинтах (синхронных и async)
+
     Параметры:
     - custom_message: дополнительное сообщение для ошибки
     - rollback: выполнять ли rollback при ошибке (по умолчанию True)
     """
     def decorator(func: Callable):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                db_session = _find_session(args, kwargs)
+
+                try:
+                    return await func(*args, **kwargs)
+
+                except HTTPException:
+                    # Преднамеренные HTTP ошибки
+                    raise
+
+                except Exception as e:
+                    if rollback and db_session:
+                        if isinstance(db_session, AsyncSession):
+                            await db_session.rollback()
+                        else:
+                            db_session.rollback()
+
+                    raise _to_http_exception(e, func.__name__, custom_message)
+
+            return async_wrapper
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # Находим сессию БД в аргументах
-            db_session = None
-            
-            # Ищем в позиционных аргументах
-            for arg in args:
-                from sqlalchemy.orm import Session
-                if isinstance(arg, Session):
-                    db_session = arg
-                    break
-            
-            # Ищем в именованных аргументах
-            if not db_session:
-                for key, value in kwargs.items():
-                    from sqlalchemy.orm import Session
-                    if isinstance(value, Session):
-                        db_session = value
-                        break
-            
+            db_session = _find_session(args, kwargs)
+
             try:
                 return func(*args, **kwargs)
-                
+
             except HTTPException:
                 # Преднамеренные HTTP ошибки
                 raise
-                
-            except IntegrityError as e:
-                if rollback and db_session:
-                    db_session.rollback()
-                
-                logger.error(f"IntegrityError in {func.__name__}: {str(e)}", exc_info=True)
-                
-                # Детализируем ошибку
-                error_msg = str(e.orig).lower() if e.orig else str(e).lower()
-                
-                if "unique constraint" in error_msg or "duplicate key" in error_msg:
-                    detail = "Нарушение уникальности данных"
-                elif "check constraint" in error_msg:
-                    detail = "Нарушение проверочного ограничения"
-                elif "foreign key" in error_msg:
-                    detail = "Нарушение ссылочной целостности"
-                elif "not null" in error_msg:
-                    detail = "Обязательные поля не заполнены"
-                else:
-                    detail = "Ошибка целостности данных"
-                
-                full_detail = f"{custom_message + ': ' if custom_message else ''}{detail}"
-                raise HTTPException(status_code=400, detail=full_detail)
-                
-            except SQLAlchemyError as e:
-                if rollback and db_session:
-                    db_session.rollback()
-                
-                logger.error(f"SQLAlchemyError in {func.__name__}: {str(e)}", exc_info=True)
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"{custom_message + ': ' if custom_message else ''}Ошибка базы данных"
-                )
-                
+
             except Exception as e:
                 if rollback and db_session:
                     db_session.rollback()
-                
-                logger.error(f"Unexpected error in {func.__name__}: {str(e)}", exc_info=True)
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"{custom_message + ': ' if custom_message else ''}Внутренняя ошибка сервера"
-                )
-                
+
+                raise _to_http_exception(e, func.__name__, custom_message)
+
         return wrapper
     return decorator
\ No newline at end of file
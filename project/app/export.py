@@ -0,0 +1,134 @@
+"""
+Потоковая выгрузка пациентов и записей на прием в NDJSON/CSV.
+
+Строки читаются серверным курсором (yield_per) пачками и сразу отдаются клиенту,
+поэтому память процесса не зависит от размера таблицы. Выбираются только
+запрошенные колонки (Core-строки, без ORM-объектов и pydantic-моделей).
+Генератор открывает собственную сессию: зависимость get_db закрывается
+до начала отправки тела StreamingResponse.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime, time
+from typing import Optional
+
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+
+import database, models
+
+# Размер пачки серверного курсора
+YIELD_PER = 2000
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+PATIENT_COLUMNS = {
+    "id": models.Patient.id,
+    "first_name": models.Patient.first_name,
+    "last_name": models.Patient.last_name,
+    "patronymic": models.Patient.patronymic,
+    "gender": models.Patient.gender,
+    "birth_date": models.Patient.birth_date,
+    "phone_number": models.Patient.phone_number,
+    "email": models.Patient.email,
+    "created_at": models.Patient.created_at,
+}
+
+APPOINTMENT_COLUMNS = {
+    "id": models.Appointment.id,
+    "status": models.Appointment.status,
+    "information": models.Appointment.information,
+    "patient_id": models.Appointment.patient_id,
+    "doctor_id": models.Schedule.doctor_id,
+    "schedule_id": models.Appointment.schedule_id,
+    "office_number": models.Office.number,
+    "date": models.Schedule.date,
+    "start_time": models.Schedule.start_time,
+    "end_time": models.Schedule.end_time,
+    "created_at": models.Appointment.created_at,
+}
+
+
+def select_columns(available: dict, columns: Optional[str]) -> dict:
+    """Колонки из параметра ?columns=a,b,c (по умолчанию - все) с проверкой имён"""
+    if not columns:
+        return available
+
+    names = [name.strip() for name in columns.split(",") if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown or not names:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Неизвестные колонки: {', '.join(unknown)}. "
+                   f"Доступные: {', '.join(available)}"
+        )
+
+    return {name: available[name] for name in names}
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return value
+
+
+def _ndjson_chunk(names, rows) -> str:
+    return "".join(
+        json.dumps(dict(zip(names, map(_plain, row))), ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+
+def _csv_chunk(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_plain(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+def iter_rows(statement, names, fmt: str):
+    """Генератор фрагментов выгрузки: одна пачка курсора - один фрагмент"""
+    if fmt == "csv":
+        yield _csv_chunk([names])
+
+    db = database.SessionLocal()
+    try:
+        result = db.execute(statement.execution_options(yield_per=YIELD_PER))
+        for rows in result.partitions():
+            yield _csv_chunk(rows) if fmt == "csv" else _ndjson_chunk(names, rows)
+    finally:
+        db.close()
+
+
+def stream(statement, columns: dict, fmt: str, filename: str) -> StreamingResponse:
+    """StreamingResponse с выгрузкой выбранных колонок запроса"""
+    if fmt not in FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Формат выгрузки: {', '.join(FORMATS)}"
+        )
+
+    names = list(columns)
+    statement = statement.with_only_columns(*columns.values())
+
+    return StreamingResponse(
+        iter_rows(statement, names, fmt),
+        media_type=FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    )
+
+
+def patients_statement():
+    return select(models.Patient.id).order_by(models.Patient.id)
+
+
+def appointments_statement():
+    return select(models.Appointment.id)\
+        .join(models.Appointment.schedule)\
+        .join(models.Schedule.office)\
+        .order_by(models.Appointment.id)
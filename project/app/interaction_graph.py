@@ -0,0 +1,147 @@
+"""
+Граф противопоказаний справочника медикаментов в памяти процесса.
+
+Смежность "медикамент - медикамент" (medicament_medicament_contraindication,
+в обе стороны) и "медикамент - другое противопоказание"
+(medication_contraindication_other) хранятся множествами вместе с названиями
+медикаментов, поэтому проверка целого назначения - операции над множествами
+без запросов к БД.
+
+Граф неизменяем и строится целиком (три запроса, вне бюджета эндпоинта).
+Записи справочника (/medicaments, /interactions, /medication-contraindication,
+/contraindications) вызывают bump(), и следующий запрос строит новый граф;
+другие процессы увидят изменение не позже чем через interaction_graph_ttl_seconds.
+Неизвестный графу id (медикамент из другого процесса или несуществующий)
+вызывает пересборку не чаще раза в interaction_graph_unknown_rebuild_seconds:
+иначе запросы с заведомо неверными id пересобирали бы граф каждый раз.
+"""
+
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import select
+
+import database, db_metrics, models
+from config import settings
+
+_EMPTY = frozenset()
+
+_version = 0
+_graph = None
+_build_lock = threading.Lock()
+
+
+class InteractionGraph:
+    """Снимок справочника: названия, взаимодействия и другие противопоказания медикаментов"""
+
+    def __init__(self, version: int, names: dict, interactions: dict, other: dict, catalog_version: int = 0):
+        self.version = version
+        self.catalog_version = catalog_version  # catalog_version.version на момент сборки
+        self.names = names  # medicament_id -> название
+        self.interactions = interactions  # medicament_id -> frozenset(medicament_id)
+        self.other = other  # medicament_id -> frozenset(contraindication_id)
+        self.built_at = time.monotonic()
+
+    def unknown(self, medicament_ids) -> set:
+        """id, которых нет в справочнике"""
+        return set(medicament_ids) - self.names.keys()
+
+    def interacting(self, medicament_id: int, medicament_ids) -> frozenset:
+        """Медикаменты из medicament_ids, противопоказанные вместе с medicament_id"""
+        return self.interactions.get(medicament_id, _EMPTY).intersection(medicament_ids)
+
+    def pairs(self, medicament_ids):
+        """Противопоказанные пары (a, b), a < b, внутри набора medicament_ids"""
+        medicament_ids = set(medicament_ids)
+        return sorted(
+            (a, b)
+            for a in medicament_ids
+            for b in self.interacting(a, medicament_ids)
+            if a < b
+        )
+
+    def contraindications(self, medicament_id: int) -> frozenset:
+        """Другие противопоказания (заболевания, состояния) медикамента"""
+        return self.other.get(medicament_id, _EMPTY)
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() - self.built_at > settings.interaction_graph_ttl_seconds
+
+
+def bump():
+    """Справочник изменился: следующий get() построит граф заново"""
+    global _version
+    with _build_lock:
+        _version += 1
+
+
+def _build(version: int) -> InteractionGraph:
+    interactions = defaultdict(set)
+    other = defaultdict(set)
+
+    with db_metrics.untracked():
+        db = database.SessionLocal()
+        try:
+            # версия читается первой: содержимое графа не старше неё
+            catalog_version = db.scalar(
+                select(models.CatalogVersion.version).where(models.CatalogVersion.id == 1)
+            ) or 0
+            names = dict(db.execute(select(models.Medicament.id, models.Medicament.name)).all())
+
+            pair_table = models.MedicamentMedicamentContraindication
+            for first_id, second_id in db.execute(
+                select(pair_table.medication_first_id, pair_table.medication_second_id)
+            ):
+                interactions[first_id].add(second_id)
+                interactions[second_id].add(first_id)
+
+            link_table = models.MedicationContraindicationOther
+            for medicament_id, contraindication_id in db.execute(
+                select(link_table.medicament_id, link_table.contraindication_id)
+            ):
+                other[medicament_id].add(contraindication_id)
+        finally:
+            db.close()
+
+    return InteractionGraph(
+        version,
+        names,
+        {medicament_id: frozenset(ids) for medicament_id, ids in interactions.items()},
+        {medicament_id: frozenset(ids) for medicament_id, ids in other.items()},
+        catalog_version,
+    )
+
+
+def _stale(graph, required_ids, catalog_version) -> bool:
+    if graph is None or graph.version != _version or graph.expired:
+        return True
+    if catalog_version is not None and graph.catalog_version < catalog_version:
+        return True
+    # неизвестные id пересобирают граф, только если он старше интервала
+    return time.monotonic() - graph.built_at > settings.interaction_graph_unknown_rebuild_seconds \
+        and bool(graph.unknown(required_ids))
+
+
+def get(required_ids=(), catalog_version=None) -> InteractionGraph:
+    """
+    Актуальный граф. catalog_version - версия справочника, уже прочитанная
+    вызывающим: граф старше неё строится заново (изменения из других процессов).
+    required_ids - медикаменты запроса: если их нет в графе (добавлены в другом
+    процессе), граф строится заново до истечения TTL, но не чаще раза в
+    interaction_graph_unknown_rebuild_seconds. Оставшиеся неизвестными id
+    вызывающий проверяет по graph.unknown() и отвечает 404.
+    """
+    global _graph
+
+    graph = _graph
+    if not _stale(graph, required_ids, catalog_version):
+        return graph
+
+    with _build_lock:
+        graph = _graph
+        if _stale(graph, required_ids, catalog_version):
+            graph = _graph = _build(_version)
+
+    return graph
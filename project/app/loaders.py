@@ -0,0 +1,62 @@
+"""
+Опции жадной загрузки для вложенных схем ответа.
+
+Каждая схема (ScheduleResponse, AppointmentResponse, AppointmentResponseToPatient)
+требует фиксированный граф связей. Опции ниже загружают его за постоянное
+количество запросов независимо от числа строк:
+- связи "многие к одному" с большой кардинальностью (запись -> расписание,
+  запись -> пациент, расписание -> кабинет) подгружаются через JOIN;
+- врачи (их немного, а строк расписания тысячи) подгружаются отдельным
+  SELECT ... IN, чтобы не дублировать данные врача и специализации в каждой строке.
+"""
+
+from sqlalchemy.orm import joinedload, selectinload, contains_eager
+import models
+
+
+def schedule_options(path=None):
+    """
+    Опции для ScheduleResponse: кабинет и врач со специализацией.
+    path - опция загрузки родительской связи, если расписание вложено в другую схему
+    """
+    if path is None:
+        office = joinedload(models.Schedule.office, innerjoin=True)
+        doctor = selectinload(models.Schedule.doctor)
+    else:
+        office = path.joinedload(models.Schedule.office, innerjoin=True)
+        doctor = path.selectinload(models.Schedule.doctor)
+
+    return [
+        office,
+        doctor.joinedload(models.Doctor.specialization, innerjoin=True),
+    ]
+
+
+def appointment_options(schedule_joined: bool = False):
+    """
+    Опции для AppointmentResponse: расписание (с кабинетом и врачом) и пациент.
+    schedule_joined - запрос уже содержит JOIN на расписание (например, для фильтра по врачу),
+    тогда используем его же вместо второго JOIN
+    """
+    return patient_appointment_options(schedule_joined) + [
+        joinedload(models.Appointment.patient, innerjoin=True),
+    ]
+
+
+def patient_appointment_options(schedule_joined: bool = False):
+    """
+    Опции для AppointmentResponseToPatient: только расписание с кабинетом и врачом.
+    """
+    if schedule_joined:
+        schedule = contains_eager(models.Appointment.schedule)
+    else:
+        schedule = joinedload(models.Appointment.schedule, innerjoin=True)
+
+    return schedule_options(schedule)
+
+
+def doctor_options():
+    """
+    Опции для DoctorResponse/DoctorResponseAdmin: специализация врача.
+    """
+    return [joinedload(models.Doctor.specialization, innerjoin=True)]
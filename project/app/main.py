@@ -10,19 +10,36 @@ from database import engine, get_db
 from routers import admin, doctor, patient, auth
 from config import settings
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+import db_metrics
+import availability_index
+from contextlib import asynccontextmanager
 
 #models.Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # индекс свободных слотов собирается в фоне, приложение стартует сразу
+    if settings.availability_index_enabled:
+        availability_index.index.ensure_built()
+    yield
+
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 origins=["*"] #every single domain
 
+# счётчики запросов к БД (добавляется до CORS, чтобы CORS оставался внешним слоем)
+app.add_middleware(db_metrics.QueryStatsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-DB-Queries", "X-Next-Cursor"]
 )
 
 
@@ -0,0 +1,106 @@
+"""
+Отчёт о лекарствах пациента одним SQL-запросом (settings.medication_report_engine = "sql").
+
+Альтернатива patient_profile для GET /api/patient/medication и
+GET /api/doctor/patient/{id}/medication: назначения, запрещённые медикаменты
+и общие противопоказания собираются в PostgreSQL (CTE + json_agg), и готовый
+JSON отдаётся клиенту как есть - без объектов ORM и сборки множеств в Python.
+Порядок элементов и состав полей совпадают с отчётом patient_profile,
+что проверяет benchmarks/bench_medication_report.py.
+"""
+
+from typing import Optional
+
+from fastapi import Response
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+REPORT_SQL = text("""
+    WITH patient_row AS (
+        SELECT id, last_name || ' ' || first_name || ' ' || patronymic AS full_name, birth_date
+        FROM patient
+        WHERE id = :patient_id
+    ),
+    prescriptions AS (
+        SELECT pm.id, pm.medicament_id, m.name AS medicament_name, pm.dosage, pm.frequency,
+               pm.start_date, pm.end_date, pm.notes,
+               pm.end_date IS NULL OR pm.end_date >= CURRENT_DATE AS is_active
+        FROM patient_medicament pm
+        JOIN medicament m ON m.id = pm.medicament_id
+        WHERE pm.patient_id = :patient_id
+    ),
+    forbidden AS (
+        -- прямые противопоказания пациента
+        SELECT pmc.medicament_id, m.name AS medicament_name,
+               'Прямое противопоказание пациента' AS reason
+        FROM patient_medicament_contraindication pmc
+        JOIN medicament m ON m.id = pmc.medicament_id
+        WHERE pmc.patient_id = :patient_id
+        UNION
+        -- взаимодействия учитываются, только если у пациента не меньше двух назначений
+        SELECT other.id, other.name, 'Взаимодействует с ''' || p.medicament_name || ''''
+        FROM prescriptions p
+        JOIN LATERAL (
+            SELECT mmc.medication_second_id AS other_id
+            FROM medicament_medicament_contraindication mmc
+            WHERE mmc.medication_first_id = p.medicament_id
+            UNION ALL
+            SELECT mmc.medication_first_id
+            FROM medicament_medicament_contraindication mmc
+            WHERE mmc.medication_second_id = p.medicament_id
+        ) interaction ON true
+        JOIN medicament other ON other.id = interaction.other_id
+        WHERE (SELECT count(*) FROM prescriptions) >= 2
+    )
+    SELECT CAST(json_build_object(
+        'patient_info', json_build_object(
+            'id', patient_row.id,
+            'full_name', patient_row.full_name,
+            'birth_date', patient_row.birth_date
+        ),
+        'current_medicaments', coalesce(
+            (SELECT json_agg(p ORDER BY p.start_date DESC, p.id DESC) FROM prescriptions p),
+            '[]'
+        ),
+        'forbidden_medicaments', coalesce(
+            (SELECT json_agg(
+                json_build_object(
+                    'medicament_id', f.medicament_id,
+                    'medicament_name', f.medicament_name,
+                    'reason', f.reason
+                )
+                ORDER BY f.medicament_id, f.reason COLLATE "C"
+            )
+            FROM forbidden f
+            WHERE f.medicament_id NOT IN (SELECT medicament_id FROM prescriptions)),
+            '[]'
+        ),
+        CAST(:other_key AS text), coalesce(
+            (SELECT json_agg(
+                json_build_object(
+                    'contraindication_id', poc.contraindication_id,
+                    'contraindication_name', oc.name,
+                    'type', 'Общее противопоказание'
+                )
+                ORDER BY poc.contraindication_id
+            )
+            FROM patient_other_contradictions poc
+            JOIN other_contraindication oc ON oc.id = poc.contraindication_id
+            WHERE poc.patient_id = :patient_id),
+            '[]'
+        )
+    ) AS text)
+    FROM patient_row
+""")
+
+
+def fetch(db: Session, patient_id: int, other_key: str) -> Optional[str]:
+    """
+    JSON отчёта строкой или None, если пациента нет. other_key - имя поля
+    общих противопоказаний (у пациента и врача оно исторически разное).
+    """
+    return db.execute(REPORT_SQL, {"patient_id": patient_id, "other_key": other_key}).scalar()
+
+
+def response(body: str) -> Response:
+    return Response(content=body, media_type="application/json")
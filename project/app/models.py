@@ -1,10 +1,15 @@
 from database import Base
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Date, Text, Time
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, ForeignKey, Date, Text, Time
+from sqlalchemy.orm import relationship, deferred
+from sqlalchemy.dialects.postgresql import ExcludeConstraint, TSRANGE
 from sqlalchemy.sql.sqltypes import TIMESTAMP
 from sqlalchemy.sql.expression import text
-from sqlalchemy import CheckConstraint
+from sqlalchemy import CheckConstraint, Index, Computed
 import exceptions
+from config import settings
+
+# строгий режим: ленивая загрузка связи, требующая SQL, - ошибка (см. db_metrics)
+LAZY = "raise_on_sql" if settings.db_strict_mode else "select"
 
 class User(Base):
     __tablename__ = "users"
@@ -31,20 +36,24 @@ class Patient(Base):
 
     email = Column(String,nullable=False, unique=True)
     password=Column(String,nullable=False)
+    # счётчик изменений назначений и противопоказаний (версия кэша patient_profile)
+    profile_version = Column(Integer, nullable=False, server_default=text('0'))
 
     created_at = Column(TIMESTAMP(timezone=True),nullable=False,server_default = text('now()'))
 
     appointments = relationship("Appointment", back_populates="patient",
-        cascade="all, delete-orphan")
-    medicaments = relationship("PatientMedicament",back_populates="patient", cascade="all, delete-orphan")
+        cascade="all, delete-orphan", lazy=LAZY)
+    medicaments = relationship("PatientMedicament",back_populates="patient", cascade="all, delete-orphan", lazy=LAZY)
     medicament_contraindications = relationship(
         "PatientMedicamentContraindication", 
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        lazy=LAZY
     )
     
     other_contraindications = relationship(
         "PatientOtherContraindication", 
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        lazy=LAZY
     )
 
     user_id = Column(Integer, ForeignKey('users.id'), unique=True, nullable=True)
@@ -73,7 +82,9 @@ class Patient(Base):
         CheckConstraint(
             "gender IN ('female','male')",
             name='check_gender_format'
-        )
+        ),
+        # keyset-пагинация списка пациентов
+        Index('ix_patient_created_at_id', 'created_at', 'id'),
     )
 
 
@@ -87,7 +98,7 @@ class Specialization(Base):
     created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
     
     # Define relationship back
-    doctors = relationship("Doctor", back_populates="specialization")
+    doctors = relationship("Doctor", back_populates="specialization", lazy=LAZY)
 
 
 class Doctor(Base):
@@ -103,9 +114,9 @@ class Doctor(Base):
     password=Column(String,nullable=False)
     specialization_id = Column(Integer, ForeignKey('specialization.id'), nullable=False)
 
-    specialization = relationship("Specialization", back_populates="doctors")
+    specialization = relationship("Specialization", back_populates="doctors", lazy=LAZY)
     schedules = relationship("Schedule", back_populates="doctor",
-        cascade="all, delete-orphan")
+        cascade="all, delete-orphan", lazy=LAZY)
 
     user_id = Column(Integer, ForeignKey('users.id'), unique=True, nullable=True)
 
@@ -129,7 +140,10 @@ class Doctor(Base):
         CheckConstraint(
             "email ~ '^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\\.[A-Z|a-z]{2,}$'",
             name='check_email_format'
-        )
+        ),
+        # keyset-пагинация списка врачей
+        Index('ix_doctor_created_at_id', 'created_at', 'id'),
+        Index('ix_doctor_specialization_id', 'specialization_id'),
     )
 
     created_at = Column(TIMESTAMP(timezone=True),nullable=False,server_default = text('now()'))
@@ -147,19 +161,40 @@ class Schedule(Base):
     start_time = Column(Time, nullable=False)
     end_time = Column(Time, nullable=False)
     is_available = Column(Boolean, nullable=False, default=True)
+    # интервал слота для EXCLUDE-ограничений (вычисляется БД, в запросы не загружается)
+    period = deferred(Column(
+        TSRANGE,
+        Computed("tsrange(date + start_time, date + end_time, '[)')", persisted=True)
+    ))
     
-    doctor = relationship("Doctor", back_populates="schedules")
-    office = relationship("Office")
+    doctor = relationship("Doctor", back_populates="schedules", lazy=LAZY)
+    office = relationship("Office", lazy=LAZY)
     
     created_at = Column(TIMESTAMP(timezone=True),nullable=False,server_default = text('now()'))
 
     __table_args__ = (
         CheckConstraint("end_time > start_time", name='check_valid_time_range'),
         CheckConstraint("date >= CURRENT_DATE", name='check_future_date'),
+        Index('ix_schedule_doctor_id_date', 'doctor_id', 'date', 'start_time'),
+        Index('ix_schedule_office_id_date', 'office_id', 'date', 'start_time'),
+        # поиск ближайших свободных слотов (/api/patient/slots/search)
+        Index(
+            'ix_schedule_available_date_start_id', 'date', 'start_time', 'id',
+            postgresql_where=text("is_available")
+        ),
+        # слоты врача и слоты кабинета не пересекаются
+        ExcludeConstraint(
+            ('doctor_id', '='), ('period', '&&'),
+            name='schedule_doctor_no_overlap', using='gist'
+        ),
+        ExcludeConstraint(
+            ('office_id', '='), ('period', '&&'),
+            name='schedule_office_no_overlap', using='gist'
+        ),
     )
 
     appointments = relationship("Appointment", back_populates="schedule",
-        cascade="all, delete-orphan")
+        cascade="all, delete-orphan", lazy=LAZY)
 
 class Appointment(Base):
     __tablename__ = "appointment"
@@ -170,8 +205,8 @@ class Appointment(Base):
     status = Column(String(50), nullable=False, default='scheduled')
     information = Column(Text)
     
-    patient = relationship("Patient", back_populates="appointments")
-    schedule = relationship("Schedule", back_populates="appointments")
+    patient = relationship("Patient", back_populates="appointments", lazy=LAZY)
+    schedule = relationship("Schedule", back_populates="appointments", lazy=LAZY)
 
     created_at = Column(TIMESTAMP(timezone=True),nullable=False,server_default = text('now()'))
     
@@ -180,6 +215,14 @@ class Appointment(Base):
             "status IN ('scheduled', 'completed', 'cancelled', 'no-show')", 
             name='check_valid_status'
         ),
+        Index('ix_appointment_patient_id_status', 'patient_id', 'status'),
+        Index('ix_appointment_schedule_id', 'schedule_id'),
+        # предстоящие приемы - небольшая часть таблицы
+        Index(
+            'ix_appointment_scheduled_schedule_id', 'schedule_id',
+            postgresql_where=text("status = 'scheduled'")
+        ),
+        Index('ix_appointment_created_at_id', 'created_at', 'id'),
     )
 
 
@@ -198,15 +241,23 @@ class PatientMedicament(Base):
     appointment_id = Column(Integer, ForeignKey('appointment.id'))
     notes = Column(Text)
     
-    patient = relationship("Patient", back_populates="medicaments")
-    medicament = relationship("Medicament")
-    doctor = relationship("Doctor", foreign_keys=[doctor_by_id])
-    appointment = relationship("Appointment")
+    patient = relationship("Patient", back_populates="medicaments", lazy=LAZY)
+    medicament = relationship("Medicament", lazy=LAZY)
+    doctor = relationship("Doctor", foreign_keys=[doctor_by_id], lazy=LAZY)
+    appointment = relationship("Appointment", lazy=LAZY)
 
     created_at = Column(TIMESTAMP(timezone=True),nullable=False,server_default = text('now()'))
     
     __table_args__ = (
         CheckConstraint("end_date IS NULL OR end_date >= start_date", name='check_valid_dates'),
+        Index('ix_patient_medicament_patient_id_start_date', 'patient_id', 'start_date'),
+        Index('ix_patient_medicament_doctor_by_id', 'doctor_by_id', 'created_at', 'id'),
+        # бессрочные (активные) назначения пациента
+        Index(
+            'ix_patient_medicament_active', 'patient_id', 'medicament_id',
+            postgresql_where=text("end_date IS NULL")
+        ),
+        Index('ix_patient_medicament_created_at_id', 'created_at', 'id'),
     )
 
 
@@ -241,25 +292,31 @@ class MedicationContraindicationOther(Base):
     medicament_id = Column(Integer, ForeignKey('medicament.id'), primary_key=True)
     contraindication_id = Column(Integer, ForeignKey('other_contraindication.id'), primary_key=True)
 
-    medicament = relationship("Medicament")
-    contraindication = relationship("OtherContraindication")
+    medicament = relationship("Medicament", lazy=LAZY)
+    contraindication = relationship("OtherContraindication", lazy=LAZY)
     
     created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
 
+    __table_args__ = (
+        Index('ix_medication_contraindication_other_contraindication_id', 'contraindication_id'),
+    )
+
 class MedicamentMedicamentContraindication(Base):
     __tablename__ = "medicament_medicament_contraindication"
     
     medication_first_id = Column(Integer, ForeignKey('medicament.id'), primary_key=True)
     medication_second_id = Column(Integer, ForeignKey('medicament.id'), primary_key=True)
 
-    first_medicament = relationship("Medicament", foreign_keys=[medication_first_id])
-    second_medicament = relationship("Medicament", foreign_keys=[medication_second_id])
+    first_medicament = relationship("Medicament", foreign_keys=[medication_first_id], lazy=LAZY)
+    second_medicament = relationship("Medicament", foreign_keys=[medication_second_id], lazy=LAZY)
 
 
     created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
     
     __table_args__ = (
         CheckConstraint("medication_first_id < medication_second_id", name='check_different_medicaments'),
+        # первичный ключ начинается с medication_first_id, поиск по второму - отдельным индексом
+        Index('ix_medicament_contraindication_second_first', 'medication_second_id', 'medication_first_id'),
     )
 
 
@@ -269,7 +326,7 @@ class PatientMedicamentContraindication(Base):
     
     patient_id = Column(Integer, ForeignKey('patient.id'), primary_key=True)
     medicament_id = Column(Integer, ForeignKey('medicament.id'), primary_key=True)
-    medicament = relationship("Medicament")
+    medicament = relationship("Medicament", lazy=LAZY)
 
     
     created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
@@ -280,6 +337,61 @@ class PatientOtherContraindication(Base):
     
     patient_id = Column(Integer, ForeignKey('patient.id'), primary_key=True)
     contraindication_id = Column(Integer, ForeignKey('other_contraindication.id'), primary_key=True)
-    contraindication = relationship("OtherContraindication")
+    contraindication = relationship("OtherContraindication", lazy=LAZY)
     
-    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
\ No newline at end of file
+    created_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+
+
+class PolypharmacyAuditRun(Base):
+    """Запуск аудита полипрагмазии (polypharmacy_audit)"""
+    __tablename__ = "polypharmacy_audit_run"
+
+    id = Column(Integer, primary_key=True)
+    status = Column(String(20), nullable=False, server_default=text("'running'"))  # running / done / failed
+    patients_scanned = Column(Integer, nullable=False, server_default=text('0'))
+    patients_flagged = Column(Integer, nullable=False, server_default=text('0'))
+    findings = Column(Integer, nullable=False, server_default=text('0'))
+    error = Column(Text)
+
+    started_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+    finished_at = Column(TIMESTAMP(timezone=True))
+    # последний прогресс; запуск без прогресса дольше polypharmacy_audit_stale_minutes считается прерванным
+    heartbeat_at = Column(TIMESTAMP(timezone=True), nullable=False, server_default=text('now()'))
+
+    __table_args__ = (
+        # одновременно выполняется не больше одного запуска
+        Index(
+            'ux_polypharmacy_audit_run_running', 'status',
+            unique=True,
+            postgresql_where=text("status = 'running'")
+        ),
+    )
+
+
+class PolypharmacyAuditFinding(Base):
+    """
+    Находка аудита: пациент одновременно принимает взаимодействующие medicament_id и
+    other_medicament_id (kind = 'interaction') или противопоказанный ему medicament_id
+    (kind = 'contraindication', other_medicament_id пуст).
+    """
+    __tablename__ = "polypharmacy_audit_finding"
+
+    id = Column(BigInteger, primary_key=True)
+    run_id = Column(Integer, ForeignKey('polypharmacy_audit_run.id', ondelete='CASCADE'), nullable=False)
+    # без внешних ключей: отчёт остаётся после удаления пациента или медикамента
+    patient_id = Column(Integer, nullable=False)
+    kind = Column(String(20), nullable=False)
+    medicament_id = Column(Integer, nullable=False)
+    other_medicament_id = Column(Integer)
+
+    __table_args__ = (
+        Index('ix_polypharmacy_audit_finding_run_id_id', 'run_id', 'id'),
+    )
+
+
+class CatalogVersion(Base):
+    """Версия справочника (одна строка id = 1), растёт при каждой его записи (catalog.bump)"""
+    __tablename__ = "catalog_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, server_default=text('1'))
@@ -1,11 +1,15 @@
 from jose import JWTError, jwt
 import datetime
+import hashlib
+import time
 from datetime import timedelta
 import schemas
 from fastapi import Depends, status, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-import database, models
+import database, models, cache
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from config import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='login')
@@ -14,6 +18,37 @@ SECRET_KEY = settings.secret_key
 ALGORITHM = settings.algorithm
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 
+# Снимки текущих пользователей/профилей (отсоединённые от сессии), ключ - user_id из токена
+principal_cache = cache.TTLCache(
+    "principals",
+    maxsize=settings.principal_cache_size,
+    ttl=settings.principal_cache_ttl_seconds
+)
+
+# Уже проверенные токены: ключ - SHA-256 сырого токена, запись живёт до его exp
+token_cache = cache.TTLCache(
+    "tokens",
+    maxsize=settings.token_cache_size,
+    ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60
+)
+
+def _token_key(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+def revoke_token(token: str):
+    """Убрать токен из кэша проверенных токенов"""
+    token_cache.invalidate(_token_key(token))
+
+def revoke_user_tokens(user_id):
+    """Убрать из кэша все проверенные токены пользователя"""
+    user_id = str(user_id)
+    token_cache.invalidate_where(lambda key, token_data: token_data.id == user_id)
+
+def invalidate_principal(user_id):
+    """Сбросить закэшированного пользователя (удаление, смена пароля и т.п.)"""
+    if user_id is not None:
+        principal_cache.invalidate(str(user_id))
+
 def create_access_token(data: dict):
     to_encode = data.copy()
 
@@ -25,86 +60,170 @@ def create_access_token(data: dict):
 
 def verify_access_token(token: str, credentials_exception):
     """Верификация токена с извлечением данных пользователя"""
+    key = _token_key(token)
+    token_data = token_cache.get(key)
+    if token_data is not None:
+        return token_data
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
 
         # Извлекаем данные из токена
-        user_id: str = str(payload.get("user_id"))
-        user_type: str = payload.get("user_type")  # 'patient' или 'doctor'
+        user_id = payload.get("user_id")
+        user_type: str = payload.get("user_type")  # 'patient', 'doctor' или 'admin'
+        profile_id = payload.get("profile_id")  # id в таблице patient/doctor (нет у старых токенов)
         
         if user_id is None or user_type is None:
             raise credentials_exception
         
         # Создаем объект с данными токена
-        token_data = schemas.TokenData(id=user_id, user_type=user_type)
+        token_data = schemas.TokenData(id=str(user_id), user_type=user_type, profile_id=profile_id)
         
     except JWTError:
         raise credentials_exception
     
+    expires_at = payload.get("exp")
+    if expires_at is not None:
+        token_cache.set(key, token_data, ttl=expires_at - time.time())
+    
     return token_data
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
-    """Получение текущего пользователя (общая функция)"""
-    credentials_exception = HTTPException(
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Неверные учетные данные",
         headers={"WWW-Authenticate": "Bearer"}
     )
-    
-    # Верифицируем токен
-    token_data = verify_access_token(token, credentials_exception)
+
+def get_token_data(token: str = Depends(oauth2_scheme)):
+    """Проверенные данные токена без обращения к БД"""
+    return verify_access_token(token, _credentials_exception())
+
+def get_current_user(token_data: schemas.TokenData = Depends(get_token_data), db: Session = Depends(database.get_db)):
+    """Получение текущего пользователя (общая функция)"""
+    user = principal_cache.get(token_data.id)
+    if isinstance(user, models.User):
+        return user
     
     # Ищем пользователя в БД
     user = db.query(models.User).filter(models.User.id == token_data.id).first()
     
     if not user:
-        raise credentials_exception
+        raise _credentials_exception()
+    
+    # Кэшируем отсоединённый снимок, чтобы он не зависел от сессии запроса
+    db.expunge(user)
+    principal_cache.set(token_data.id, user)
     
     return user
 
+def _get_profile(db: Session, model, token_data: schemas.TokenData):
+    """
+    Профиль пациента/врача одним запросом: JOIN с users проверяет, что пользователь
+    всё ещё существует и его профиль привязан к нему.
+    Результат кэшируется в principal_cache.
+    """
+    profile = principal_cache.get(token_data.id)
+    if isinstance(profile, model) and token_data.profile_id in (None, profile.id):
+        return profile
+    
+    query = db.query(model)\
+        .join(models.User, models.User.id == model.user_id)\
+        .filter(
+            models.User.id == token_data.id,
+            models.User.user_type == token_data.user_type
+        )
+    
+    if token_data.profile_id is not None:
+        query = query.filter(model.id == token_data.profile_id)
+    
+    profile = query.first()
+    
+    if not profile:
+        raise _credentials_exception()
+    
+    db.expunge(profile)
+    principal_cache.set(token_data.id, profile)
+    
+    return profile
+
+async def _get_profile_async(db: AsyncSession, model, token_data: schemas.TokenData):
+    """Асинхронный вариант _get_profile (тот же запрос и тот же кэш)"""
+    profile = principal_cache.get(token_data.id)
+    if isinstance(profile, model) and token_data.profile_id in (None, profile.id):
+        return profile
+    
+    statement = select(model)\
+        .join(models.User, models.User.id == model.user_id)\
+        .where(
+            models.User.id == int(token_data.id),
+            models.User.user_type == token_data.user_type
+        )
+    
+    if token_data.profile_id is not None:
+        statement = statement.where(model.id == token_data.profile_id)
+    
+    profile = (await db.execute(statement.limit(1))).scalars().first()
+    
+    if not profile:
+        raise _credentials_exception()
+    
+    db.expunge(profile)
+    principal_cache.set(token_data.id, profile)
+    
+    return profile
+
 def get_current_patient(
-    current_user: models.User = Depends(get_current_user),
+    token_data: schemas.TokenData = Depends(get_token_data),
     db: Session = Depends(database.get_db)
 ):
     """Получение текущего пациента (только для пациентов)"""
-    if current_user.user_type != 'patient':
+    if token_data.user_type != 'patient':
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Доступ только для пациентов"
         )
     
-    # Ищем профиль пациента
-    patient = db.query(models.Patient).filter(models.Patient.user_id == current_user.id).first()
-    
-    if not patient:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Профиль пациента не найден"
-        )
-    
-    return patient
+    return _get_profile(db, models.Patient, token_data)
 
 def get_current_doctor(
-    current_user: models.User = Depends(get_current_user),
+    token_data: schemas.TokenData = Depends(get_token_data),
     db: Session = Depends(database.get_db)
 ):
     """Получение текущего врача (только для врачей)"""
-    if current_user.user_type != 'doctor':
+    if token_data.user_type != 'doctor':
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Доступ только для врачей"
         )
     
-    # Ищем профиль врача
-    doctor = db.query(models.Doctor).filter(models.Doctor.user_id == current_user.id).first()
+    return _get_profile(db, models.Doctor, token_data)
+
+async def get_current_patient_async(
+    token_data: schemas.TokenData = Depends(get_token_data),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """Получение текущего пациента через AsyncSession (только для пациентов)"""
+    if token_data.user_type != 'patient':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Доступ только для пациентов"
+        )
     
-    if not doctor:
+    return await _get_profile_async(db, models.Patient, token_data)
+
+async def get_current_doctor_async(
+    token_data: schemas.TokenData = Depends(get_token_data),
+    db: AsyncSession = Depends(database.get_async_db)
+):
+    """Получение текущего врача через AsyncSession (только для врачей)"""
+    if token_data.user_type != 'doctor':
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Профиль врача не найден"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Доступ только для врачей"
         )
     
-    return doctor
+    return await _get_profile_async(db, models.Doctor, token_data)
 
 def get_current_admin(
     current_user: models.User = Depends(get_current_user),
@@ -0,0 +1,123 @@
+"""
+Keyset-пагинация списков (по умолчанию по (created_at, id)).
+
+Страница выбирается условием (created_at, id) < (курсор) и LIMIT, а не OFFSET,
+поэтому стоимость запроса не растёт с номером страницы и размером таблицы.
+Тело ответа остаётся списком (как раньше), курсор следующей страницы
+возвращается в заголовке X-Next-Cursor; на последней странице заголовка нет.
+"""
+
+import base64
+import json
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import tuple_
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# ключ страниц слотов расписания: (date, start_time, id) по возрастанию
+SLOT_KEY_TYPES = (date, time, int)
+
+
+def slot_key(slot):
+    return (slot.date, slot.start_time, slot.id)
+
+
+class PageParams:
+    """Параметры страницы (зависимость эндпоинта): ?cursor=...&limit=..."""
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="Курсор из заголовка X-Next-Cursor"),
+        limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT)
+    ):
+        self.cursor = cursor
+        self.limit = limit
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return value
+
+
+def encode_cursor(*values) -> str:
+    """Курсор из значений ключа последней строки страницы"""
+    raw = json.dumps([_plain(value) for value in values]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types=(datetime, int)):
+    """Значения ключа из курсора; types - тип каждого значения"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+        if len(values) != len(types):
+            raise ValueError(cursor)
+        return tuple(
+            value_type.fromisoformat(value) if value_type in (datetime, date, time) else value_type(value)
+            for value_type, value in zip(types, values)
+        )
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор страницы"
+        )
+
+
+def seek(query, columns, types, page: PageParams, descending: bool = False):
+    """
+    Keyset по произвольному ключу columns (последняя колонка - уникальная, обычно id):
+    условие курсора, порядок по ключу и LIMIT на одну строку больше страницы
+    (по ней определяется, есть ли следующая). Работает и для Query, и для select().
+    """
+    if page.cursor:
+        values = decode_cursor(page.cursor, types)
+        key, after = tuple_(*columns), tuple_(*values)
+        query = query.filter(key < after if descending else key > after)
+
+    order = [column.desc() if descending else column.asc() for column in columns]
+    return query\
+        .order_by(*order)\
+        .limit(page.limit + 1)
+
+
+def keyset(query, model, page: PageParams):
+    """Страница по (created_at, id) по убыванию - новые первыми"""
+    return seek(query, (model.created_at, model.id), (datetime, int), page, descending=True)
+
+
+def page_of(rows, page: PageParams, response: Response, key=lambda row: (row.created_at, row.id)):
+    """Обрезать лишнюю строку и выставить X-Next-Cursor, если есть следующая страница"""
+    rows = list(rows)
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*key(rows[-1]))
+
+    return rows
+
+
+def date_range(query, column, date_from: Optional[date], date_to: Optional[date]):
+    """Фильтр по диапазону дат (границы включительно)"""
+    if date_from:
+        query = query.filter(column >= date_from)
+    if date_to:
+        query = query.filter(column <= date_to)
+    return query
+
+
+def datetime_range(query, column, date_from: Optional[date], date_to: Optional[date]):
+    """
+    Фильтр по дням для колонки-метки времени (границы включительно).
+    Условия на саму колонку, без func.date() - индекс по ней используется.
+    """
+    if date_from:
+        query = query.filter(column >= datetime.combine(date_from, time.min))
+    if date_to:
+        query = query.filter(column < datetime.combine(date_to + timedelta(days=1), time.min))
+    return query
@@ -0,0 +1,161 @@
+"""
+Профиль противопоказаний пациента для отчётов о лекарствах
+(GET /api/patient/medication и GET /api/doctor/patient/{id}/medication).
+
+Профиль - назначения пациента, запрещённые медикаменты с причинами и общие
+противопоказания - собирается один раз и кэшируется по ключу
+(пациент, patient.profile_version, catalog_version.version). Эндпоинты
+doctor.py, меняющие назначения и противопоказания пациента, вызывают bump()
+в своей транзакции, поэтому версия в БД общая для всех процессов: повторный
+просмотр отчёта стоит одного чтения версий. Версия справочника меняется
+только при его записи (catalog.bump), поэтому пересборки графа по TTL кэш не сбрасывают.
+"""
+
+from datetime import date
+
+from sqlalchemy.orm import Session, joinedload
+
+import cache, interaction_graph, models
+from config import settings
+
+profile_cache = cache.TTLCache(
+    "patient_profiles",
+    maxsize=settings.patient_profile_cache_size,
+    ttl=settings.patient_profile_cache_ttl_seconds
+)
+
+
+class Profile:
+    """Неизменяемый снимок данных отчёта (без полей, зависящих от текущей даты)"""
+
+    __slots__ = ("medicaments", "forbidden_medicaments", "other_contraindications")
+
+    def __init__(self, medicaments, forbidden_medicaments, other_contraindications):
+        self.medicaments = medicaments
+        self.forbidden_medicaments = forbidden_medicaments
+        self.other_contraindications = other_contraindications
+
+    def current_medicaments(self) -> list:
+        """Все назначения пациента (новые первыми) с признаком активности на сегодня"""
+        today = date.today()
+        return [
+            dict(item, is_active=item["end_date"] is None or item["end_date"] >= today)
+            for item in self.medicaments
+        ]
+
+
+def bump(db: Session, patient_id: int):
+    """Назначения или противопоказания пациента меняются в текущей транзакции"""
+    db.query(models.Patient)\
+        .filter(models.Patient.id == patient_id)\
+        .update(
+            {models.Patient.profile_version: models.Patient.profile_version + 1},
+            synchronize_session=False
+        )
+
+
+def bump_where(db: Session, patient_ids):
+    """То же для всех пациентов из подзапроса patient_ids (изменения справочника)"""
+    db.query(models.Patient)\
+        .filter(models.Patient.id.in_(patient_ids))\
+        .update(
+            {models.Patient.profile_version: models.Patient.profile_version + 1},
+            synchronize_session=False
+        )
+
+
+def _build(db: Session, patient_id: int, catalog_version: int) -> Profile:
+    patient_medicaments = db.query(models.PatientMedicament)\
+        .filter(models.PatientMedicament.patient_id == patient_id)\
+        .order_by(models.PatientMedicament.start_date.desc(), models.PatientMedicament.id.desc())\
+        .all()
+
+    patient_medicament_contraindications = db.query(models.PatientMedicamentContraindication.medicament_id)\
+        .filter(models.PatientMedicamentContraindication.patient_id == patient_id)\
+        .all()
+    contraindicated_ids = [pmc.medicament_id for pmc in patient_medicament_contraindications]
+
+    patient_other_contraindications = db.query(models.PatientOtherContraindication)\
+        .options(joinedload(models.PatientOtherContraindication.contraindication))\
+        .filter(models.PatientOtherContraindication.patient_id == patient_id)\
+        .order_by(models.PatientOtherContraindication.contraindication_id)\
+        .all()
+
+    patient_medicament_ids = [pm.medicament_id for pm in patient_medicaments]
+    graph = interaction_graph.get(patient_medicament_ids + contraindicated_ids, catalog_version)
+
+    # медикаменты, которых граф ещё не видел (добавлены в другом процессе), - названия из БД
+    names = graph.names
+    missing = graph.unknown(patient_medicament_ids + contraindicated_ids)
+    if missing:
+        names = dict(names)
+        names.update(db.query(models.Medicament.id, models.Medicament.name)
+                     .filter(models.Medicament.id.in_(missing))
+                     .all())
+
+    forbidden = set()
+
+    # Прямые противопоказания
+    for medicament_id in contraindicated_ids:
+        forbidden.add((medicament_id, names[medicament_id], "Прямое противопоказание пациента"))
+
+    # Взаимодействия учитываются, только если у пациента не меньше двух назначений
+    if len(patient_medicament_ids) >= 2:
+        for medicament_id in set(patient_medicament_ids):
+            for other_id in graph.interactions.get(medicament_id, ()):
+                forbidden.add((
+                    other_id,
+                    names[other_id],
+                    f"Взаимодействует с '{names[medicament_id]}'"
+                ))
+
+    current_ids = set(patient_medicament_ids)
+
+    return Profile(
+        medicaments=[
+            {
+                "id": pm.id,
+                "medicament_id": pm.medicament_id,
+                "medicament_name": names[pm.medicament_id],
+                "dosage": pm.dosage,
+                "frequency": pm.frequency,
+                "start_date": pm.start_date,
+                "end_date": pm.end_date,
+                "notes": pm.notes,
+            }
+            for pm in patient_medicaments
+        ],
+        forbidden_medicaments=[
+            {
+                "medicament_id": medicament_id,
+                "medicament_name": medicament_name,
+                "reason": reason
+            }
+            for medicament_id, medicament_name, reason in sorted(forbidden)
+            if medicament_id not in current_ids  # фильтруем те, что уже принимает
+        ],
+        other_contraindications=[
+            {
+                "contraindication_id": poc.contraindication_id,
+                "contraindication_name": poc.contraindication.name,
+                "type": "Общее противопоказание"
+            }
+            for poc in patient_other_contraindications
+        ],
+    )
+
+
+def get(db: Session, patient_id: int, version: int, catalog_version: int) -> Profile:
+    """
+    Профиль пациента для версий version (patient.profile_version) и catalog_version
+    (catalog.version_column()), прочитанных вызывающим одним запросом вместе с
+    остальными данными пациента.
+    """
+    key = (patient_id, version, catalog_version)
+
+    profile = profile_cache.get(key)
+    if profile is None:
+        profile = _build(db, patient_id, catalog_version)
+        profile_cache.set(key, profile)
+
+    return profile
@@ -0,0 +1,295 @@
+"""
+Ночной аудит полипрагмазии по всем пациентам.
+
+Отмечаются пациенты, чьи активные назначения (patient_medicament) содержат
+взаимодействующую пару из medicament_medicament_contraindication или лекарство,
+к которому у пациента прямое противопоказание. Проверка векторная:
+
+- взаимодействия - разреженная булева матрица A (medicament x medicament),
+  A[i, j] = 1 для пары i < j;
+- пациенты читаются диапазонами id по polypharmacy_audit_chunk_patients,
+  для диапазона строятся матрицы инцидентности P (активные назначения) и
+  C (прямые противопоказания) patient x medicament;
+- (P @ A) * P отмечает пациентов с взаимодействующей парой, сами пары
+  восстанавливаются только для отмеченных строк; P * C - противопоказания.
+
+Запросы - Core-строки (patient_id, medicament_id) без ORM. Находки пишутся
+в polypharmacy_audit_finding, итог - в polypharmacy_audit_run; выгрузка в
+NDJSON - GET /api/admin/audit/polypharmacy/{run_id}/findings.
+
+Одновременно выполняется не больше одного запуска (частичный уникальный индекс
+по status = 'running' - и для cron, и для POST /api/admin/audit/polypharmacy).
+Каждый диапазон обновляет heartbeat_at; запуск без прогресса дольше
+polypharmacy_audit_stale_minutes (процесс остановлен) при следующем старте
+помечается failed.
+
+Запуск по расписанию (cron) из project/app:
+    python -m polypharmacy_audit
+"""
+
+import sys
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy import and_, func, insert, or_, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import aliased
+
+import database, models
+from config import settings
+
+KIND_INTERACTION = "interaction"
+KIND_CONTRAINDICATION = "contraindication"
+
+
+class AlreadyRunning(Exception):
+    """Другой запуск аудита ещё выполняется"""
+
+# колонки выгрузки находок (export.stream)
+_other = aliased(models.Medicament)
+FINDING_COLUMNS = {
+    "patient_id": models.PolypharmacyAuditFinding.patient_id,
+    "kind": models.PolypharmacyAuditFinding.kind,
+    "medicament_id": models.PolypharmacyAuditFinding.medicament_id,
+    "medicament_name": models.Medicament.name,
+    "other_medicament_id": models.PolypharmacyAuditFinding.other_medicament_id,
+    "other_medicament_name": _other.name,
+}
+
+
+def findings_statement(run_id: int):
+    finding = models.PolypharmacyAuditFinding
+    return select(finding.id)\
+        .outerjoin(models.Medicament, models.Medicament.id == finding.medicament_id)\
+        .outerjoin(_other, _other.id == finding.other_medicament_id)\
+        .where(finding.run_id == run_id)\
+        .order_by(finding.id)
+
+
+def interaction_matrix(first_ids, second_ids, size: int) -> sparse.csr_matrix:
+    """Верхнетреугольная матрица пар взаимодействия (first < second) размером size x size"""
+    return sparse.csr_matrix(
+        (np.ones(len(first_ids), dtype=np.int32), (first_ids, second_ids)),
+        shape=(size, size)
+    )
+
+
+def incidence(rows, medicament_ids, shape) -> sparse.csr_matrix:
+    """Матрица пациент x медикамент; повторы пар схлопываются в одну единицу"""
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, medicament_ids)),
+        shape=shape
+    )
+    matrix.data[:] = 1
+    return matrix
+
+
+def screen(active: sparse.csr_matrix, contraindicated: sparse.csr_matrix,
+           interactions: sparse.csr_matrix):
+    """
+    Находки по матрицам одного диапазона пациентов:
+    ((строка, first, second) взаимодействующих пар, (строка, medicament_id) противопоказаний).
+    """
+    # (p, j): пациент p принимает j и хотя бы одно i < j, взаимодействующее с j
+    hits = active.multiply(active @ interactions)
+    flagged = np.flatnonzero(hits.getnnz(axis=1))
+
+    # для отмеченных строк каждое назначение i разворачивается в пары (i, j) строки A
+    taken = active[flagged].tocoo()
+    starts = interactions.indptr[taken.col]
+    counts = interactions.indptr[taken.col + 1] - starts
+    total = int(counts.sum())
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    rows = np.repeat(taken.row, counts)
+    firsts = np.repeat(taken.col, counts)
+    seconds = interactions.indices[np.repeat(starts, counts) + offsets]
+
+    # пара остаётся, если j тоже среди назначений строки
+    width = active.shape[1]
+    keep = np.isin(
+        rows.astype(np.int64) * width + seconds,
+        taken.row.astype(np.int64) * width + taken.col
+    )
+    pairs = (flagged[rows[keep]], firsts[keep], seconds[keep])
+
+    direct = sparse.coo_matrix(active.multiply(contraindicated))
+    return pairs, (direct.row, direct.col)
+
+
+def _active(today: date):
+    return and_(
+        models.PatientMedicament.start_date <= today,
+        or_(
+            models.PatientMedicament.end_date.is_(None),
+            models.PatientMedicament.end_date >= today
+        )
+    )
+
+
+def _pairs_array(rows) -> np.ndarray:
+    return np.array(rows, dtype=np.int64).reshape(-1, 2)
+
+
+def _audit(db, run_id: int):
+    today = date.today()
+    chunk = settings.polypharmacy_audit_chunk_patients
+
+    size = (db.scalar(select(func.max(models.Medicament.id))) or 0) + 1
+    pair_table = models.MedicamentMedicamentContraindication
+    pairs = _pairs_array(
+        db.execute(select(pair_table.medication_first_id, pair_table.medication_second_id)).all()
+    )
+    interactions = interaction_matrix(pairs[:, 0], pairs[:, 1], size)
+
+    first_patient, last_patient = db.execute(
+        select(func.min(models.Patient.id), func.max(models.Patient.id))
+    ).one()
+    if first_patient is None:
+        return
+
+    scanned = flagged_total = findings_total = 0
+    for low in range(first_patient, last_patient + 1, chunk):
+        high = low + chunk
+
+        prescriptions = _pairs_array(
+            db.execute(
+                select(models.PatientMedicament.patient_id, models.PatientMedicament.medicament_id)
+                .where(models.PatientMedicament.patient_id >= low, models.PatientMedicament.patient_id < high)
+                .where(_active(today))
+            ).all()
+        )
+        if not len(prescriptions):
+            continue
+        contraindication_table = models.PatientMedicamentContraindication
+        contraindications = _pairs_array(
+            db.execute(
+                select(contraindication_table.patient_id, contraindication_table.medicament_id)
+                .where(contraindication_table.patient_id >= low, contraindication_table.patient_id < high)
+            ).all()
+        )
+
+        # медикаменты, добавленные после чтения справочника, взаимодействий не имеют
+        prescriptions = prescriptions[prescriptions[:, 1] < size]
+        contraindications = contraindications[contraindications[:, 1] < size]
+
+        shape = (chunk, size)
+        active = incidence(prescriptions[:, 0] - low, prescriptions[:, 1], shape)
+        contraindicated = incidence(contraindications[:, 0] - low, contraindications[:, 1], shape)
+        (pair_rows, firsts, seconds), (direct_rows, direct_ids) = screen(active, contraindicated, interactions)
+
+        findings = [
+            {"run_id": run_id, "patient_id": int(row) + low, "kind": KIND_INTERACTION,
+             "medicament_id": int(first), "other_medicament_id": int(second)}
+            for row, first, second in zip(pair_rows, firsts, seconds)
+        ] + [
+            {"run_id": run_id, "patient_id": int(row) + low, "kind": KIND_CONTRAINDICATION,
+             "medicament_id": int(medicament_id), "other_medicament_id": None}
+            for row, medicament_id in zip(direct_rows, direct_ids)
+        ]
+        if findings:
+            db.execute(insert(models.PolypharmacyAuditFinding), findings)
+
+        scanned += len(np.unique(prescriptions[:, 0]))
+        flagged_total += len(np.union1d(pair_rows, direct_rows))
+        findings_total += len(findings)
+
+        # прогресс виден в GET /api/admin/audit/polypharmacy до окончания запуска
+        db.execute(
+            update(models.PolypharmacyAuditRun)
+            .where(models.PolypharmacyAuditRun.id == run_id)
+            .values(
+                patients_scanned=scanned, patients_flagged=flagged_total, findings=findings_total,
+                heartbeat_at=func.now()
+            )
+        )
+        db.commit()
+
+
+def _fail_stale(db):
+    """Запуски без прогресса дольше polypharmacy_audit_stale_minutes - прерваны вместе с процессом"""
+    stale_minutes = settings.polypharmacy_audit_stale_minutes
+    db.execute(
+        update(models.PolypharmacyAuditRun)
+        .where(
+            models.PolypharmacyAuditRun.status == "running",
+            models.PolypharmacyAuditRun.heartbeat_at < func.now() - timedelta(minutes=stale_minutes)
+        )
+        .values(
+            status="failed",
+            error=f"Нет прогресса дольше {stale_minutes} мин, запуск прерван",
+            finished_at=func.now()
+        )
+    )
+
+
+def create_run(db) -> int:
+    """
+    Создать запуск и вернуть его id; AlreadyRunning, если другой ещё выполняется.
+    Проверка - сам INSERT: при гонке двух запусков второй упирается в
+    ux_polypharmacy_audit_run_running и ничего не вставляет.
+    """
+    _fail_stale(db)
+    run_id = db.scalar(
+        pg_insert(models.PolypharmacyAuditRun)
+        .on_conflict_do_nothing(index_elements=["status"], index_where=text("status = 'running'"))
+        .returning(models.PolypharmacyAuditRun.id)
+    )
+    if run_id is None:
+        db.rollback()
+        raise AlreadyRunning()
+    db.commit()
+    return run_id
+
+
+def run(run_id: int = None) -> int:
+    """
+    Выполнить аудит; run_id - заранее созданный запуск (start), иначе создаётся новый
+    (AlreadyRunning, если другой ещё выполняется). Возвращает id запуска.
+    """
+    db = database.SessionLocal()
+    try:
+        if run_id is None:
+            run_id = create_run(db)
+
+        try:
+            _audit(db, run_id)
+        except Exception as error:
+            db.rollback()
+            db.execute(
+                update(models.PolypharmacyAuditRun)
+                .where(models.PolypharmacyAuditRun.id == run_id)
+                .values(status="failed", error=str(error), finished_at=func.now())
+            )
+            db.commit()
+            raise
+
+        db.execute(
+            update(models.PolypharmacyAuditRun)
+            .where(models.PolypharmacyAuditRun.id == run_id)
+            .values(status="done", finished_at=func.now())
+        )
+        db.commit()
+        return run_id
+    finally:
+        db.close()
+
+
+def start(db) -> int:
+    """
+    Создать запуск и выполнить его в фоновом потоке (POST /api/admin/audit/polypharmacy).
+    Возвращает id запуска; AlreadyRunning, если другой ещё выполняется.
+    """
+    run_id = create_run(db)
+    threading.Thread(target=run, args=(run_id,), daemon=True).start()
+    return run_id
+
+
+if __name__ == "__main__":
+    try:
+        run_id = run()
+    except AlreadyRunning:
+        print("аудит полипрагмазии: другой запуск ещё выполняется", file=sys.stderr)
+        sys.exit(1)
+    print(f"аудит полипрагмазии: запуск {run_id} завершён")
@@ -1,12 +1,17 @@
-import models,schemas, oauth2, utils
-from fastapi import FastAPI, Response, status, HTTPException, Depends, APIRouter
+import models,schemas, oauth2, utils, loaders, cache, pagination, export, serialization, schedule_templates, availability_index, schedule_cache, polypharmacy_audit
+from fastapi import FastAPI, Response, status, HTTPException, Depends, APIRouter, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from database import get_db
 from typing import Optional,List
-from sqlalchemy import func, and_
+from sqlalchemy import and_, insert
 from sqlalchemy.exc import IntegrityError
-from datetime import timedelta
+from datetime import timedelta, date, time
 import exceptions
+import db_metrics
+import database
+from config import settings
 
 router = APIRouter(
     prefix = "/api/admin",
@@ -90,23 +95,56 @@ def delete_specialization(
 
 @router.get("/patients",
             response_model=List[schemas.PatientResponse])
+@db_metrics.query_budget(2)
 @exceptions.handle_exceptions(custom_message="Не удалось получить список всех пациентов")
-def get_all_specializations(db: Session = Depends(get_db),current_admin = Depends(oauth2.get_current_admin)):
+def get_all_specializations(
+    response: Response,
+    page: pagination.PageParams = Depends(),
+    db: Session = Depends(get_db),
+    current_admin = Depends(oauth2.get_current_admin)
+):
     """
-    Получение списка всех пациентов.
+    Получение списка пациентов постранично (новые первыми).
     """
-    specializations = db.query(models.Patient).all()
-    return specializations
+    specializations = pagination.keyset(db.query(models.Patient), models.Patient, page).all()
+    return pagination.page_of(specializations, page, response)
 
 @router.get("/appointments",
             response_model=List[schemas.AppointmentResponse])
+@db_metrics.query_budget(3)
 @exceptions.handle_exceptions(custom_message="Не удалось получить список всех записей")
-def get_all_specializations(db: Session = Depends(get_db),current_admin = Depends(oauth2.get_current_admin)):
+def get_all_specializations(
+    response: Response,
+    status_filter: Optional[str] = None,
+    doctor_id: Optional[int] = None,
+    patient_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    page: pagination.PageParams = Depends(),
+    db: Session = Depends(get_db),
+    current_admin = Depends(oauth2.get_current_admin)
+):
     """
-    Получение всех записей к врачам
+    Получение записей к врачам постранично (новые первыми).
+    Фильтры: статус, врач, пациент, диапазон дат приема.
     """
-    appointments = db.query(models.Appointment).all()
-    return appointments
+    appointments = db.query(models.Appointment)\
+        .join(models.Appointment.schedule)\
+        .options(*loaders.appointment_options(schedule_joined=True))
+    if status_filter:
+        appointments = appointments.filter(models.Appointment.status == status_filter)
+    if doctor_id:
+        appointments = appointments.filter(models.Schedule.doctor_id == doctor_id)
+    if patient_id:
+        appointments = appointments.filter(models.Appointment.patient_id == patient_id)
+    appointments = pagination.date_range(appointments, models.Schedule.date, date_from, date_to)
+    
+    appointments = pagination.keyset(appointments, models.Appointment, page).all()
+    return serialization.list_response(
+        schemas.AppointmentResponse,
+        pagination.page_of(appointments, page, response),
+        response
+    )
 
 
 @router.get("/specializations",
@@ -120,13 +158,24 @@ def get_all_specializations(db: Session = Depends(get_db),current_admin = Depend
 
 @router.post("/doctor", response_model=schemas.Token)
 @exceptions.handle_exceptions(custom_message="Не удалось создать врача")
-def register_doctor(
+async def register_doctor(
     doctor_data: schemas.DoctorCreate,
     current_admin = Depends(oauth2.get_current_admin),
     db: Session = Depends(get_db)
 ):
     """
     Регистрация врача с созданием пользователя и профиля врача
+    Пароль хешируется в пуле Argon2 (utils), работа с БД - в общем пуле потоков.
+    """
+    # Хешируем пароль
+    hashed_password = await utils.hash_async(doctor_data.password)
+    
+    return await run_in_threadpool(_create_doctor, doctor_data, hashed_password, db)
+
+
+def _create_doctor(doctor_data: schemas.DoctorCreate, hashed_password: str, db: Session):
+    """
+    Создание пользователя и профиля врача с уже захешированным паролем
     """
     # Проверяем, существует ли пользователь с таким email
     existing_user = db.query(models.User).filter(
@@ -151,9 +200,6 @@ def register_doctor(
             detail="Врач с такими данными уже существует"
         )
     
-    # Хешируем пароль
-    hashed_password = utils.hash(doctor_data.password)
-
     first_name_normalized = (
         doctor_data.first_name.capitalize() 
         if doctor_data.first_name 
@@ -204,7 +250,8 @@ def register_doctor(
     access_token = oauth2.create_access_token(
         data={
             "user_id": db_user.id,
-            "user_type": 'doctor'
+            "user_type": 'doctor',
+            "profile_id": db_doctor.id
         }
     )
     
@@ -225,12 +272,23 @@ def create_schedule(
     """
     Создание одного расписания
     """
-    # Просто создаем объект доктора
-    db_schedule = models.Schedule(**schedule.model_dump())
+    # Кабинет передаётся номером
+    office_id = db.query(models.Office.id)\
+        .filter(models.Office.number == schedule.office_number)\
+        .scalar()
+    
+    if office_id is None:
+        raise HTTPException(404, f"Кабинет {schedule.office_number} не найден")
+    
+    # Пересечения по врачу и кабинету проверяет БД (EXCLUDE-ограничения, 409)
+    row = dict(schedule.model_dump(exclude={"office_number"}), office_id=office_id)
+    db_schedule = models.Schedule(**row)
     
     # Добавляем в базу
     db.add(db_schedule)
     db.commit()
+    availability_index.slots_created(db, [row], [db_schedule.id])
+    schedule_cache.invalidate(schedule.doctor_id, schedule.date)
     
     return {
         "status": "success",
@@ -253,14 +311,6 @@ def create_schedule_batch(
     Создаст 4 слота по 1 часу: 9-10, 10-11, 11-12, 12-13
     """
 
-    # Проверяем врача
-    doctor = db.query(models.Doctor)\
-        .filter(models.Doctor.id == schedule.doctor_id)\
-        .first()
-    
-    if not doctor:
-        raise HTTPException(404, f"Врач с ID {schedule.doctor_id} не найден")
-    
     # Проверяем время
     if schedule.end_time <= schedule.start_time:
         raise HTTPException(400, "Конечное время должно быть больше начального")
@@ -268,41 +318,6 @@ def create_schedule_batch(
     if schedule.slots_count <= 0:
         raise HTTPException(400, "Количество слотов должно быть больше 0")
     
-    # Проверяем, нет ли уже расписаний в этом интервале
-    existing_schedules = db.query(models.Schedule)\
-        .filter(
-            models.Schedule.doctor_id == schedule.doctor_id,
-            models.Schedule.date == schedule.date,
-            models.Schedule.start_time < schedule.end_time,
-            models.Schedule.end_time > schedule.start_time
-        )\
-        .all()
-    
-    if existing_schedules:
-        raise HTTPException(
-            400,
-            f"Врач уже имеет расписания в указанном интервале"
-        )
-    
-    # Проверяем офис на занятость в этот день
-    existing_office_schedules = db.query(models.Schedule)\
-        .filter(
-            models.Schedule.office_id == schedule.office_id,
-            models.Schedule.date == schedule.date,
-            models.Schedule.start_time < schedule.end_time,
-            models.Schedule.end_time > schedule.start_time
-        )\
-        .all()
-    
-    if existing_office_schedules:
-        raise HTTPException(
-            400,
-            f"Офис {schedule.office_id} уже занят в указанный интервал"
-        )
-    
-    if schedule.slots_count <= 0:
-        raise HTTPException(400, "Количество слотов должно быть больше 0")
-    
     # Преобразуем время в секунды для расчетов
     start_seconds = schedule.start_time.hour * 3600 + schedule.start_time.minute * 60
     end_seconds = schedule.end_time.hour * 3600 + schedule.end_time.minute * 60
@@ -321,6 +336,7 @@ def create_schedule_batch(
     slot_minutes = (slot_duration % 3600) // 60
     
     created_slots = []
+    slot_rows = []
     
     # Создаем слоты
     current_seconds = start_seconds
@@ -342,34 +358,14 @@ def create_schedule_batch(
         slot_start_time = dt_time(start_hour, start_minute)
         slot_end_time = dt_time(end_hour, end_minute)
         
-        # Проверяем пересечения
-        existing_slot = db.query(models.Schedule)\
-            .filter(
-                models.Schedule.doctor_id == schedule.doctor_id,
-                models.Schedule.date == schedule.date,
-                models.Schedule.start_time < slot_end_time,
-                models.Schedule.end_time > slot_start_time
-            )\
-            .first()
-        
-        if existing_slot:
-            raise HTTPException(
-                400,
-                f"Слот {i+1} пересекается с существующим: "
-                f"{existing_slot.start_time} - {existing_slot.end_time}"
-            )
-        
-        # Создаем слот
-        db_slot = models.Schedule(
-            doctor_id=schedule.doctor_id,
-            office_id=schedule.office_id,
-            date=schedule.date,
-            start_time=slot_start_time,
-            end_time=slot_end_time,
-            is_available=True
-        )
-        
-        db.add(db_slot)
+        slot_rows.append({
+            "doctor_id": schedule.doctor_id,
+            "office_id": schedule.office_id,
+            "date": schedule.date,
+            "start_time": slot_start_time,
+            "end_time": slot_end_time,
+            "is_available": True
+        })
         created_slots.append({
             'slot': i + 1,
             'start': slot_start_time.isoformat()[:5],  # HH:MM
@@ -379,7 +375,14 @@ def create_schedule_batch(
         # Переходим к следующему слоту
         current_seconds = slot_end_seconds
     
+    # Все слоты одним INSERT; пересечения с существующими расписаниями врача и кабинета,
+    # как и несуществующий врач/кабинет, отклоняет БД
+    slot_ids = db.execute(
+        insert(models.Schedule).values(slot_rows).returning(models.Schedule.id, sort_by_parameter_order=True)
+    ).scalars().all()
     db.commit()
+    availability_index.slots_created(db, slot_rows, slot_ids)
+    schedule_cache.invalidate(schedule.doctor_id, schedule.date)
     
     return {
         "status": "success",
@@ -393,6 +396,51 @@ def create_schedule_batch(
 
 
 
+@router.post("/schedule/template", response_model=dict)
+@exceptions.handle_exceptions(custom_message="Не удалось создать расписание по шаблону")
+def create_schedule_from_template(
+    template: schemas.ScheduleTemplateCreate,
+    current_admin = Depends(oauth2.get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Повторяющийся шаблон: слоты длиной slot_minutes в окне start_time-end_time
+    по выбранным дням недели (0 - понедельник) в диапазоне дат до года.
+    Все слоты создаются одной транзакцией; dry_run - только расчёт без записи.
+    """
+    if template.end_time <= template.start_time:
+        raise HTTPException(400, "Конечное время должно быть больше начального")
+    
+    if template.date_from < date.today():
+        raise HTTPException(400, "Нельзя создавать расписание на прошедшие даты")
+    
+    starts, ends = schedule_templates.expand(template)
+    
+    if len(starts) == 0:
+        raise HTTPException(400, "Шаблон не даёт ни одного слота")
+    
+    rows = schedule_templates.to_rows(template, starts, ends)
+    
+    if not template.dry_run:
+        slot_ids = schedule_templates.create_slots(db, rows)
+        availability_index.slots_created(db, rows, slot_ids)
+        schedule_cache.invalidate_range(template.doctor_id, template.date_from, template.date_to)
+    
+    return {
+        "status": "success",
+        "dry_run": template.dry_run,
+        "doctor_id": template.doctor_id,
+        "office_id": template.office_id,
+        "total_slots": len(rows),
+        "days": len(set(row["date"] for row in rows)),
+        "first_slot": f"{rows[0]['date'].isoformat()} {rows[0]['start_time'].isoformat()[:5]}",
+        "last_slot": f"{rows[-1]['date'].isoformat()} {rows[-1]['start_time'].isoformat()[:5]}",
+        "message": (f"Будет создано {len(rows)} слотов" if template.dry_run
+                    else f"Создано {len(rows)} слотов по {template.slot_minutes} минут")
+    }
+
+
+
 @router.delete("/doctor/{doctor_id}", 
                status_code=status.HTTP_204_NO_CONTENT)
 @exceptions.handle_exceptions(custom_message="Не удалось удалить доктора")
@@ -447,6 +495,12 @@ def delete_doctor(
         db.commit()
     finally:
         db.close()
+    
+    # Токены удалённого пользователя больше не должны проходить через кэш
+    oauth2.invalidate_principal(user_id)
+    oauth2.revoke_user_tokens(user_id)
+    availability_index.doctor_removed(doctor_id)
+    schedule_cache.invalidate_doctor(doctor_id)
 
     return Response(status_code=204)
 
@@ -497,6 +551,10 @@ def delete_patient(
         db.commit()
     finally:
         db.close()
+    
+    # Токены удалённого пользователя больше не должны проходить через кэш
+    oauth2.invalidate_principal(user_id)
+    oauth2.revoke_user_tokens(user_id)
 
     return Response(status_code=204)
 
@@ -531,6 +589,8 @@ def delete_schedule(
     # Удаляем само расписание
     db.delete(schedule)
     db.commit()
+    availability_index.slots_removed([schedule_id])
+    schedule_cache.invalidate(schedule.doctor_id, schedule.date)
     
 
     
@@ -572,6 +632,8 @@ def delete_appointment(
         schedule.is_available = True
         db.add(schedule)
         db.commit()
+        availability_index.slot_released(schedule.id)
+        schedule_cache.invalidate(schedule.doctor_id, schedule.date)
     
     
     return Response(status_code=204)
@@ -591,6 +653,7 @@ def search_doctors(
     Поиск доктора по фамилии\имени\отчеству\специализации
     """
     doctors = db.query(models.Doctor)\
+        .options(*loaders.doctor_options())\
         .filter(
             (models.Doctor.first_name.ilike(f"%{search_term}%")) |
             (models.Doctor.last_name.ilike(f"%{search_term}%")) |
@@ -606,56 +669,70 @@ def search_doctors(
 
 @router.get("/doctors",
             response_model=List[schemas.DoctorResponse])
+@db_metrics.query_budget(2)
 @exceptions.handle_exceptions(custom_message="Не удалось получить список докторов")
 def search_doctors(
+    response: Response,
+    page: pagination.PageParams = Depends(),
     db: Session = Depends(get_db),
     current_admin = Depends(oauth2.get_current_admin)
 ):
     """
-    Поиск доктора по фамилии\имени\отчеству\специализации
+    Получение списка докторов постранично
     """
-    doctors = db.query(models.Doctor).all()
+    doctors = db.query(models.Doctor)\
+        .options(*loaders.doctor_options())
+    doctors = pagination.keyset(doctors, models.Doctor, page).all()
     
-    return doctors
+    return pagination.page_of(doctors, page, response)
 
 
 
 @router.get("/doctors",response_model=List[schemas.DoctorResponseAdmin])
+@db_metrics.query_budget(2)
 @exceptions.handle_exceptions(custom_message="Не удалось получить список докторов")
-def get_doctors(db: Session = Depends(get_db),current_admin = Depends(oauth2.get_current_admin)):
+def get_doctors(
+    response: Response,
+    page: pagination.PageParams = Depends(),
+    db: Session = Depends(get_db),
+    current_admin = Depends(oauth2.get_current_admin)
+):
     """
-    Получение списка всех докторов
+    Получение списка докторов постранично
     """
-    doctors= db.query(models.Doctor).all()
-    return doctors
+    doctors= db.query(models.Doctor)\
+        .options(*loaders.doctor_options())
+    doctors = pagination.keyset(doctors, models.Doctor, page).all()
+    return pagination.page_of(doctors, page, response)
 
 
 @router.get("/schedule/{doctor_id}",response_model=List[schemas.ScheduleResponse])
+@db_metrics.query_budget(4)
 @exceptions.handle_exceptions(custom_message="Не удалось получить расписание доктора")
-def get_doctors_schedule(doctor_id: int,current_admin = Depends(oauth2.get_current_admin), 
-                         db: Session = Depends(get_db)):
+def get_doctors_schedule(
+    doctor_id: int,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    only_available: bool = False,
+    current_admin = Depends(oauth2.get_current_admin),
+    db: Session = Depends(get_db)
+):
     """
-    Получение расписания определенного врача
+    Расписание врача за период (по умолчанию 8 недель с сегодняшнего дня).
+    Недели берутся из кэша (schedule_cache), недостающие - одним запросом.
     """
-    doctor = db.query(models.Doctor).filter(models.Doctor.id == doctor_id).first()
-    
-    if not doctor:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Врач с ID {doctor_id} не найден"
-        )
-    
-    # Создаем базовый запрос с использованием relationship
-    query = db.query(models.Schedule)\
-        .filter(models.Schedule.doctor_id == doctor_id)
-    
-    # Сортируем результаты
-    schedules = query.order_by(
-        models.Schedule.date.asc(),
-        models.Schedule.start_time.asc()
-    ).all()
+    date_from, date_to = schedule_cache.window(date_from, date_to)
+    weeks, missing = schedule_cache.lookup(doctor_id, date_from, date_to)
+    
+    if missing:
+        doctor_statement, schedule_statement = schedule_cache.load_statements(doctor_id, missing)
+        if not db.scalar(doctor_statement):
+            raise schedule_cache.doctor_not_found(doctor_id)
+        schedules = db.scalars(schedule_statement).all()
+        
+        weeks.update(schedule_cache.store(doctor_id, missing, schedules))
     
-    return schedules
+    return ORJSONResponse(schedule_cache.assemble(weeks, date_from, date_to, only_available))
 
 
 
@@ -749,3 +826,220 @@ def delete_office(
     
     return Response(status_code=204)
 
+
+@router.get("/cache/stats", response_model=dict)
+@exceptions.handle_exceptions(custom_message="Не удалось получить статистику кэшей")
+def get_cache_stats(current_admin = Depends(oauth2.get_current_admin)):
+    """
+    Счётчики внутрипроцессных кэшей (попадания, промахи, вытеснения) текущего процесса.
+    """
+    return cache.all_stats()
+
+
+@router.get("/metrics/password-hashing", response_model=dict)
+@exceptions.handle_exceptions(custom_message="Не удалось получить статистику хеширования паролей")
+def get_password_hashing_stats(current_admin = Depends(oauth2.get_current_admin)):
+    """
+    Загрузка пула Argon2: ожидание в очереди, время хеширования, отказы 503.
+    """
+    return utils.password_metrics.stats()
+
+
+@router.get("/availability/search", response_model=List[schemas.ScheduleResponse])
+@db_metrics.query_budget(3)
+@exceptions.handle_exceptions(custom_message="Не удалось найти свободные слоты")
+def search_available_slots(
+    response: Response,
+    specialization_id: Optional[int] = None,
+    doctor_id: Optional[int] = None,
+    office_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    time_from: Optional[time] = None,
+    time_to: Optional[time] = None,
+    page: pagination.PageParams = Depends(),
+    current_admin = Depends(oauth2.get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Ближайшие свободные слоты по индексу в памяти процесса (availability_index):
+    специализация или врач, кабинет, окно дат (по умолчанию две недели), время дня.
+    Найденные слоты читаются из БД одним запросом по id; занятые в других
+    процессах в ответ не попадают и снимаются с индекса.
+    """
+    if not settings.availability_index_enabled:
+        raise HTTPException(503, "Индекс свободных слотов отключён")
+    
+    if not availability_index.index.ensure_built():
+        raise HTTPException(503, "Индекс свободных слотов строится, повторите запрос позже")
+    
+    date_from = date_from or date.today()
+    date_to = date_to or date_from + timedelta(days=13)
+    after = pagination.decode_cursor(page.cursor, pagination.SLOT_KEY_TYPES) if page.cursor else None
+    
+    slot_ids = availability_index.index.search(
+        date_from, date_to,
+        specialization_id=specialization_id,
+        doctor_id=doctor_id,
+        office_id=office_id,
+        time_from=time_from,
+        time_to=time_to,
+        after=after,
+        limit=page.limit + 1
+    )
+    
+    slots = db.query(models.Schedule)\
+        .options(*loaders.schedule_options())\
+        .filter(models.Schedule.id.in_(slot_ids))\
+        .all() if slot_ids else []
+    
+    # порядок индекса; курсор - по последнему слоту страницы, даже если его уже заняли
+    by_id = {slot.id: slot for slot in slots}
+    slots = pagination.page_of(
+        [by_id[slot_id] for slot_id in slot_ids if slot_id in by_id],
+        page, response, key=pagination.slot_key
+    )
+    
+    for slot in slots:
+        if not slot.is_available:
+            availability_index.slot_booked(slot.id)
+    
+    return serialization.list_response(
+        schemas.ScheduleResponse,
+        [slot for slot in slots if slot.is_available],
+        response
+    )
+
+
+@router.get("/availability/stats", response_model=dict)
+@exceptions.handle_exceptions(custom_message="Не удалось получить состояние индекса свободных слотов")
+def get_availability_stats(current_admin = Depends(oauth2.get_current_admin)):
+    """
+    Размер, память и возраст индекса свободных слотов текущего процесса.
+    """
+    return availability_index.index.stats()
+
+
+@router.get("/db/pool", response_model=dict)
+@exceptions.handle_exceptions(custom_message="Не удалось получить состояние пула соединений")
+def get_db_pool_status(current_admin = Depends(oauth2.get_current_admin)):
+    """
+    Состояние пула соединений текущего процесса: занятые/свободные/сверх лимита
+    соединения и гистограмма ожидания соединения.
+    """
+    return db_metrics.pool_status(database.engine)
+
+
+@router.get("/export/patients")
+@exceptions.handle_exceptions(custom_message="Не удалось выгрузить пациентов")
+def export_patients(
+    format: str = "ndjson",
+    columns: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    current_admin = Depends(oauth2.get_current_admin)
+):
+    """
+    Потоковая выгрузка пациентов (NDJSON или CSV) с постоянным расходом памяти.
+    columns - список колонок через запятую, date_from/date_to - дата регистрации.
+    """
+    selected = export.select_columns(export.PATIENT_COLUMNS, columns)
+    statement = pagination.datetime_range(
+        export.patients_statement(),
+        models.Patient.created_at,
+        date_from,
+        date_to
+    )
+    
+    return export.stream(statement, selected, format, "patients")
+
+
+@router.get("/export/appointments")
+@exceptions.handle_exceptions(custom_message="Не удалось выгрузить записи на прием")
+def export_appointments(
+    format: str = "ndjson",
+    columns: Optional[str] = None,
+    status_filter: Optional[str] = None,
+    doctor_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    current_admin = Depends(oauth2.get_current_admin)
+):
+    """
+    Потоковая выгрузка записей на прием (NDJSON или CSV) с постоянным расходом памяти.
+    columns - список колонок через запятую, date_from/date_to - дата приема.
+    """
+    selected = export.select_columns(export.APPOINTMENT_COLUMNS, columns)
+    statement = export.appointments_statement()
+    if status_filter:
+        statement = statement.where(models.Appointment.status == status_filter)
+    if doctor_id:
+        statement = statement.where(models.Schedule.doctor_id == doctor_id)
+    statement = pagination.date_range(statement, models.Schedule.date, date_from, date_to)
+    
+    return export.stream(statement, selected, format, "appointments")
+
+
+@router.post("/audit/polypharmacy", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
+@db_metrics.query_budget(3)
+@exceptions.handle_exceptions(custom_message="Не удалось запустить аудит полипрагмазии")
+def start_polypharmacy_audit(
+    current_admin = Depends(oauth2.get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Запустить аудит полипрагмазии в фоне (то же, что ночной python -m polypharmacy_audit).
+    Ход выполнения - GET /audit/polypharmacy.
+    """
+    try:
+        run_id = polypharmacy_audit.start(db)
+    except polypharmacy_audit.AlreadyRunning:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Аудит уже выполняется, ход выполнения - GET /audit/polypharmacy"
+        )
+    
+    return {"run_id": run_id, "status": "running"}
+
+
+@router.get("/audit/polypharmacy", response_model=List[schemas.PolypharmacyAuditRunResponse])
+@db_metrics.query_budget(2)
+@exceptions.handle_exceptions(custom_message="Не удалось получить запуски аудита полипрагмазии")
+def get_polypharmacy_audit_runs(
+    limit: int = Query(20, ge=1, le=100),
+    current_admin = Depends(oauth2.get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Последние запуски аудита: статус, число проверенных и отмеченных пациентов, находок.
+    """
+    return db.query(models.PolypharmacyAuditRun)\
+        .order_by(models.PolypharmacyAuditRun.id.desc())\
+        .limit(limit)\
+        .all()
+
+
+@router.get("/audit/polypharmacy/{run_id}/findings")
+@db_metrics.query_budget(2)
+@exceptions.handle_exceptions(custom_message="Не удалось выгрузить находки аудита полипрагмазии")
+def export_polypharmacy_findings(
+    run_id: int,
+    format: str = "ndjson",
+    current_admin = Depends(oauth2.get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Потоковая выгрузка находок запуска (NDJSON или CSV): пациент, тип находки, медикаменты.
+    """
+    if not db.get(models.PolypharmacyAuditRun, run_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Запуск аудита {run_id} не найден"
+        )
+    
+    return export.stream(
+        polypharmacy_audit.findings_statement(run_id),
+        polypharmacy_audit.FINDING_COLUMNS,
+        format,
+        f"polypharmacy-{run_id}"
+    )
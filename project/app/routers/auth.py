@@ -1,13 +1,41 @@
 from fastapi import APIRouter, Depends, status, HTTPException, Response
 from fastapi.security.oauth2 import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 import database, schemas, models, utils, oauth2, exceptions
 
 router = APIRouter(tags=['Authentication'])
 
+def _find_user_with_profile(db: Session, email: str):
+    """Пользователь по email вместе с id его профиля (пациента или врача)"""
+    return db.query(models.User, models.Patient.id, models.Doctor.id)\
+        .outerjoin(models.Patient, models.Patient.user_id == models.User.id)\
+        .outerjoin(models.Doctor, models.Doctor.user_id == models.User.id)\
+        .filter(models.User.email == email)\
+        .first()
+
+def _store_rehashed_password(db: Session, user: models.User, new_hash: str):
+    """
+    Сохранение пересчитанного хеша (копия пароля хранится и в профиле пациента/врача)
+    """
+    user.password = new_hash
+    
+    db.query(models.Patient)\
+        .filter(models.Patient.user_id == user.id)\
+        .update({models.Patient.password: new_hash}, synchronize_session=False)
+    
+    db.query(models.Doctor)\
+        .filter(models.Doctor.user_id == user.id)\
+        .update({models.Doctor.password: new_hash}, synchronize_session=False)
+    
+    db.commit()
+    
+    # Пароль изменился - закэшированный снимок пользователя устарел
+    oauth2.invalidate_principal(user.id)
+
 @router.post("/api/login", response_model=schemas.Token)
 @exceptions.handle_exceptions(custom_message="Не удалось авторизоваться")
-def login(
+async def login(
     user_credentials: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(database.get_db)
 ):
@@ -16,30 +44,36 @@ def login(
     OAuth2PasswordRequestForm возвращает:
     - username (email)
     - password
+    Запрос к БД идёт в общем пуле потоков, проверка пароля - в пуле Argon2 (utils).
     """
-    # Ищем пользователя по email
-    user = db.query(models.User).filter(
-        models.User.email == user_credentials.username
-    ).first()
+    row = await run_in_threadpool(_find_user_with_profile, db, user_credentials.username)
 
-    if not user:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Неверный email или пароль"
         )
     
-    # Проверяем пароль
-    if not utils.verify(user_credentials.password, user.password):
+    user, patient_id, doctor_id = row
+
+    # Проверяем пароль (и при необходимости пересчитываем хеш с текущими параметрами Argon2)
+    verified, new_hash = await utils.verify_and_update_async(user_credentials.password, user.password)
+    
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Неверный email или пароль"
         )
     
+    if new_hash:
+        await run_in_threadpool(_store_rehashed_password, db, user, new_hash)
+    
     # Создаем токен с данными о типе пользователя
     access_token = oauth2.create_access_token(
         data={
             "user_id": user.id,
-            "user_type": user.user_type
+            "user_type": user.user_type,
+            "profile_id": patient_id if user.user_type == 'patient' else doctor_id
         }
     )
 
@@ -1,13 +1,18 @@
-import models,schemas,oauth2,utils
-from fastapi import FastAPI, Response, status, HTTPException, Depends, APIRouter
+import models,schemas,oauth2,utils,loaders,pagination,serialization,interaction_graph,patient_profile,medication_report,catalog
+from fastapi import FastAPI, Response, status, HTTPException, Depends, APIRouter, Header
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session, joinedload
-from database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db, get_async_db
+from config import settings
 from typing import Optional,List
 from sqlalchemy import func, and_
 from sqlalchemy.exc import IntegrityError
 from datetime import timedelta
 from datetime import date
 import exceptions 
+import db_metrics
 from sqlalchemy import and_, or_
 
 router = APIRouter(
@@ -58,12 +63,18 @@ def update_appointment_info(
         db_appointment.information=update_data.information
     
     db.commit()
-    db.refresh(db_appointment)
+    
+    # Загружаем запись вместе с графом ответа одним запросом
+    db_appointment = db.query(models.Appointment)\
+        .options(*loaders.appointment_options())\
+        .filter(models.Appointment.id == appointment_id)\
+        .one()
     
     return db_appointment
         
     
 @router.post("/appointments/{appointment_id}/medicaments", response_model=schemas.MedicamentsAppointmentResponse)
+@db_metrics.query_budget(6)
 @exceptions.handle_exceptions(custom_message="Не удалось добавить лекарство")
 def add_medicaments_for_appointment(
     appointment_id: int,
@@ -76,11 +87,15 @@ def add_medicaments_for_appointment(
     Проверяются только:
     1. Прямые противопоказания пациента к лекарствам (PatientMedicamentContraindication)
     2. Взаимодействия между лекарствами (MedicamentMedicamentContraindication)
+    Справочник и взаимодействия берутся из графа в памяти (interaction_graph).
     """
-    from datetime import date
-
-    # Получаем запись на прием
-    db_appointment = db.query(models.Appointment)\
+    # Получаем запись на прием вместе с врачом слота и версией справочника
+    db_appointment = db.query(
+        models.Appointment.patient_id,
+        models.Schedule.doctor_id,
+        catalog.version_column()
+    )\
+        .outerjoin(models.Schedule, models.Schedule.id == models.Appointment.schedule_id)\
         .filter(models.Appointment.id == appointment_id)\
         .first()
     
@@ -91,11 +106,7 @@ def add_medicaments_for_appointment(
         )
     
     # Проверяем, что запись относится к текущему доктору
-    schedule = db.query(models.Schedule)\
-        .filter(models.Schedule.id == db_appointment.schedule_id)\
-        .first()
-    
-    if not schedule or schedule.doctor_id != current_doctor.id:
+    if db_appointment.doctor_id != current_doctor.id:
         raise HTTPException(
             status_code=403,
             detail="Эта запись не относится к вашему расписанию"
@@ -105,24 +116,18 @@ def add_medicaments_for_appointment(
     today = date.today()
     
     #Получаем только act. лекарства пациента
-    
     patient_active_medicaments = db.query(models.PatientMedicament)\
         .filter(models.PatientMedicament.patient_id == patient_id)\
-        .filter(
-            and_(
-                models.PatientMedicament.start_date <= today,  # уже началось
-                or_(
-                    models.PatientMedicament.end_date.is_(None),  # нет даты окончания
-                    models.PatientMedicament.end_date >= today  # еще не закончилось
-                )
-            )
-        )\
+        .filter(_active_filter(today))\
         .all()
     
-    patient_active_medicament_ids = set(pm.medicament_id for pm in patient_active_medicaments)
+    # первое активное назначение каждого лекарства
+    active_by_medicament = {}
+    for pm in patient_active_medicaments:
+        active_by_medicament.setdefault(pm.medicament_id, pm)
     
     # Получаем прямые противопоказания пациента к лекарствам
-    patient_medicament_contraindications = db.query(models.PatientMedicamentContraindication)\
+    patient_medicament_contraindications = db.query(models.PatientMedicamentContraindication.medicament_id)\
         .filter(models.PatientMedicamentContraindication.patient_id == patient_id)\
         .all()
     
@@ -130,139 +135,33 @@ def add_medicaments_for_appointment(
         pmc.medicament_id for pmc in patient_medicament_contraindications
     )
     
-    # Собираем ID всех лекарств, с которыми будут проверяться взаимодействия
-    all_medicament_ids_to_check = set()
-    medicaments_info = {}
+    # Новые лекарства назначения (повтор id - последнее значение)
+    medicaments_info = {
+        medicament_data.medicament_id: medicament_data
+        for medicament_data in medicaments_data.medicaments
+    }
+    
+    # граф не старше справочника в БД: пару, добавленную другим процессом, проверяем сразу
+    graph = interaction_graph.get(medicaments_info.keys(), db_appointment.catalog_version)
     
     # Проверяем существование всех новых лекарств
-    for medicament_data in medicaments_data.medicaments:
-        medicament_id = medicament_data.medicament_id
-        
-        # Проверяем существование медикамента
-        medicament = db.query(models.Medicament)\
-            .filter(models.Medicament.id == medicament_id)\
-            .first()
-        
-        if not medicament:
+    for medicament_id in medicaments_info:
+        if medicament_id not in graph.names:
             raise HTTPException(
                 status_code=404,
                 detail=f"Медикамент с ID {medicament_id} не найден в справочнике"
             )
-        
-        medicaments_info[medicament_id] = {
-            "name": medicament.name,
-            "data": medicament_data
-        }
-        all_medicament_ids_to_check.add(medicament_id)
     
     added_medicaments = []
     conflicted_medicaments = []
     
     # Для каждого нового лекарства проверяем противопоказания
-    for medicament_id, info in medicaments_info.items():
-        medicament_name = info["name"]
-        medicament_data = info["data"]
-        conflict_reasons = []
-        
-        #Прямое противопоказание пациента к этому лекарству
-        if medicament_id in patient_contraindicated_medicament_ids:
-            conflict_reasons.append(f"Прямое противопоказание: пациент не переносит '{medicament_name}'")
-        
-        #Пациент уже принимает это лекарство (активно)
-        if medicament_id in patient_active_medicament_ids:
-            # Находим активное назначение этого лекарства
-            active_prescriptions = [
-                pm for pm in patient_active_medicaments 
-                if pm.medicament_id == medicament_id
-            ]
-            
-            if active_prescriptions:
-                prescription = active_prescriptions[0]
-                # Уточняем статус
-                if prescription.end_date and prescription.end_date < today:
-                    status = "закончилось"
-                elif prescription.start_date > today:
-                    status = "еще не началось"
-                else:
-                    status = "активно"
-                    
-                conflict_reasons.append(
-                    f"Пациент уже принимает это лекарство (назначено {prescription.start_date}, статус: {status})"
-                )
-        
-        #Взаимодействие с активными лекарствами пациента
-        if patient_active_medicament_ids:
-            # Находим все взаимодействия между новым лекарством и активными лекарствами пациента
-            interactions = db.query(models.MedicamentMedicamentContraindication)\
-                .filter(
-                    or_(
-                        and_(
-                            models.MedicamentMedicamentContraindication.medication_first_id == medicament_id,
-                            models.MedicamentMedicamentContraindication.medication_second_id.in_(list(patient_active_medicament_ids))
-                        ),
-                        and_(
-                            models.MedicamentMedicamentContraindication.medication_second_id == medicament_id,
-                            models.MedicamentMedicamentContraindication.medication_first_id.in_(list(patient_active_medicament_ids))
-                        )
-                    )
-                )\
-                .all()
-            
-            for interaction in interactions:
-                # Определяем, с каким активным лекарством пациента есть взаимодействие
-                other_medicament_id = (
-                    interaction.medication_first_id 
-                    if interaction.medication_first_id != medicament_id 
-                    else interaction.medication_second_id
-                )
-                
-                # Получаем название другого лекарства
-                other_medicament = db.query(models.Medicament)\
-                    .filter(models.Medicament.id == other_medicament_id)\
-                    .first()
-                
-                if other_medicament:
-                    # Находим активное назначение
-                    patient_med = next(
-                        (pm for pm in patient_active_medicaments 
-                            if pm.medicament_id == other_medicament_id), 
-                        None
-                    )
-                    
-                    if patient_med:
-                        # Определяем статус активного лекарства
-                        if patient_med.end_date and patient_med.end_date < today:
-                            status = "закончилось"
-                        elif patient_med.start_date > today:
-                            status = "еще не началось"
-                        else:
-                            status = "активно"
-                            
-                        conflict_reasons.append(
-                            f"Взаимодействие с активным лекарством '{other_medicament.name}' (статус: {status})"
-                        )
-        
-        #Взаимодействие с другими новыми лекарствами в этом же назначении
-        for other_new_id in all_medicament_ids_to_check:
-            if other_new_id == medicament_id:
-                continue
-                
-            # Проверяем, есть ли взаимодействие между этими двумя лекарствами
-            # Упорядочиваем ID для проверки (в таблице medication_first_id < medication_second_id)
-            id1, id2 = sorted([medicament_id, other_new_id])
-            
-            interaction_exists = db.query(models.MedicamentMedicamentContraindication)\
-                .filter(
-                    models.MedicamentMedicamentContraindication.medication_first_id == id1,
-                    models.MedicamentMedicamentContraindication.medication_second_id == id2
-                )\
-                .first()
-            
-            if interaction_exists:
-                other_medicament_name = medicaments_info[other_new_id]["name"]
-                conflict_reasons.append(
-                    f"Взаимодействие с другим новым лекарством в этом назначении: '{other_medicament_name}'"
-                )
+    for medicament_id, medicament_data in medicaments_info.items():
+        medicament_name = graph.names[medicament_id]
+        conflict_reasons = _conflict_reasons(
+            graph, medicament_id, medicaments_info,
+            active_by_medicament, patient_contraindicated_medicament_ids, today
+        )
         
         # Если есть конфликты, добавляем в список конфликтных
         if conflict_reasons:
@@ -302,60 +201,35 @@ def add_medicaments_for_appointment(
             detail=error_message.strip()
         )
 
-    # Добавляем подпись доктора к информации о назначении
-    medicament_names = [medicaments_info[m.medicament_id]["name"] for m in added_medicaments]
-    info_text = f"Назначены лекарства: {', '.join(medicament_names)} (назначил: Dr. {current_doctor.last_name})"
-
-    # Добавляем предупреждения о конфликтах, если они есть
-    warning_message = None
-    success_message = None
     if conflicted_medicaments:
-        warning_text = "\n\nВНИМАНИЕ: Следующие лекарства не были назначены из-за противопоказаний:\n"
-        for conflict in conflicted_medicaments:
-            warning_text += f"- {conflict['medicament_name']}:\n"
-            for reason in conflict['conflict_reasons']:
-                warning_text += f"  • {reason}\n"
-        info_text += warning_text
-        
         warning_message = f"{len(conflicted_medicaments)} лекарств не были назначены из-за противопоказаний"
         success_message = f"Успешно добавлено {len(added_medicaments)} лекарств"
     else:
+        warning_message = None
         success_message = f"Все {len(added_medicaments)} лекарств успешно добавлены"
 
+    patient_profile.bump(db, patient_id)
+    # Все назначения одним INSERT ... RETURNING (id нужны для ответа)
+    db.flush()
 
-    db.commit()
-
-    # Обновляем объекты
-    for medicament in added_medicaments:
-        db.refresh(medicament)
-
-    # Подготавливаем ответ
-    added_medicaments_response = []
-    for m in added_medicaments:
-        # Получаем название лекарства
-        medicament = db.query(models.Medicament)\
-            .filter(models.Medicament.id == m.medicament_id)\
-            .first()
-        
-        # Создаем объект для ответа
-        medicament_dict = {
-            "id": m.id,
-            "patient_id": m.patient_id,
-            "medicament_id": m.medicament_id,
-            "medicament_name": medicament.name if medicament else "Неизвестно",
-            "dosage": m.dosage,
-            "frequency": m.frequency,
-            "start_date": m.start_date,
-            "end_date": m.end_date,
-            "notes": m.notes,
-            "doctor_id": current_doctor.id,
-            "appointment_id": appointment_id
-        }
-        added_medicaments_response.append(medicament_dict)
-
-    # Создаем ответ
+    # Ответ собирается до commit: после него объекты истекают и каждый перечитывался бы отдельным SELECT
     response_data = {
-        "added_medicaments": added_medicaments_response,
+        "added_medicaments": [
+            {
+                "id": m.id,
+                "patient_id": m.patient_id,
+                "medicament_id": m.medicament_id,
+                "medicament_name": graph.names[m.medicament_id],
+                "dosage": m.dosage,
+                "frequency": m.frequency,
+                "start_date": m.start_date,
+                "end_date": m.end_date,
+                "notes": m.notes,
+                "doctor_id": current_doctor.id,
+                "appointment_id": appointment_id
+            }
+            for m in added_medicaments
+        ],
         "conflicts": [
             {
                 "medicament_id": conflict.get("medicament_id"),
@@ -369,317 +243,161 @@ def add_medicaments_for_appointment(
     }
     
     response = schemas.MedicamentsAppointmentResponse(**response_data)
+    db.commit()
     
     return response
-        
-@router.post("/appointments/{appointment_id}/medicaments", response_model=schemas.MedicamentsAppointmentResponse)
-@exceptions.handle_exceptions(custom_message="Не удалось добавить лекарство")
-def add_medicaments_for_appointment(
-    appointment_id: int,
-    medicaments_data: schemas.MedicamentsForAppointmentRequest,
-    current_doctor: models.Doctor = Depends(oauth2.get_current_doctor),
-    db: Session = Depends(get_db)
-):
+
+
+def _prescription_status(prescription: models.PatientMedicament, today: date) -> str:
+    """Статус назначения относительно сегодняшнего дня (для текста конфликта)"""
+    if prescription.end_date and prescription.end_date < today:
+        return "закончилось"
+    if prescription.start_date > today:
+        return "еще не началось"
+    return "активно"
+
+
+def _conflict_reasons(graph, medicament_id: int, new_medicament_ids, active_by_medicament: dict,
+                      contraindicated_ids: set, today: date) -> List[str]:
     """
-    Добавление лекарств пациенту с проверкой медицинских противопоказаний.
-    Проверяются только:
-    1. Прямые противопоказания пациента к лекарствам (PatientMedicamentContraindication)
-    2. Взаимодействия между лекарствами (MedicamentMedicamentContraindication)
+    Причины, по которым medicament_id нельзя назначить пациенту вместе с new_medicament_ids
+    (всё назначение, по порядку). active_by_medicament - первое активное назначение
+    каждого лекарства пациента.
     """
-    from datetime import date
-
-    # Получаем запись на прием
-    db_appointment = db.query(models.Appointment)\
-        .filter(models.Appointment.id == appointment_id)\
-        .first()
+    medicament_name = graph.names[medicament_id]
+    conflict_reasons = []
+    
+    #Прямое противопоказание пациента к этому лекарству
+    if medicament_id in contraindicated_ids:
+        conflict_reasons.append(f"Прямое противопоказание: пациент не переносит '{medicament_name}'")
+    
+    #Пациент уже принимает это лекарство (активно)
+    prescription = active_by_medicament.get(medicament_id)
+    if prescription:
+        conflict_reasons.append(
+            f"Пациент уже принимает это лекарство (назначено {prescription.start_date}, статус: {_prescription_status(prescription, today)})"
+        )
     
-    if not db_appointment: 
-        raise HTTPException(
-            status_code=404,
-            detail=f"Запись на прием с ID {appointment_id} не найдена"
+    #Взаимодействие с активными лекарствами пациента
+    for other_medicament_id in sorted(graph.interacting(medicament_id, active_by_medicament)):
+        patient_med = active_by_medicament[other_medicament_id]
+        conflict_reasons.append(
+            f"Взаимодействие с активным лекарством '{graph.names[other_medicament_id]}' (статус: {_prescription_status(patient_med, today)})"
         )
     
-    # Проверяем, что запись относится к текущему доктору
-    schedule = db.query(models.Schedule)\
-        .filter(models.Schedule.id == db_appointment.schedule_id)\
-        .first()
+    #Взаимодействие с другими новыми лекарствами в этом же назначении
+    new_interactions = graph.interacting(medicament_id, new_medicament_ids)
+    for other_new_id in new_medicament_ids:
+        if other_new_id in new_interactions:
+            conflict_reasons.append(
+                f"Взаимодействие с другим новым лекарством в этом назначении: '{graph.names[other_new_id]}'"
+            )
     
-    if not schedule or schedule.doctor_id != current_doctor.id:
-        raise HTTPException(
-            status_code=403,
-            detail="Эта запись не относится к вашему расписанию"
+    return conflict_reasons
+
+
+def _active_filter(today: date):
+    """Назначение уже началось и еще не закончилось"""
+    return and_(
+        models.PatientMedicament.start_date <= today,
+        or_(
+            models.PatientMedicament.end_date.is_(None),
+            models.PatientMedicament.end_date >= today
         )
-    
-    patient_id = db_appointment.patient_id
+    )
+
+
+@router.post("/prescriptions/check", response_model=schemas.PrescriptionCheckResponse)
+@db_metrics.query_budget(4)
+@exceptions.handle_exceptions(custom_message="Не удалось проверить назначения")
+def check_prescriptions(
+    request: schemas.PrescriptionCheckRequest,
+    current_doctor: models.Doctor = Depends(oauth2.get_current_doctor),
+    db: Session = Depends(get_db)
+):
+    """
+    Пакетная проверка назначений без записи в БД (dry-run add_medicaments_for_appointment).
+    Для каждой пары (patient_id, medicament_ids) возвращаются те же конфликты, что
+    вернуло бы назначение на приеме. Активные лекарства и противопоказания всех
+    пациентов пакета загружаются тремя запросами, проверки идут по графу в памяти.
+    """
     today = date.today()
-    
-    #Получаем только act. лекарства пациента
-    
-    patient_active_medicaments = db.query(models.PatientMedicament)\
-        .filter(models.PatientMedicament.patient_id == patient_id)\
-        .filter(
-            and_(
-                models.PatientMedicament.start_date <= today,  # уже началось
-                or_(
-                    models.PatientMedicament.end_date.is_(None),  # нет даты окончания
-                    models.PatientMedicament.end_date >= today  # еще не закончилось
-                )
-            )
-        )\
+    patient_ids = {check.patient_id for check in request.checks}
+    
+    # версия справочника читается вместе с пациентами; если их нет, граф не нужен
+    patient_rows = db.execute(
+        select(models.Patient.id, catalog.version_column()).where(models.Patient.id.in_(patient_ids))
+    ).all()
+    existing_patient_ids = {row.id for row in patient_rows}
+    catalog_version = patient_rows[0].catalog_version if patient_rows else None
+    
+    # первое активное назначение каждого лекарства у каждого пациента
+    active = {patient_id: {} for patient_id in existing_patient_ids}
+    active_rows = db.query(
+        models.PatientMedicament.patient_id,
+        models.PatientMedicament.medicament_id,
+        models.PatientMedicament.start_date,
+        models.PatientMedicament.end_date
+    )\
+        .filter(models.PatientMedicament.patient_id.in_(existing_patient_ids))\
+        .filter(_active_filter(today))\
         .all()
+    for row in active_rows:
+        active[row.patient_id].setdefault(row.medicament_id, row)
     
-    patient_active_medicament_ids = set(pm.medicament_id for pm in patient_active_medicaments)
-    
-    # Получаем прямые противопоказания пациента к лекарствам
-    patient_medicament_contraindications = db.query(models.PatientMedicamentContraindication)\
-        .filter(models.PatientMedicamentContraindication.patient_id == patient_id)\
+    contraindicated = {patient_id: set() for patient_id in existing_patient_ids}
+    contraindication_rows = db.query(
+        models.PatientMedicamentContraindication.patient_id,
+        models.PatientMedicamentContraindication.medicament_id
+    )\
+        .filter(models.PatientMedicamentContraindication.patient_id.in_(existing_patient_ids))\
         .all()
-    
-    patient_contraindicated_medicament_ids = set(
-        pmc.medicament_id for pmc in patient_medicament_contraindications
-    )
-    
-    # Собираем ID всех лекарств, с которыми будут проверяться взаимодействия
-    all_medicament_ids_to_check = set()
-    medicaments_info = {}
-    
-    # Проверяем существование всех новых лекарств
-    for medicament_data in medicaments_data.medicaments:
-        medicament_id = medicament_data.medicament_id
+    for row in contraindication_rows:
+        contraindicated[row.patient_id].add(row.medicament_id)
+    
+    graph = interaction_graph.get({
+        medicament_id for check in request.checks for medicament_id in check.medicament_ids
+    }, catalog_version)
+    
+    results = []
+    with_conflicts = 0
+    for check in request.checks:
+        result = {"patient_id": check.patient_id, "ok": False, "conflicts": [], "error": None}
+        results.append(result)
         
-        # Проверяем существование медикамента
-        medicament = db.query(models.Medicament)\
-            .filter(models.Medicament.id == medicament_id)\
-            .first()
-        
-        if not medicament:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Медикамент с ID {medicament_id} не найден в справочнике"
-            )
-        
-        medicaments_info[medicament_id] = {
-            "name": medicament.name,
-            "data": medicament_data
-        }
-        all_medicament_ids_to_check.add(medicament_id)
-    
-    added_medicaments = []
-    conflicted_medicaments = []
-    
-    # Для каждого нового лекарства проверяем противопоказания
-    for medicament_id, info in medicaments_info.items():
-        medicament_name = info["name"]
-        medicament_data = info["data"]
-        conflict_reasons = []
-        
-        #Прямое противопоказание пациента к этому лекарству
-        if medicament_id in patient_contraindicated_medicament_ids:
-            conflict_reasons.append(f"Прямое противопоказание: пациент не переносит '{medicament_name}'")
-        
-        #Пациент уже принимает это лекарство (активно)
-        if medicament_id in patient_active_medicament_ids:
-            # Находим активное назначение этого лекарства
-            active_prescriptions = [
-                pm for pm in patient_active_medicaments 
-                if pm.medicament_id == medicament_id
-            ]
-            
-            if active_prescriptions:
-                prescription = active_prescriptions[0]
-                # Уточняем статус
-                if prescription.end_date and prescription.end_date < today:
-                    status = "закончилось"
-                elif prescription.start_date > today:
-                    status = "еще не началось"
-                else:
-                    status = "активно"
-                    
-                conflict_reasons.append(
-                    f"Пациент уже принимает это лекарство (назначено {prescription.start_date}, статус: {status})"
-                )
-        
-        #Взаимодействие с активными лекарствами пациента
-        if patient_active_medicament_ids:
-            # Находим все взаимодействия между новым лекарством и активными лекарствами пациента
-            interactions = db.query(models.MedicamentMedicamentContraindication)\
-                .filter(
-                    or_(
-                        and_(
-                            models.MedicamentMedicamentContraindication.medication_first_id == medicament_id,
-                            models.MedicamentMedicamentContraindication.medication_second_id.in_(list(patient_active_medicament_ids))
-                        ),
-                        and_(
-                            models.MedicamentMedicamentContraindication.medication_second_id == medicament_id,
-                            models.MedicamentMedicamentContraindication.medication_first_id.in_(list(patient_active_medicament_ids))
-                        )
-                    )
-                )\
-                .all()
-            
-            for interaction in interactions:
-                # Определяем, с каким активным лекарством пациента есть взаимодействие
-                other_medicament_id = (
-                    interaction.medication_first_id 
-                    if interaction.medication_first_id != medicament_id 
-                    else interaction.medication_second_id
-                )
-                
-                # Получаем название другого лекарства
-                other_medicament = db.query(models.Medicament)\
-                    .filter(models.Medicament.id == other_medicament_id)\
-                    .first()
-                
-                if other_medicament:
-                    # Находим активное назначение
-                    patient_med = next(
-                        (pm for pm in patient_active_medicaments 
-                            if pm.medicament_id == other_medicament_id), 
-                        None
-                    )
-                    
-                    if patient_med:
-                        # Определяем статус активного лекарства
-                        if patient_med.end_date and patient_med.end_date < today:
-                            status = "закончилось"
-                        elif patient_med.start_date > today:
-                            status = "еще не началось"
-                        else:
-                            status = "активно"
-                            
-                        conflict_reasons.append(
-                            f"Взаимодействие с активным лекарством '{other_medicament.name}' (статус: {status})"
-                        )
-        
-        #Взаимодействие с другими новыми лекарствами в этом же назначении
-        for other_new_id in all_medicament_ids_to_check:
-            if other_new_id == medicament_id:
-                continue
-                
-            # Проверяем, есть ли взаимодействие между этими двумя лекарствами
-            # Упорядочиваем ID для проверки (в таблице medication_first_id < medication_second_id)
-            id1, id2 = sorted([medicament_id, other_new_id])
-            
-            interaction_exists = db.query(models.MedicamentMedicamentContraindication)\
-                .filter(
-                    models.MedicamentMedicamentContraindication.medication_first_id == id1,
-                    models.MedicamentMedicamentContraindication.medication_second_id == id2
-                )\
-                .first()
-            
-            if interaction_exists:
-                other_medicament_name = medicaments_info[other_new_id]["name"]
-                conflict_reasons.append(
-                    f"Взаимодействие с другим новым лекарством в этом назначении: '{other_medicament_name}'"
-                )
+        if check.patient_id not in existing_patient_ids:
+            result["error"] = f"Пациент с ID {check.patient_id} не найден"
+            continue
         
-        # Если есть конфликты, добавляем в список конфликтных
-        if conflict_reasons:
-            conflicted_medicaments.append({
-                "medicament_id": medicament_id,
-                "medicament_name": medicament_name,
-                "conflict_reasons": conflict_reasons
-            })
+        # повтор id в назначении - одно лекарство, порядок первого вхождения
+        new_medicament_ids = dict.fromkeys(check.medicament_ids)
+        unknown = graph.unknown(new_medicament_ids)
+        if unknown:
+            result["error"] = f"Медикаменты не найдены в справочнике: {', '.join(map(str, sorted(unknown)))}"
             continue
         
-        # Если проверки прошли успешно - создаем запись
-        db_medicament = models.PatientMedicament(
-            patient_id=patient_id,
-            medicament_id=medicament_id,
-            dosage=medicament_data.dosage,
-            frequency=medicament_data.frequency,
-            start_date=medicament_data.start_date,
-            end_date=medicament_data.end_date,
-            doctor_by_id=current_doctor.id,
-            appointment_id=appointment_id,
-            notes=medicament_data.notes
-        )
+        for medicament_id in new_medicament_ids:
+            conflict_reasons = _conflict_reasons(
+                graph, medicament_id, new_medicament_ids,
+                active[check.patient_id], contraindicated[check.patient_id], today
+            )
+            if conflict_reasons:
+                result["conflicts"].append({
+                    "medicament_id": medicament_id,
+                    "medicament_name": graph.names[medicament_id],
+                    "conflict_reasons": conflict_reasons
+                })
         
-        db.add(db_medicament)
-        added_medicaments.append(db_medicament)
+        result["ok"] = not result["conflicts"]
+        with_conflicts += not result["ok"]
     
-    # Если лекарство не было добавлено
-    if not added_medicaments:
-        error_message = "Ни одно лекарство не было добавлено из-за медицинских противопоказаний:\n"
-        for conflict in conflicted_medicaments:
-            error_message += f"- {conflict['medicament_name']}:\n"
-            for reason in conflict['conflict_reasons']:
-                error_message += f"  • {reason}\n"
-        
-        raise HTTPException(
-            status_code=422,
-            detail=error_message.strip()
-        )
+    # тысячи результатов: ORJSONResponse без повторной проверки моделью ответа
+    return ORJSONResponse({
+        "results": results,
+        "checked": len(results),
+        "with_conflicts": with_conflicts
+    })
 
-    # Добавляем подпись доктора к информации о назначении
-    medicament_names = [medicaments_info[m.medicament_id]["name"] for m in added_medicaments]
-    info_text = f"Назначены лекарства: {', '.join(medicament_names)} (назначил: Dr. {current_doctor.last_name})"
-
-    # Добавляем предупреждения о конфликтах, если они есть
-    warning_message = None
-    success_message = None
-    if conflicted_medicaments:
-        warning_text = "\n\nВНИМАНИЕ: Следующие лекарства не были назначены из-за противопоказаний:\n"
-        for conflict in conflicted_medicaments:
-            warning_text += f"- {conflict['medicament_name']}:\n"
-            for reason in conflict['conflict_reasons']:
-                warning_text += f"  • {reason}\n"
-        info_text += warning_text
-        
-        warning_message = f"{len(conflicted_medicaments)} лекарств не были назначены из-за противопоказаний"
-        success_message = f"Успешно добавлено {len(added_medicaments)} лекарств"
-    else:
-        success_message = f"Все {len(added_medicaments)} лекарств успешно добавлены"
-
-
-    db.commit()
-
-    # Обновляем объекты
-    for medicament in added_medicaments:
-        db.refresh(medicament)
-
-    # Подготавливаем ответ
-    added_medicaments_response = []
-    for m in added_medicaments:
-        # Получаем название лекарства
-        medicament = db.query(models.Medicament)\
-            .filter(models.Medicament.id == m.medicament_id)\
-            .first()
-        
-        # Создаем объект для ответа
-        medicament_dict = {
-            "id": m.id,
-            "patient_id": m.patient_id,
-            "medicament_id": m.medicament_id,
-            "medicament_name": medicament.name if medicament else "Неизвестно",
-            "dosage": m.dosage,
-            "frequency": m.frequency,
-            "start_date": m.start_date,
-            "end_date": m.end_date,
-            "notes": m.notes,
-            "doctor_id": current_doctor.id,
-            "appointment_id": appointment_id
-        }
-        added_medicaments_response.append(medicament_dict)
-
-    # Создаем ответ
-    response_data = {
-        "added_medicaments": added_medicaments_response,
-        "conflicts": [
-            {
-                "medicament_id": conflict.get("medicament_id"),
-                "medicament_name": conflict["medicament_name"],
-                "conflict_reasons": conflict["conflict_reasons"]
-            }
-            for conflict in conflicted_medicaments
-        ],
-        "warning": warning_message,
-        "message": success_message
-    }
-    
-    response = schemas.MedicamentsAppointmentResponse(**response_data)
-    
-    return response
 
 @router.get("/appointments/{appointment_id}/medicaments", 
             response_model=List[schemas.PatientMedicamentResponse])
@@ -725,32 +443,79 @@ def get_appointment_medicaments(
         .all()
     
     # Преобразуем в формат ответа
-    return medicaments
+    return serialization.list_response(schemas.PatientMedicamentResponse, medicaments)
 
     
-# Получение всех записей на прием к текущему доктору
-@router.get("/appointments", response_model=List[schemas.AppointmentResponse])
-@exceptions.handle_exceptions(custom_message="Не удалось получить все записи на прием")
-def get_my_appointments(
-    status_filter: Optional[str] = None,
-    current_doctor: models.Patient = Depends(oauth2.get_current_doctor),
-    db: Session = Depends(get_db)
-):
-    """
-    Получение всех записей на прием текущего доктора
-    """
-
-    appointments = db.query(models.Appointment)\
-         .join(models.Appointment.schedule)\
-         .filter(models.Schedule.doctor_id == current_doctor.id)
+def _my_appointments_statement(doctor_id: int, status_filter, patient_id, date_from, date_to, page):
+    """Страница записей к врачу (новые первыми) - общий запрос для Session и AsyncSession"""
+    statement = select(models.Appointment)\
+        .join(models.Appointment.schedule)\
+        .options(*loaders.appointment_options(schedule_joined=True))\
+        .where(models.Schedule.doctor_id == doctor_id)
     if status_filter:
-        appointments = appointments.filter(models.Appointment.status == status_filter)
-    appointments = appointments.order_by(models.Appointment.id.desc()).all()
-    return appointments
-
-
+        statement = statement.where(models.Appointment.status == status_filter)
+    if patient_id:
+        statement = statement.where(models.Appointment.patient_id == patient_id)
+    statement = pagination.date_range(statement, models.Schedule.date, date_from, date_to)
+    return pagination.keyset(statement, models.Appointment, page)
 
 
+# Получение всех записей на прием к текущему доктору
+# В режиме DATABASE_ASYNC - через AsyncSession (запрос общий, отличается только выполнение)
+if settings.database_async:
+    @router.get("/appointments", response_model=List[schemas.AppointmentResponse])
+    @db_metrics.query_budget(3)
+    @exceptions.handle_exceptions(custom_message="Не удалось получить все записи на прием")
+    async def get_my_appointments(
+        response: Response,
+        status_filter: Optional[str] = None,
+        patient_id: Optional[int] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        page: pagination.PageParams = Depends(),
+        current_doctor: models.Doctor = Depends(oauth2.get_current_doctor_async),
+        db: AsyncSession = Depends(get_async_db)
+    ):
+        """
+        Записи на прием к текущему доктору постранично (AsyncSession).
+        Фильтры: статус, пациент, диапазон дат приема.
+        """
+        statement = _my_appointments_statement(
+            current_doctor.id, status_filter, patient_id, date_from, date_to, page
+        )
+        appointments = (await db.scalars(statement)).all()
+        return serialization.list_response(
+            schemas.AppointmentResponse,
+            pagination.page_of(appointments, page, response),
+            response
+        )
+else:
+    @router.get("/appointments", response_model=List[schemas.AppointmentResponse])
+    @db_metrics.query_budget(3)
+    @exceptions.handle_exceptions(custom_message="Не удалось получить все записи на прием")
+    def get_my_appointments(
+        response: Response,
+        status_filter: Optional[str] = None,
+        patient_id: Optional[int] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        page: pagination.PageParams = Depends(),
+        current_doctor: models.Doctor = Depends(oauth2.get_current_doctor),
+        db: Session = Depends(get_db)
+    ):
+        """
+        Записи на прием к текущему доктору постранично (новые первыми).
+        Фильтры: статус, пациент, диапазон дат приема.
+        """
+        statement = _my_appointments_statement(
+            current_doctor.id, status_filter, patient_id, date_from, date_to, page
+        )
+        appointments = db.scalars(statement).all()
+        return serialization.list_response(
+            schemas.AppointmentResponse,
+            pagination.page_of(appointments, page, response),
+            response
+        )
 
 
 @router.get("/patients/{patient_id}/medicaments", response_model=List[schemas.PatientMedicamentResponse])
@@ -783,7 +548,7 @@ def get_patient_medicaments(
         )\
         .all()
     
-    return medicaments
+    return serialization.list_response(schemas.PatientMedicamentResponse, medicaments)
     
 
     
@@ -817,9 +582,41 @@ def get_patient_active_medicaments(
         .order_by(models.PatientMedicament.start_date.desc())\
         .all()
     
-    return active_medicaments
+    return serialization.list_response(schemas.PatientMedicamentResponse, active_medicaments)
+
+
 
 
+@router.get("/catalog", response_model=dict)
+@db_metrics.query_budget(6)
+@exceptions.handle_exceptions(custom_message="Не удалось получить справочник")
+def get_catalog(
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    current_doctor: models.Doctor = Depends(oauth2.get_current_doctor),
+    db: Session = Depends(get_db)
+):
+    """
+    Весь справочник одним ответом: медикаменты, противопоказания, взаимодействия
+    (пары id) и связи медикамент - противопоказание (пары id).
+    Версия справочника - сильный ETag: неизменившийся справочник - 304 после
+    одного чтения версии. Снимок кэшируется в памяти вместе с gzip-копией,
+    у которой свой ETag.
+    """
+    version = catalog.current_version(db)
+    gzipped = catalog.accepts_gzip(accept_encoding)
+    etag = catalog.etag(version, gzipped)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+    
+    if catalog.etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    snapshot = catalog.get(db, version)
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=snapshot.gzipped, media_type="application/json", headers=headers)
+    
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
 
 
 @router.get("/medicaments", response_model=List[dict])
@@ -908,7 +705,9 @@ def add_medicament(
             db.add(new_link)
             created_links.append(other_medicament_id)
     
+    catalog.bump(db)
     db.commit()
+    interaction_graph.bump()
     
 
     result = {
@@ -1031,6 +830,18 @@ def delete_medicament(
         .count()
 
     
+    # Отчёты пациентов, у которых удаляются назначения или противопоказания
+    if historical_prescriptions > 0 or patient_contraindications > 0:
+        patient_profile.bump_where(
+            db,
+            select(models.PatientMedicament.patient_id)
+            .where(models.PatientMedicament.medicament_id == medicament_id)
+            .union(
+                select(models.PatientMedicamentContraindication.patient_id)
+                .where(models.PatientMedicamentContraindication.medicament_id == medicament_id)
+            )
+        )
+
     # Удаляем неактивные назначения пациентам
     if historical_prescriptions > 0:
         db.query(models.PatientMedicament)\
@@ -1067,7 +878,9 @@ def delete_medicament(
     # Удаляем сам медикамент
     db.delete(medicament)
     
+    catalog.bump(db)
     db.commit()
+    interaction_graph.bump()
     
     report = {
         "message": f"Медикамент '{medicament.name}' успешно удален",
@@ -1135,6 +948,7 @@ def add_contraindication(
     )
     
     db.add(new_contraindication)
+    catalog.bump(db)
     db.commit()
     db.refresh(new_contraindication)
     
@@ -1167,7 +981,9 @@ def delete_contraindication(
         )
     
     db.delete(contraindication)
+    catalog.bump(db)
     db.commit()
+    interaction_graph.bump()
     
     return {
         "message": f"Противопоказание '{contraindication.name}' успешно удалено",
@@ -1274,7 +1090,9 @@ def add_medicament_contraindication_link(
     )
     
     db.add(new_link)
+    catalog.bump(db)
     db.commit()
+    interaction_graph.bump()
     
     return {
         "message": f"Противопоказание добавлено: '{medicament.name}' - '{contraindication.name}'",
@@ -1356,7 +1174,9 @@ def remove_medicament_interaction(
     medicament2 = db.query(models.Medicament).filter(models.Medicament.id == medicament2_id).first()
     
     db.delete(interaction)
+    catalog.bump(db)
     db.commit()
+    interaction_graph.bump()
     
     return {
         "message": f"Взаимодействие удалено: '{medicament1.name if medicament1 else 'Неизвестно'}' и '{medicament2.name if medicament2 else 'Неизвестно'}'",
@@ -1408,7 +1228,9 @@ def remove_medicament_contraindication_link(
         .first()
     
     db.delete(link)
+    catalog.bump(db)
     db.commit()
+    interaction_graph.bump()
     
     return {
         "message": f"Связь удалена: '{medicament.name if medicament else 'Неизвестно'}' - '{contraindication.name if contraindication else 'Неизвестно'}'",
@@ -1565,6 +1387,7 @@ def add_patient_medication_contraindication(
     )
     
     db.add(new_record)
+    patient_profile.bump(db, patient_id)
     db.commit()
     
     return {
@@ -1644,6 +1467,7 @@ def remove_patient_medication_contraindication(
     medicament = db.query(models.Medicament).filter(models.Medicament.id == medicament_id).first()
     
     db.delete(record)
+    patient_profile.bump(db, patient_id)
     db.commit()
     
     return {
@@ -1714,6 +1538,7 @@ def add_patient_other_contraindication(
     )
     
     db.add(new_record)
+    patient_profile.bump(db, patient_id)
     db.commit()
     
     return {
@@ -1796,6 +1621,7 @@ def remove_patient_other_contraindication(
         .first()
     
     db.delete(record)
+    patient_profile.bump(db, patient_id)
     db.commit()
     
     return {
@@ -1805,6 +1631,7 @@ def remove_patient_other_contraindication(
     }
 
 @router.get("/patient/{patient_id}/medication", response_model=dict)
+@db_metrics.query_budget(6)
 @exceptions.handle_exceptions(custom_message="Не удалось получить отчёт о лекарствах пациента")
 def get_patient_medication_report(
     patient_id:int,
@@ -1813,127 +1640,46 @@ def get_patient_medication_report(
 ):
     """
     Отчет о лекарствах пациента и противопоказаниях.
+    Профиль кэшируется (patient_profile) по версии из строки пациента;
+    при medication_report_engine = "sql" отчёт целиком строит один запрос (medication_report).
     """
 
-    current_patient=patient = db.query(models.Patient).filter(models.Patient.id == patient_id).first()
-    # Получаем все лекарства пациента
-    patient_medicaments = db.query(models.PatientMedicament)\
-        .options(joinedload(models.PatientMedicament.medicament))\
-        .filter(models.PatientMedicament.patient_id == patient_id)\
-        .order_by(models.PatientMedicament.start_date.desc())\
-        .all()
-    
-    # Получаем ID лекарств пациента
-    patient_medicament_ids = [pm.medicament_id for pm in patient_medicaments]
-    
-    # Получаем прямые противопоказания пациента к лекарствам
-    patient_medicament_contraindications = db.query(models.PatientMedicamentContraindication)\
-        .options(joinedload(models.PatientMedicamentContraindication.medicament))\
-        .filter(models.PatientMedicamentContraindication.patient_id == patient_id)\
-        .all()
-    
-    #Получаем другие противопоказания пациента (что нельзя делать)
-    patient_other_contraindications = db.query(models.PatientOtherContraindication)\
-        .options(joinedload(models.PatientOtherContraindication.contraindication))\
-        .filter(models.PatientOtherContraindication.patient_id == patient_id)\
-        .all()
-    
-    # Находим лекарства, которые нельзя принимать (на основе взаимодействий)
-    forbidden_medicaments = set()
-    
-    # Прямые противопоказания
-    for contraindication in patient_medicament_contraindications:
-        forbidden_medicaments.add((
-            contraindication.medicament.id,
-            contraindication.medicament.name,
-            "Прямое противопоказание пациента"
-        ))
-    
-    # Взаимодействия между лекарствами пациента
-    if len(patient_medicament_ids) >= 2:
-        # Находим все лекарства, которые взаимодействуют с лекарствами пациента
-        from sqlalchemy import or_, and_
-        
-        # Получаем все взаимодействия, где хотя бы одно лекарство из списка пациента
-        interactions = db.query(models.MedicamentMedicamentContraindication)\
-            .options(
-                joinedload(models.MedicamentMedicamentContraindication.first_medicament),
-                joinedload(models.MedicamentMedicamentContraindication.second_medicament)
-            )\
-            .filter(
-                or_(
-                    models.MedicamentMedicamentContraindication.medication_first_id.in_(patient_medicament_ids),
-                    models.MedicamentMedicamentContraindication.medication_second_id.in_(patient_medicament_ids)
-                )
-            )\
-            .all()
-        
-        # Для каждого взаимодействия определяем, какое лекарство противопоказано
-        for interaction in interactions:
-            # Если первое лекарство принимает пациент, то второе противопоказано
-            if interaction.medication_first_id in patient_medicament_ids:
-                forbidden_medicaments.add((
-                    interaction.medication_second_id,
-                    interaction.second_medicament.name,
-                    f"Взаимодействует с '{interaction.first_medicament.name}'"
-                ))
-            
-            # Если второе лекарство принимает пациент, то первое противопоказано
-            if interaction.medication_second_id in patient_medicament_ids:
-                forbidden_medicaments.add((
-                    interaction.medication_first_id,
-                    interaction.first_medicament.name,
-                    f"Взаимодействует с '{interaction.second_medicament.name}'"
-                ))
-    
+    if settings.medication_report_engine == "sql":
+        body = medication_report.fetch(db, patient_id, "other contraindications")
+        if body is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Пациент с ID {patient_id} не найден"
+            )
+        return medication_report.response(body)
+
+    row = db.query(models.Patient, catalog.version_column())\
+        .filter(models.Patient.id == patient_id)\
+        .first()
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Пациент с ID {patient_id} не найден"
+        )
+    patient, catalog_version = row
+
+    profile = patient_profile.get(db, patient_id, patient.profile_version, catalog_version)
 
-    current_medicament_ids = set(patient_medicament_ids)
-    forbidden_medicaments_filtered = [
-        {
-            "medicament_id": medicament_id,
-            "medicament_name": medicament_name,
-            "reason": reason
-        }
-        for medicament_id, medicament_name, reason in forbidden_medicaments
-        if medicament_id not in current_medicament_ids  # фильтруем те, что уже принимает
-    ]
-    
-    # тчет
     report = {
         "patient_info": {
-            "id": current_patient.id,
-            "full_name": f"{current_patient.last_name} {current_patient.first_name} {current_patient.patronymic}",
-            "birth_date": current_patient.birth_date
+            "id": patient.id,
+            "full_name": f"{patient.last_name} {patient.first_name} {patient.patronymic}",
+            "birth_date": patient.birth_date
         },
         
         #Все лекарства пациента
-        "current_medicaments": [
-            {
-                "id": pm.id,
-                "medicament_id": pm.medicament_id,
-                "medicament_name": pm.medicament.name,
-                "dosage": pm.dosage,
-                "frequency": pm.frequency,
-                "start_date": pm.start_date,
-                "end_date": pm.end_date,
-                "notes": pm.notes,
-                "is_active": pm.end_date is None or pm.end_date >= date.today()
-            }
-            for pm in patient_medicaments
-        ],
+        "current_medicaments": profile.current_medicaments(),
         
         #Какие лекарства нельзя принимать
-        "forbidden_medicaments": forbidden_medicaments_filtered,
+        "forbidden_medicaments": profile.forbidden_medicaments,
         
         #другие противопоказания
-        "other contraindications": [
-            {
-                "contraindication_id": poc.contraindication_id,
-                "contraindication_name": poc.contraindication.name,
-                "type": "Общее противопоказание"
-            }
-            for poc in patient_other_contraindications
-        ]
+        "other contraindications": profile.other_contraindications
     }
     
     return report
@@ -1976,6 +1722,7 @@ def delete_patient_medicament(
     
     # Удаляем
     db.delete(patient_medicament)
+    patient_profile.bump(db, patient_medicament.patient_id)
     db.commit()
     
     return {
@@ -1987,50 +1734,32 @@ def delete_patient_medicament(
 
 
 @router.get("/my-prescriptions", response_model=List[schemas.PatientMedicamentResponse])
+@db_metrics.query_budget(2)
 @exceptions.handle_exceptions(custom_message="Не удалось получить список назначений")
 def get_my_prescriptions(
+    response: Response,
+    patient_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    page: pagination.PageParams = Depends(),
     current_doctor: models.Doctor = Depends(oauth2.get_current_doctor),
     db: Session = Depends(get_db)
 ):
     """
-    Получение всех назначений лекарств, сделанных текущим доктором.
+    Назначения лекарств, сделанные текущим доктором, постранично (новые первыми).
+    Фильтры: пациент, диапазон дат начала приема.
     """
     
+    # В ответ попадают только поля PatientMedicamentResponse - связи не загружаются
     prescriptions = db.query(models.PatientMedicament)\
-        .filter(models.PatientMedicament.doctor_by_id == current_doctor.id)\
-        .order_by(models.PatientMedicament.start_date.desc())\
-        .all()
-    
-    # Формируем ответ
-    result = []
-    for prescription in prescriptions:
-        # Получаем название лекарства
-        medicament = db.query(models.Medicament)\
-            .filter(models.Medicament.id == prescription.medicament_id)\
-            .first()
-        
-        # Получаем данные пациента
-        patient = db.query(models.Patient)\
-            .filter(models.Patient.id == prescription.patient_id)\
-            .first()
-        
-        # Создаем объект для ответа
-        prescription_data = {
-            "id": prescription.id,
-            "patient_id": prescription.patient_id,
-            "patient_name": f"{patient.first_name} {patient.last_name}" if patient else "Неизвестный пациент",
-            "medicament_id": prescription.medicament_id,
-            "medicament_name": medicament.name if medicament else "Неизвестное лекарство",
-            "dosage": prescription.dosage,
-            "frequency": prescription.frequency,
-            "start_date": prescription.start_date,
-            "end_date": prescription.end_date,
-            "notes": prescription.notes,
-            "doctor_id": prescription.doctor_by_id,
-            "appointment_id": prescription.appointment_id,
-            "created_at": prescription.created_at
-        }
-        
-        result.append(prescription_data)
-    
-    return result
\ No newline at end of file
+        .filter(models.PatientMedicament.doctor_by_id == current_doctor.id)
+    if patient_id:
+        prescriptions = prescriptions.filter(models.PatientMedicament.patient_id == patient_id)
+    prescriptions = pagination.date_range(prescriptions, models.PatientMedicament.start_date, date_from, date_to)
+    prescriptions = pagination.keyset(prescriptions, models.PatientMedicament, page).all()
+    
+    return serialization.list_response(
+        schemas.PatientMedicamentResponse,
+        pagination.page_of(prescriptions, page, response),
+        response
+    )
\ No newline at end of file
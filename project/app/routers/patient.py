@@ -1,12 +1,18 @@
-import models,schemas, utils, oauth2
+import models,schemas, utils, oauth2, loaders, booking, pagination, serialization, availability_index, schedule_cache, patient_profile, medication_report, catalog
 from fastapi import FastAPI, Response, status, HTTPException, Depends, APIRouter
-from sqlalchemy.orm import Session,joinedload
-from database import get_db
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_db, get_async_db
+from config import settings
 from typing import Optional,List
 from sqlalchemy import func
 from datetime import date
-from datetime import datetime
+from datetime import datetime, time
 import exceptions
+import db_metrics
 
 router = APIRouter(
     prefix = "/api/patient",
@@ -16,12 +22,23 @@ router = APIRouter(
 # auth.py
 @router.post("/register", response_model=schemas.Token)
 @exceptions.handle_exceptions(custom_message="Не удалось создать пациента")
-def register_patient(
+async def register_patient(
     patient_data: schemas.PatientCreate,
     db: Session = Depends(get_db)
 ):
     """
     Регистрация пациента с созданием пользователя и профиля пациента.
+    Пароль хешируется в пуле Argon2 (utils), работа с БД - в общем пуле потоков.
+    """
+    # Хешируем пароль
+    hashed_password = await utils.hash_async(patient_data.password)
+    
+    return await run_in_threadpool(_create_patient, patient_data, hashed_password, db)
+
+
+def _create_patient(patient_data: schemas.PatientCreate, hashed_password: str, db: Session):
+    """
+    Создание пользователя и профиля пациента с уже захешированным паролем.
     """
     # Проверяем, существует ли пользователь с таким email
     existing_user = db.query(models.User).filter(
@@ -66,9 +83,6 @@ def register_patient(
         else None
     )
 
-    # Хешируем пароль
-    hashed_password = utils.hash(patient_data.password)
-    
     # 1. СОЗДАЕМ ПОЛЬЗОВАТЕЛЯ в таблице users
     db_user = models.User(
         email=patient_data.email,
@@ -106,7 +120,8 @@ def register_patient(
     access_token = oauth2.create_access_token(
         data={
             "user_id": db_user.id,
-            "user_type": 'patient'
+            "user_type": 'patient',
+            "profile_id": db_patient.id
         }
     )
     
@@ -118,68 +133,205 @@ def register_patient(
     
 
 @router.get("/doctors",response_model=List[schemas.DoctorResponse])
+@db_metrics.query_budget(2)
 @exceptions.handle_exceptions(custom_message="Не удалось получить список докторов")
-def get_doctors(db: Session = Depends(get_db),current_patient: models.Patient = Depends(oauth2.get_current_patient)):
-    """
-    Получение списка всех докторов
-    """
-    doctors= db.query(models.Doctor).all()
-    return doctors
-
-@router.get("/schedule/{doctor_id}",response_model=List[schemas.ScheduleResponse])
-@exceptions.handle_exceptions(custom_message="Не удалось получить список расписаний")
-def get_doctors_schedule(doctor_id: int,current_patient: models.Patient = Depends(oauth2.get_current_patient), db: Session = Depends(get_db)):
+def get_doctors(
+    response: Response,
+    page: pagination.PageParams = Depends(),
+    db: Session = Depends(get_db),
+    current_patient: models.Patient = Depends(oauth2.get_current_patient)
+):
     """
-    Получение расписания определённого доктора
+    Получение списка докторов постранично
     """
-    doctor = db.query(models.Doctor).filter(models.Doctor.id == doctor_id).first()
-    
-    if not doctor:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Врач с ID {doctor_id} не найден"
-        )
-    
-    # Создаем базовый запрос с использованием relationship
-    query = db.query(models.Schedule)\
-        .filter(models.Schedule.doctor_id == doctor_id)
-    
-    # Сортируем результаты
-    schedules = query.order_by(
-        models.Schedule.date.asc(),
-        models.Schedule.start_time.asc()
-    ).all()
-    
-    return schedules
-
-        
+    doctors= db.query(models.Doctor)\
+        .options(*loaders.doctor_options())
+    doctors = pagination.keyset(doctors, models.Doctor, page).all()
+    return pagination.page_of(doctors, page, response)
 
+# Горячие эндпоинты чтения: в режиме DATABASE_ASYNC - через AsyncSession.
+# Запросы строятся общими функциями, режимы отличаются только их выполнением.
+if settings.database_async:
+    @router.get("/schedule/{doctor_id}",response_model=List[schemas.ScheduleResponse])
+    @db_metrics.query_budget(4)
+    @exceptions.handle_exceptions(custom_message="Не удалось получить список расписаний")
+    async def get_doctors_schedule(
+        doctor_id: int,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        only_available: bool = False,
+        current_patient: models.Patient = Depends(oauth2.get_current_patient_async),
+        db: AsyncSession = Depends(get_async_db)
+    ):
+        """
+        Расписание врача за период (по умолчанию 8 недель с сегодняшнего дня), AsyncSession.
+        Недели берутся из кэша (schedule_cache), недостающие - одним запросом.
+        """
+        date_from, date_to = schedule_cache.window(date_from, date_to)
+        weeks, missing = schedule_cache.lookup(doctor_id, date_from, date_to)
+    
+        if missing:
+            doctor_statement, schedule_statement = schedule_cache.load_statements(doctor_id, missing)
+            if not await db.scalar(doctor_statement):
+                raise schedule_cache.doctor_not_found(doctor_id)
+            schedules = (await db.scalars(schedule_statement)).all()
+            weeks.update(schedule_cache.store(doctor_id, missing, schedules))
+    
+        return ORJSONResponse(schedule_cache.assemble(weeks, date_from, date_to, only_available))
+else:
+    @router.get("/schedule/{doctor_id}",response_model=List[schemas.ScheduleResponse])
+    @db_metrics.query_budget(4)
+    @exceptions.handle_exceptions(custom_message="Не удалось получить список расписаний")
+    def get_doctors_schedule(
+        doctor_id: int,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        only_available: bool = False,
+        current_patient: models.Patient = Depends(oauth2.get_current_patient),
+        db: Session = Depends(get_db)
+    ):
+        """
+        Расписание врача за период (по умолчанию 8 недель с сегодняшнего дня).
+        Недели берутся из кэша (schedule_cache), недостающие - одним запросом.
+        """
+        date_from, date_to = schedule_cache.window(date_from, date_to)
+        weeks, missing = schedule_cache.lookup(doctor_id, date_from, date_to)
+    
+        if missing:
+            doctor_statement, schedule_statement = schedule_cache.load_statements(doctor_id, missing)
+            if not db.scalar(doctor_statement):
+                raise schedule_cache.doctor_not_found(doctor_id)
+            schedules = db.scalars(schedule_statement).all()
+            weeks.update(schedule_cache.store(doctor_id, missing, schedules))
+    
+        return ORJSONResponse(schedule_cache.assemble(weeks, date_from, date_to, only_available))
 
 
-@router.get("/appointments", response_model=List[schemas.AppointmentResponseToPatient])
-@exceptions.handle_exceptions(custom_message="Не удалось получить все записи на прием")
-def get_my_appointments(
-    status_filter: Optional[str] = None,
+@router.get("/slots/search", response_model=List[schemas.ScheduleResponse])
+@db_metrics.query_budget(3)
+@exceptions.handle_exceptions(custom_message="Не удалось найти свободные слоты")
+def search_slots(
+    response: Response,
+    specialization_id: Optional[int] = None,
+    office_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    time_from: Optional[time] = None,
+    time_to: Optional[time] = None,
+    page: pagination.PageParams = Depends(),
     current_patient: models.Patient = Depends(oauth2.get_current_patient),
     db: Session = Depends(get_db)
 ):
     """
-    Получение всех записей на прием текущего пациента по статусу записи
+    Ближайшие свободные слоты всех подходящих врачей, по возрастанию (дата, время).
+    Фильтры: специализация, кабинет, диапазон дат, время дня (слот целиком в окне).
+    Один запрос по частичному индексу ix_schedule_available_date_start_id,
+    страницы - keyset по (date, start_time, id).
     """
+    schedule = models.Schedule
+    now = datetime.now()
 
-    appointments = db.query(models.Appointment)\
+    slots = db.query(schedule)\
+        .options(*loaders.schedule_options())\
         .filter(
-        models.Appointment.patient_id == current_patient.id
+            schedule.is_available,
+            # уже начавшиеся сегодня слоты не предлагаем
+            tuple_(schedule.date, schedule.start_time) > tuple_(now.date(), now.time())
         )
+    if specialization_id:
+        doctors = select(models.Doctor.id).where(models.Doctor.specialization_id == specialization_id)
+        slots = slots.filter(schedule.doctor_id.in_(doctors))
+    if office_id:
+        slots = slots.filter(schedule.office_id == office_id)
+    if time_from:
+        slots = slots.filter(schedule.start_time >= time_from)
+    if time_to:
+        slots = slots.filter(schedule.end_time <= time_to)
+    slots = pagination.date_range(slots, schedule.date, date_from, date_to)
+    slots = pagination.seek(
+        slots, (schedule.date, schedule.start_time, schedule.id), pagination.SLOT_KEY_TYPES, page
+    ).all()
+
+    return serialization.list_response(
+        schemas.ScheduleResponse,
+        pagination.page_of(slots, page, response, key=pagination.slot_key),
+        response
+    )
+
+
+
+def _my_appointments_statement(patient_id: int, status_filter, doctor_id, date_from, date_to, page):
+    """Страница записей пациента (новые первыми) - общий запрос для Session и AsyncSession"""
+    statement = select(models.Appointment)\
+        .join(models.Appointment.schedule)\
+        .options(*loaders.patient_appointment_options(schedule_joined=True))\
+        .where(models.Appointment.patient_id == patient_id)
     if status_filter:
-        appointments = appointments.filter(models.Appointment.status == status_filter)
-    appointments = appointments.order_by(models.Appointment.id.desc()).all()
-    return appointments
+        statement = statement.where(models.Appointment.status == status_filter)
+    if doctor_id:
+        statement = statement.where(models.Schedule.doctor_id == doctor_id)
+    statement = pagination.date_range(statement, models.Schedule.date, date_from, date_to)
+    return pagination.keyset(statement, models.Appointment, page)
 
 
+if settings.database_async:
+    @router.get("/appointments", response_model=List[schemas.AppointmentResponseToPatient])
+    @db_metrics.query_budget(3)
+    @exceptions.handle_exceptions(custom_message="Не удалось получить все записи на прием")
+    async def get_my_appointments(
+        response: Response,
+        status_filter: Optional[str] = None,
+        doctor_id: Optional[int] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        page: pagination.PageParams = Depends(),
+        current_patient: models.Patient = Depends(oauth2.get_current_patient_async),
+        db: AsyncSession = Depends(get_async_db)
+    ):
+        """
+        Записи на прием текущего пациента постранично (AsyncSession).
+        Фильтры: статус, врач, диапазон дат приема.
+        """
+        statement = _my_appointments_statement(
+            current_patient.id, status_filter, doctor_id, date_from, date_to, page
+        )
+        appointments = (await db.scalars(statement)).all()
+        return serialization.list_response(
+            schemas.AppointmentResponseToPatient,
+            pagination.page_of(appointments, page, response),
+            response
+        )
+else:
+    @router.get("/appointments", response_model=List[schemas.AppointmentResponseToPatient])
+    @db_metrics.query_budget(3)
+    @exceptions.handle_exceptions(custom_message="Не удалось получить все записи на прием")
+    def get_my_appointments(
+        response: Response,
+        status_filter: Optional[str] = None,
+        doctor_id: Optional[int] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        page: pagination.PageParams = Depends(),
+        current_patient: models.Patient = Depends(oauth2.get_current_patient),
+        db: Session = Depends(get_db)
+    ):
+        """
+        Записи на прием текущего пациента постранично (новые первыми).
+        Фильтры: статус, врач, диапазон дат приема.
+        """
+        statement = _my_appointments_statement(
+            current_patient.id, status_filter, doctor_id, date_from, date_to, page
+        )
+        appointments = db.scalars(statement).all()
+        return serialization.list_response(
+            schemas.AppointmentResponseToPatient,
+            pagination.page_of(appointments, page, response),
+            response
+        )
 
 
 @router.post("/appointments/{schedule_id}", response_model=schemas.AppointmentResponseToPatient)
+@db_metrics.query_budget(5)
 @exceptions.handle_exceptions(custom_message="Не удалось записаться к врачу")
 def create_appointment(
     schedule_id: int,
@@ -190,62 +342,14 @@ def create_appointment(
     Создание записи на прием к врачу.
     Пациент создает запись на себя автоматически.
     """
-    # Получаем пациента из токена (уже проверено в get_current_patient)
-    patient_id = current_patient.id
-    
-    # Проверяем существование расписания
-    schedule = db.query(models.Schedule)\
-        .filter(models.Schedule.id == schedule_id)\
-        .first()
-    
-    if not schedule:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Расписание не найдено"
-        )
+    # Слот занимается атомарно вместе с созданием записи (проигравшие в гонке - 409)
+    appointment_id = booking.book_slot(db, current_patient.id, schedule_id)
     
-    # Проверяем доступность расписания
-    if not schedule.is_available:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Данное время уже занято"
-        )
-    
-    # Проверяем, что дата не в прошлом
-    if schedule.date < date.today():
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Нельзя записаться на прошедшую дату"
-        )
-    
-    # Проверяем, нет ли уже записи у пациента на это время
-    existing_appointment = db.query(models.Appointment)\
-        .filter(
-            models.Appointment.patient_id == patient_id,
-            models.Appointment.schedule_id == schedule_id
-        )\
-        .first()
-    
-    if existing_appointment:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="У вас уже есть запись на это время"
-        )
-    
-    # Создаем запись на прием
-    db_appointment = models.Appointment(
-        patient_id=patient_id,
-        schedule_id=schedule_id,
-        status='scheduled'
-    )
-    
-    db.add(db_appointment)
-    
-    # Обновляем расписание - помечаем как занятое
-    schedule.is_available = False
-    
-    db.commit()
-    db.refresh(db_appointment)
+    # Загружаем запись вместе с графом ответа одним запросом
+    db_appointment = db.query(models.Appointment)\
+        .options(*loaders.patient_appointment_options())\
+        .filter(models.Appointment.id == appointment_id)\
+        .one()
     
     return db_appointment
 
@@ -261,8 +365,9 @@ def cancel_appointment(
     Отмена записи на прием
     """
 
-    # Находим запись
-    appointment = db.query(models.Appointment)\
+    # Находим запись вместе со временем приема
+    appointment = db.query(models.Appointment.status, models.Schedule.date, models.Schedule.start_time)\
+        .outerjoin(models.Schedule, models.Schedule.id == models.Appointment.schedule_id)\
         .filter(
             models.Appointment.id == appointment_id,
             models.Appointment.patient_id == current_patient.id
@@ -275,13 +380,15 @@ def cancel_appointment(
             detail="Запись не найдена"
         )
     
-    # Проверяем, можно ли отменить (не меньше чем за 24 часа до приема)
-    schedule = db.query(models.Schedule)\
-        .filter(models.Schedule.id == appointment.schedule_id)\
-        .first()
+    if appointment.status != 'scheduled':
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Запись уже отменена или завершена"
+        )
     
-    if schedule:
-        appointment_datetime = datetime.combine(schedule.date, schedule.start_time)
+    # Проверяем, можно ли отменить (не меньше чем за 24 часа до приема)
+    if appointment.date:
+        appointment_datetime = datetime.combine(appointment.date, appointment.start_time)
         time_diff = appointment_datetime - datetime.now()
         
         if time_diff.total_seconds() < 24 * 60 * 60:  # меньше 24 часов
@@ -289,14 +396,9 @@ def cancel_appointment(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Отменить запись можно не позднее чем за 24 часа до приема"
             )
-        
-        # Освобождаем расписание
-        schedule.is_available = True
     
-    # Обновляем статус записи
-    appointment.status = 'cancelled'
-    
-    db.commit()
+    # Статус меняется условно: слот освобождает только запрос, который действительно отменил запись
+    booking.release_slot(db, appointment_id, current_patient.id)
     
     return {
         "message": "Запись успешно отменена",
@@ -305,6 +407,7 @@ def cancel_appointment(
 
 
 @router.get("/medication", response_model=dict)
+@db_metrics.query_budget(6)
 @exceptions.handle_exceptions(custom_message="Не удалось получить отчёт о лекарствах пациента")
 def get_patient_medication_report(
     current_patient: models.Patient = Depends(oauth2.get_current_patient),
@@ -312,92 +415,22 @@ def get_patient_medication_report(
 ):
     """
     Отчет о лекарствах пациента и противопоказаниях.
+    Профиль кэшируется (patient_profile): повторный просмотр - одно чтение версии;
+    при medication_report_engine = "sql" отчёт целиком строит один запрос (medication_report).
     """
     patient_id = current_patient.id
-    
-    # Получаем все лекарства пациента
-    patient_medicaments = db.query(models.PatientMedicament)\
-        .options(joinedload(models.PatientMedicament.medicament))\
-        .filter(models.PatientMedicament.patient_id == patient_id)\
-        .order_by(models.PatientMedicament.start_date.desc())\
-        .all()
-    
-    # Получаем ID лекарств пациента
-    patient_medicament_ids = [pm.medicament_id for pm in patient_medicaments]
-    
-    # Получаем прямые противопоказания пациента к лекарствам
-    patient_medicament_contraindications = db.query(models.PatientMedicamentContraindication)\
-        .options(joinedload(models.PatientMedicamentContraindication.medicament))\
-        .filter(models.PatientMedicamentContraindication.patient_id == patient_id)\
-        .all()
-    
-    #Получаем другие противопоказания пациента (что нельзя делать)
-    patient_other_contraindications = db.query(models.PatientOtherContraindication)\
-        .options(joinedload(models.PatientOtherContraindication.contraindication))\
-        .filter(models.PatientOtherContraindication.patient_id == patient_id)\
-        .all()
-    
-    # Находим лекарства, которые нельзя принимать (на основе взаимодействий)
-    forbidden_medicaments = set()
-    
-    # Прямые противопоказания
-    for contraindication in patient_medicament_contraindications:
-        forbidden_medicaments.add((
-            contraindication.medicament.id,
-            contraindication.medicament.name,
-            "Прямое противопоказание пациента"
-        ))
-    
-    # Взаимодействия между лекарствами пациента
-    if len(patient_medicament_ids) >= 2:
-        # Находим все лекарства, которые взаимодействуют с лекарствами пациента
-        from sqlalchemy import or_, and_
-        
-        # Получаем все взаимодействия, где хотя бы одно лекарство из списка пациента
-        interactions = db.query(models.MedicamentMedicamentContraindication)\
-            .options(
-                joinedload(models.MedicamentMedicamentContraindication.first_medicament),
-                joinedload(models.MedicamentMedicamentContraindication.second_medicament)
-            )\
-            .filter(
-                or_(
-                    models.MedicamentMedicamentContraindication.medication_first_id.in_(patient_medicament_ids),
-                    models.MedicamentMedicamentContraindication.medication_second_id.in_(patient_medicament_ids)
-                )
-            )\
-            .all()
-        
-        # Для каждого взаимодействия определяем, какое лекарство противопоказано
-        for interaction in interactions:
-            # Если первое лекарство принимает пациент, то второе противопоказано
-            if interaction.medication_first_id in patient_medicament_ids:
-                forbidden_medicaments.add((
-                    interaction.medication_second_id,
-                    interaction.second_medicament.name,
-                    f"Взаимодействует с '{interaction.first_medicament.name}'"
-                ))
-            
-            # Если второе лекарство принимает пациент, то первое противопоказано
-            if interaction.medication_second_id in patient_medicament_ids:
-                forbidden_medicaments.add((
-                    interaction.medication_first_id,
-                    interaction.first_medicament.name,
-                    f"Взаимодействует с '{interaction.second_medicament.name}'"
-                ))
-    
 
-    current_medicament_ids = set(patient_medicament_ids)
-    forbidden_medicaments_filtered = [
-        {
-            "medicament_id": medicament_id,
-            "medicament_name": medicament_name,
-            "reason": reason
-        }
-        for medicament_id, medicament_name, reason in forbidden_medicaments
-        if medicament_id not in current_medicament_ids  # фильтруем те, что уже принимает
-    ]
-    
-    # тчет
+    if settings.medication_report_engine == "sql":
+        return medication_report.response(
+            medication_report.fetch(db, patient_id, "forbidden_activities")
+        )
+
+    # версии читаются из БД: снимок пациента из кэша авторизации может быть старше
+    versions = db.query(models.Patient.profile_version, catalog.version_column())\
+        .filter(models.Patient.id == patient_id)\
+        .one()
+    profile = patient_profile.get(db, patient_id, versions.profile_version, versions.catalog_version)
+
     report = {
         "patient_info": {
             "id": current_patient.id,
@@ -406,33 +439,13 @@ def get_patient_medication_report(
         },
         
         #Все лекарства пациента
-        "current_medicaments": [
-            {
-                "id": pm.id,
-                "medicament_id": pm.medicament_id,
-                "medicament_name": pm.medicament.name,
-                "dosage": pm.dosage,
-                "frequency": pm.frequency,
-                "start_date": pm.start_date,
-                "end_date": pm.end_date,
-                "notes": pm.notes,
-                "is_active": pm.end_date is None or pm.end_date >= date.today()
-            }
-            for pm in patient_medicaments
-        ],
+        "current_medicaments": profile.current_medicaments(),
         
         #Какие лекарства нельзя принимать
-        "forbidden_medicaments": forbidden_medicaments_filtered,
+        "forbidden_medicaments": profile.forbidden_medicaments,
         
         #другие противопоказания
-        "forbidden_activities": [
-            {
-                "contraindication_id": poc.contraindication_id,
-                "contraindication_name": poc.contraindication.name,
-                "type": "Общее противопоказание"
-            }
-            for poc in patient_other_contraindications
-        ]
+        "forbidden_activities": profile.other_contraindications
     }
     
     return report
\ No newline at end of file
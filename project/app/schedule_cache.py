@@ -0,0 +1,156 @@
+"""
+Расписание врача по неделям для /schedule/{doctor_id} (пациент и администратор).
+
+Ответ собирается из недель (понедельник - воскресенье): каждая неделя врача
+кэшируется готовыми JSON-совместимыми словарями ScheduleResponse, окно дат и
+флаг only_available применяются уже к ним. Календарь пациента на неделю - одно
+попадание в кэш без запросов к БД.
+
+Ключ записи содержит версию (врач, неделя). Бронирование, отмена и изменения
+расписания увеличивают версию, и старые записи больше не читаются: запрос,
+прочитавший БД до изменения и положивший результат после него, пишет его
+под старой версией и не может вернуть устаревшую неделю. Версии живут в памяти
+процесса, поэтому изменения из других процессов видны через TTL кэша.
+"""
+
+import threading
+from datetime import date, timedelta
+from typing import Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+
+import cache, loaders, models, schemas, serialization
+from config import settings
+
+# окно по умолчанию и наибольшее окно одного запроса (в днях)
+DEFAULT_DAYS = 56
+MAX_DAYS = 366
+
+week_cache = cache.TTLCache(
+    "schedule_weeks",
+    maxsize=settings.schedule_cache_size,
+    ttl=settings.schedule_cache_ttl_seconds
+)
+
+_versions = {}  # (doctor_id, понедельник) -> версия
+_versions_lock = threading.Lock()
+
+
+def week_of(day: date) -> date:
+    """Понедельник недели, в которую попадает day"""
+    return day - timedelta(days=day.weekday())
+
+
+def window(date_from: Optional[date], date_to: Optional[date]):
+    """Окно дат запроса: по умолчанию DEFAULT_DAYS дней начиная с сегодня"""
+    date_from = date_from or date.today()
+    date_to = date_to or date_from + timedelta(days=DEFAULT_DAYS - 1)
+
+    if date_to < date_from:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Конец периода раньше начала"
+        )
+    if (date_to - date_from).days >= MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Период не может быть длиннее {MAX_DAYS} дней"
+        )
+
+    return date_from, date_to
+
+
+def invalidate(doctor_id: int, day: date):
+    """Слоты врача в неделе day изменились"""
+    key = (doctor_id, week_of(day))
+    with _versions_lock:
+        _versions[key] = _versions.get(key, 0) + 1
+
+
+def invalidate_range(doctor_id: int, date_from: date, date_to: date):
+    week = week_of(date_from)
+    while week <= date_to:
+        invalidate(doctor_id, week)
+        week += timedelta(days=7)
+
+
+def invalidate_doctor(doctor_id: int):
+    """Врач удалён: все его недели"""
+    week_cache.invalidate_where(lambda key, value: key[0] == doctor_id)
+
+
+def lookup(doctor_id: int, date_from: date, date_to: date):
+    """
+    (найденные недели {понедельник: слоты}, недостающие {понедельник: версия}).
+    Версия запоминается до чтения БД и передаётся в store.
+    """
+    found, missing = {}, {}
+    week = week_of(date_from)
+    while week <= date_to:
+        version = _versions.get((doctor_id, week), 0)
+        items = week_cache.get((doctor_id, week, version))
+        if items is None:
+            missing[week] = version
+        else:
+            found[week] = items
+        week += timedelta(days=7)
+
+    return found, missing
+
+
+def load_range(missing: dict):
+    """Диапазон дат, покрывающий недостающие недели (для одного запроса к БД)"""
+    return min(missing), max(missing) + timedelta(days=6)
+
+
+def load_statements(doctor_id: int, missing: dict):
+    """
+    (проверка врача, слоты недостающих недель) - select() для Session и AsyncSession:
+    эндпоинты обоих режимов отличаются только выполнением запросов.
+    """
+    load_from, load_to = load_range(missing)
+    schedules = select(models.Schedule)\
+        .options(*loaders.schedule_options())\
+        .where(
+            models.Schedule.doctor_id == doctor_id,
+            models.Schedule.date.between(load_from, load_to)
+        )\
+        .order_by(
+            models.Schedule.date.asc(),
+            models.Schedule.start_time.asc()
+        )
+    return select(models.Doctor.id).where(models.Doctor.id == doctor_id), schedules
+
+
+def doctor_not_found(doctor_id: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Врач с ID {doctor_id} не найден"
+    )
+
+
+def store(doctor_id: int, missing: dict, schedules) -> dict:
+    """Сериализовать слоты недостающих недель и положить каждую неделю в кэш"""
+    weeks = {week: [] for week in missing}
+    for item in serialization.dump_list_python(schemas.ScheduleResponse, schedules):
+        week = week_of(date.fromisoformat(item["date"]))
+        # в диапазон запроса могли попасть и уже найденные в кэше недели
+        if week in weeks:
+            weeks[week].append(item)
+
+    for week, items in weeks.items():
+        week_cache.set((doctor_id, week, missing[week]), items)
+
+    return weeks
+
+
+def assemble(weeks: dict, date_from: date, date_to: date, only_available: bool) -> list:
+    """Слоты окна по порядку недель (внутри недели - по дате и времени)"""
+    first, last = date_from.isoformat(), date_to.isoformat()
+    return [
+        item
+        for week in sorted(weeks)
+        for item in weeks[week]
+        if first <= item["date"] <= last and (item["is_available"] or not only_available)
+    ]
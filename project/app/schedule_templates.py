@@ -0,0 +1,81 @@
+"""
+Развёртывание повторяющихся шаблонов расписания в слоты.
+
+Даты и время слотов считаются векторно (NumPy): дни диапазона фильтруются
+по дням недели, затем каждый день складывается с сеткой смещений слотов.
+Результат вставляется одним executemany в одной транзакции; пересечения
+с существующими слотами врача/кабинета отклоняют EXCLUDE-ограничения
+(вся вставка откатывается, ответ 409).
+"""
+
+from datetime import time
+
+import numpy as np
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+import models, schemas
+
+# 1970-01-01 (нулевой день datetime64[D]) - четверг
+_EPOCH_WEEKDAY = 3
+
+
+def slot_offsets(start: time, end: time, slot_minutes: int) -> np.ndarray:
+    """Начала слотов в минутах от полуночи (только слоты, целиком попадающие в окно)"""
+    start_minutes = start.hour * 60 + start.minute
+    end_minutes = end.hour * 60 + end.minute
+    return np.arange(start_minutes, end_minutes - slot_minutes + 1, slot_minutes, dtype=np.int64)
+
+
+def matching_days(template: schemas.ScheduleTemplateCreate) -> np.ndarray:
+    """Дни диапазона (datetime64[D]), попадающие в дни недели шаблона"""
+    days = np.arange(
+        np.datetime64(template.date_from, "D"),
+        np.datetime64(template.date_to, "D") + 1,
+        dtype="datetime64[D]"
+    )
+    weekdays = (days.astype(np.int64) + _EPOCH_WEEKDAY) % 7
+    return days[np.isin(weekdays, template.weekdays)]
+
+
+def expand(template: schemas.ScheduleTemplateCreate):
+    """Массивы начала и конца слотов (datetime64[m]) в порядке дата/время"""
+    days = matching_days(template).astype("datetime64[m]")
+    offsets = slot_offsets(template.start_time, template.end_time, template.slot_minutes)
+
+    starts = (days[:, None] + offsets.astype("timedelta64[m]")).ravel()
+    ends = starts + np.timedelta64(template.slot_minutes, "m")
+    return starts, ends
+
+
+def to_rows(template: schemas.ScheduleTemplateCreate, starts: np.ndarray, ends: np.ndarray) -> list:
+    """Строки для INSERT (python-значения для драйвера БД)"""
+    start_values = starts.astype("datetime64[s]").astype(object)
+    end_values = ends.astype("datetime64[s]").astype(object)
+
+    return [
+        {
+            "doctor_id": template.doctor_id,
+            "office_id": template.office_id,
+            "date": start.date(),
+            "start_time": start.time(),
+            "end_time": end.time(),
+            "is_available": True,
+        }
+        for start, end in zip(start_values, end_values)
+    ]
+
+
+def create_slots(db: Session, rows: list) -> list:
+    """
+    Вставить все слоты одним executemany (insertmanyvalues) и зафиксировать транзакцию.
+    Возвращает id слотов в порядке rows.
+    """
+    slot_ids = []
+    if rows:
+        slot_ids = db.execute(
+            insert(models.Schedule).returning(models.Schedule.id, sort_by_parameter_order=True),
+            rows
+        ).scalars().all()
+    db.commit()
+    return slot_ids
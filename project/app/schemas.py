@@ -116,6 +116,29 @@ class ScheduleBatchCreate(BaseModel):
         from_attributes = True
 
 
+class ScheduleTemplateCreate(BaseModel):
+    """Повторяющийся шаблон расписания: слоты по дням недели в диапазоне дат"""
+    doctor_id: int
+    office_id: int
+    weekdays: Annotated[List[Annotated[int, Field(ge=0, le=6)]], Field(min_length=1)]  # 0 - понедельник
+    start_time: time
+    end_time: time
+    slot_minutes: Annotated[int, Field(ge=5, le=720)]
+    date_from: date
+    date_to: date
+    dry_run: bool = False
+
+    @field_validator('date_to')
+    def validate_date_range(cls, v, info):
+        date_from = info.data.get('date_from')
+        if date_from is not None:
+            if v < date_from:
+                raise ValueError('Дата окончания раньше даты начала')
+            if (v - date_from).days > 366:
+                raise ValueError('Диапазон шаблона - не больше года')
+        return v
+
+
 class AppointmentCreate(BaseModel):
     schedule_id: int
 
@@ -181,6 +204,33 @@ class MedicamentConflictResponse(BaseModel):
     medicament_name: str
     conflict_reasons: List[str]
     
+class PrescriptionCheckItem(BaseModel):
+    """Кандидат в назначение: лекарства для одного пациента"""
+    patient_id: int
+    medicament_ids: Annotated[List[int], Field(min_length=1)]
+
+
+class PrescriptionCheckRequest(BaseModel):
+    checks: Annotated[List[PrescriptionCheckItem], Field(min_length=1, max_length=5000)]
+
+
+class PrescriptionCheckConflict(MedicamentConflictResponse):
+    medicament_id: int
+
+
+class PrescriptionCheckResult(BaseModel):
+    """Результат проверки одного кандидата; error - пациент или лекарства не найдены"""
+    patient_id: int
+    ok: bool
+    conflicts: List[PrescriptionCheckConflict] = []
+    error: Optional[str] = None
+
+
+class PrescriptionCheckResponse(BaseModel):
+    results: List[PrescriptionCheckResult]  # в порядке запроса
+    checked: int
+    with_conflicts: int
+
 class MedicamentsAppointmentResponse(BaseModel):
     """Модель ответа при назначении лекарств"""
     added_medicaments: List[PatientMedicamentResponse]
@@ -199,6 +249,7 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     id: Optional[str] = None
     user_type: Optional[str] = None
+    profile_id: Optional[int] = None
 
 class UserLogin(BaseModel):
     email: str
@@ -234,4 +285,18 @@ class MedMedContr(BaseModel):
 
 class MedicamentCreate(BaseModel):
     medicament_name: str
-    med_contraindications_ids: List[int]
\ No newline at end of file
+    med_contraindications_ids: List[int]
+
+class PolypharmacyAuditRunResponse(BaseModel):
+    id: int
+    status: str
+    patients_scanned: int
+    patients_flagged: int
+    findings: int
+    error: Optional[str] = None
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    heartbeat_at: datetime
+
+    class Config:
+        from_attributes = True
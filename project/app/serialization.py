@@ -0,0 +1,83 @@
+"""
+Сериализация больших списков ответа через заранее построенные TypeAdapter.
+
+Стандартный путь FastAPI для response_model: проверка возвращённых объектов,
+затем model_dump в python-словари, затем кодирование в JSON. Здесь ORM-объекты
+один раз читаются (from_attributes) и сразу сериализуются в байты
+pydantic-core, минуя промежуточные словари и JSON-кодировщик ответа.
+
+Данные из БД уже прошли проверку при записи, поэтому адаптер строится
+по "доверенной" копии схемы: EmailStr заменён на str (проверка email - самая
+дорогая часть чтения пациента), JSON на выходе тот же.
+response_model у эндпоинта остаётся для OpenAPI-схемы.
+"""
+
+import types
+from functools import lru_cache
+from typing import List, Union, get_args, get_origin
+
+from fastapi import Response
+from pydantic import BaseModel, ConfigDict, EmailStr, TypeAdapter, create_model
+
+
+def _trusted_type(annotation):
+    if annotation is EmailStr:
+        return str
+
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return trusted_schema(annotation)
+
+    origin = get_origin(annotation)
+    if origin in (Union, types.UnionType):
+        return Union[tuple(_trusted_type(arg) for arg in get_args(annotation))]
+    if origin is list:
+        return List[_trusted_type(get_args(annotation)[0])]
+
+    return annotation
+
+
+@lru_cache(maxsize=None)
+def trusted_schema(schema):
+    """Копия схемы ответа без повторной проверки значений, уже проверенных при записи в БД"""
+    fields = {
+        name: (_trusted_type(field.annotation), field)
+        for name, field in schema.model_fields.items()
+    }
+    return create_model(
+        schema.__name__,
+        __config__=ConfigDict(from_attributes=True),
+        **fields
+    )
+
+
+@lru_cache(maxsize=None)
+def list_adapter(schema) -> TypeAdapter:
+    """TypeAdapter для List[schema] (строится один раз на схему)"""
+    return TypeAdapter(List[trusted_schema(schema)])
+
+
+def dump_list(schema, items) -> bytes:
+    adapter = list_adapter(schema)
+    return adapter.dump_json(adapter.validate_python(items, from_attributes=True))
+
+
+def dump_list_python(schema, items) -> list:
+    """Список JSON-совместимых словарей (для кэширования готовых ответов)"""
+    adapter = list_adapter(schema)
+    return adapter.dump_python(adapter.validate_python(items, from_attributes=True), mode="json")
+
+
+def list_response(schema, items, response: Response = None) -> Response:
+    """
+    JSON-ответ со списком items по схеме schema.
+    response - Response из параметров эндпоинта: его заголовки (например,
+    X-Next-Cursor пагинации) переносятся в итоговый ответ.
+    """
+    result = Response(content=dump_list(schema, items), media_type="application/json")
+
+    if response is not None:
+        for name, value in response.headers.items():
+            if name != "content-length":
+                result.headers[name] = value
+
+    return result
@@ -1,9 +1,151 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
+from config import settings
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+def _argon2_params() -> dict:
+    """Параметры Argon2 из настроек (не заданные берутся по умолчанию passlib)"""
+    params = {
+        "argon2__time_cost": settings.argon2_time_cost,
+        "argon2__memory_cost": settings.argon2_memory_cost,
+        "argon2__parallelism": settings.argon2_parallelism,
+    }
+    return {key: value for key, value in params.items() if value is not None}
+
+pwd_context = CryptContext(schemes=["argon2"], deprecated="auto", **_argon2_params())
 
 def hash(password: str):
     return pwd_context.hash(password)
 
 def verify(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
\ No newline at end of file
+    return pwd_context.verify(plain_password, hashed_password)
+
+def _parallelism(hashed_password: str):
+    """p= из хеша вида $argon2id$v=19$m=65536,t=3,p=4$соль$хеш (None, если не разобрать)"""
+    parts = hashed_password.split("$")
+    if len(parts) < 4:
+        return None
+    for param in parts[3].split(","):
+        name, _, value = param.partition("=")
+        if name == "p" and value.isdigit():
+            return int(value)
+    return None
+
+def verify_and_update(plain_password, hashed_password):
+    """
+    Проверка пароля; если хеш создан с устаревшими параметрами (needs_update),
+    вторым элементом возвращается новый хеш, иначе None.
+    needs_update в passlib не сравнивает parallelism, поэтому p= проверяется отдельно.
+    """
+    valid, new_hash = pwd_context.verify_and_update(plain_password, hashed_password)
+    if valid and new_hash is None and settings.argon2_parallelism is not None \
+            and _parallelism(hashed_password) != settings.argon2_parallelism:
+        new_hash = hash(plain_password)
+    return valid, new_hash
+
+
+# Argon2 выполняется в собственном пуле потоков, а не в общем пуле FastAPI:
+# всплеск логинов не должен занимать потоки, нужные остальным эндпоинтам.
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.password_hash_workers,
+    thread_name_prefix="argon2"
+)
+
+_pending_lock = threading.Lock()
+_pending = 0
+
+
+class PasswordHashMetrics:
+    """Время ожидания в очереди и время самого хеширования"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.hash_time_total = 0.0
+        self.hash_time_max = 0.0
+
+    def record(self, queue_wait: float, hash_time: float):
+        with self._lock:
+            self.completed += 1
+            self.queue_wait_total += queue_wait
+            self.queue_wait_max = max(self.queue_wait_max, queue_wait)
+            self.hash_time_total += hash_time
+            self.hash_time_max = max(self.hash_time_max, hash_time)
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = self.completed or 1
+            return {
+                "workers": settings.password_hash_workers,
+                "queue_limit": settings.password_hash_queue_limit,
+                "pending": _pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "queue_wait_avg_ms": self.queue_wait_total / completed * 1000,
+                "queue_wait_max_ms": self.queue_wait_max * 1000,
+                "hash_time_avg_ms": self.hash_time_total / completed * 1000,
+                "hash_time_max_ms": self.hash_time_max * 1000,
+            }
+
+
+password_metrics = PasswordHashMetrics()
+
+
+async def _run_password_task(func, *args):
+    """
+    Выполнить операцию с паролем в пуле Argon2.
+    Если очередь заполнена - сразу 503, а не ожидание в общей очереди.
+    """
+    global _pending
+
+    with _pending_lock:
+        if _pending >= settings.password_hash_workers + settings.password_hash_queue_limit:
+            password_metrics.reject()
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Сервис авторизации перегружен, повторите попытку позже",
+                headers={"Retry-After": "1"}
+            )
+        _pending += 1
+
+    submitted = time.perf_counter()
+
+    def task():
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            password_metrics.record(started - submitted, time.perf_counter() - started)
+
+    # счётчик уменьшается, когда задача действительно завершилась в пуле, а не когда
+    # ожидающий запрос отменён: отменённый клиентом хеш продолжает занимать поток
+    future = _password_executor.submit(task)
+    future.add_done_callback(_release_pending)
+    return await asyncio.wrap_future(future)
+
+
+def _release_pending(future):
+    global _pending
+
+    with _pending_lock:
+        _pending -= 1
+
+
+async def hash_async(password: str):
+    return await _run_password_task(hash, password)
+
+async def verify_async(plain_password, hashed_password):
+    return await _run_password_task(verify, plain_password, hashed_password)
+
+async def verify_and_update_async(plain_password, hashed_password):
+    return await _run_password_task(verify_and_update, plain_password, hashed_password)
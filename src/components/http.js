@@ -38,4 +38,22 @@ http.interceptors.response.use(
   }
 )
 
+// Постраничные списки API: проходим по курсорам из X-Next-Cursor и собираем все страницы
+export const getAllPages = async (url, config = {}) => {
+  const items = []
+  let cursor = null
+
+  do {
+    const params = { ...(config.params || {}), limit: 500 }
+    if (cursor) {
+      params.cursor = cursor
+    }
+    const response = await http.get(url, { ...config, params })
+    items.push(...response.data)
+    cursor = response.headers['x-next-cursor']
+  } while (cursor)
+
+  return { data: items }
+}
+
 export default http
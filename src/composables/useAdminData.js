@@ -1,5 +1,5 @@
 import { computed } from 'vue'
-import http from '../components/http'
+import http, { getAllPages } from '../components/http'
 import {
     state,
     handleApiError,
@@ -18,7 +18,7 @@ export function useAdminData() {
         try {
             state.loading.patients = true
             state.errors.patients = null
-            const response = await http.get('/api/admin/patients')
+            const response = await getAllPages('/api/admin/patients')
             state.patients = response.data
             return response.data
         } catch (error) {
@@ -55,7 +55,7 @@ export function useAdminData() {
         try {
             state.loading.doctors = true
             state.errors.doctors = null
-            const response = await http.get('/api/admin/doctors')
+            const response = await getAllPages('/api/admin/doctors')
 
             state.doctors = response.data.map((doctor) => ({
                 id: doctor.id,
@@ -95,7 +95,7 @@ export function useAdminData() {
         try {
             state.loading.appointments = true
             state.errors.appointments = null
-            const response = await http.get('/api/admin/appointments')
+            const response = await getAllPages('/api/admin/appointments')
             state.appointments = response.data
             return response.data
         } catch (error) {
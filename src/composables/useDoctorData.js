@@ -1,5 +1,5 @@
 import { computed } from 'vue'
-import http from '../components/http'
+import http, { getAllPages } from '../components/http'
 import { state, handleApiError, useHospitalCore } from './useHospitalCore'
 
 export function useDoctorData() {
@@ -11,7 +11,7 @@ export function useDoctorData() {
         try {
             state.loading.doctors = true
             state.errors.doctors = null
-            const response = await http.get('/api/patient/doctors')
+            const response = await getAllPages('/api/patient/doctors')
             state.doctors = response.data.map((doctor) => ({
                 id: doctor.id,
                 name: `${doctor.first_name} ${doctor.last_name} ${doctor.patronymic || ''}`.trim(),
@@ -102,7 +102,7 @@ export function useDoctorData() {
             const url = statusFilter
                 ? `/api/doctor/appointments?status_filter=${statusFilter}`
                 : '/api/doctor/appointments'
-            const response = await http.get(url)
+            const response = await getAllPages(url)
             return response.data
         } catch (error) {
             console.error('Failed to fetch doctor appointments:', error)
@@ -373,7 +373,7 @@ export function useDoctorData() {
 
     const getMyPrescriptions = async () => {
         try {
-            const response = await http.get('/api/doctor/my-prescriptions')
+            const response = await getAllPages('/api/doctor/my-prescriptions')
             return response.data
         } catch (error) {
             console.error('Failed to fetch my prescriptions:', error)
@@ -1,5 +1,5 @@
 import { computed } from 'vue'
-import http from '../components/http'
+import http, { getAllPages } from '../components/http'
 import { state, handleApiError, useHospitalCore } from './useHospitalCore'
 
 export function usePatientData() {
@@ -11,7 +11,7 @@ export function usePatientData() {
         try {
             state.loading.doctors = true
             state.errors.doctors = null
-            const response = await http.get('/api/patient/doctors')
+            const response = await getAllPages('/api/patient/doctors')
             state.doctors = response.data.map((doctor) => ({
                 id: doctor.id,
                 name: `${doctor.first_name} ${doctor.last_name} ${doctor.patronymic || ''}`.trim(),
@@ -89,7 +89,7 @@ export function usePatientData() {
             const url = statusFilter
                 ? `/api/patient/appointments?status_filter=${statusFilter}`
                 : '/api/patient/appointments'
-            const response = await http.get(url)
+            const response = await getAllPages(url)
             console.log('Patient appointments:', response.data)
             return response.data
         } catch (error) {